@@ -11,11 +11,23 @@ import json
 import torch
 import numpy as np
 from transformers import BertTokenizer, BertModel
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import os
 import pickle
 from tqdm import tqdm
 
+try:
+    # 仓库根目录在 sys.path 上时可用（持久化向量缓存）
+    from packages.rag_core.utils.embedding_cache import EmbeddingCache
+except ImportError:
+    EmbeddingCache = None
+
+try:
+    # ONNX Runtime 编码后端（CPU 部署用），需要 onnxruntime
+    from packages.rag_core.encoder.onnx_encoder import ONNXEncoder
+except ImportError:
+    ONNXEncoder = None
+
 # 检查是否有CUDA可用
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 print(f"使用设备: {device}")
@@ -25,16 +37,33 @@ class QuestionEncoder:
     问题编码器类，使用BERT模型对中文问题进行编码
     """
     
-    def __init__(self, model_name: str = "bert-base-chinese"):
+    def __init__(self, model_name: str = "bert-base-chinese", cache_dir: Optional[str] = None,
+                 onnx_dir: Optional[str] = None, quantized: bool = False):
         """
         初始化编码器
         Args:
             model_name: 使用的BERT模型名称
+            cache_dir: 向量缓存目录，已编码过的问题直接从缓存读取，只对新问题运行模型
+            onnx_dir: export_onnx(model_name, onnx_dir, pooling="cls") 导出的目录，设置后用 ONNX Runtime 编码
+            quantized: 使用 int8 量化后的 ONNX 模型
         """
         self.model_name = model_name
         self.tokenizer = None
         self.model = None
         self.max_length = 128  # 最大序列长度
+        self.onnx_encoder = None
+        if onnx_dir:
+            if ONNXEncoder is None:
+                raise ImportError("ONNX 后端需要 packages.rag_core 和 onnxruntime")
+            self.onnx_encoder = ONNXEncoder(onnx_dir, quantized=quantized, pooling="cls", max_length=self.max_length)
+        self.cache = None
+        if cache_dir:
+            if EmbeddingCache is None:
+                print("未找到 packages.rag_core，向量缓存不可用")
+            else:
+                # [CLS] 向量未归一化；max_length 和编码后端改变时向量也会改变
+                variant = self.onnx_encoder.variant if self.onnx_encoder else f"cls-{self.max_length}"
+                self.cache = EmbeddingCache(cache_dir, model_name, normalize=False, variant=variant)
         
     def load_model(self):
         """
@@ -60,6 +89,18 @@ class QuestionEncoder:
         Returns:
             torch.Tensor: 编码后的张量，形状为 (N, hidden_size)
         """
+        if self.cache is not None:
+            vectors = self.cache.encode(questions, lambda todo: self._encode_batches(todo).numpy())
+            print(f"缓存命中 {self.cache.hits} 条，未命中 {self.cache.misses} 条")
+            return torch.from_numpy(vectors)
+        return self._encode_batches(questions)
+
+    def _encode_batches(self, questions: List[str]) -> torch.Tensor:
+        """
+        实际运行BERT模型进行批量编码
+        """
+        if self.onnx_encoder is not None:
+            return torch.from_numpy(self.onnx_encoder.encode(questions, batch_size=32))
         if self.model is None:
             self.load_model()
         
@@ -11,10 +11,23 @@ import json
 import torch
 import numpy as np
 from transformers import BertTokenizer, BertModel
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 import os
 from sklearn.metrics.pairwise import cosine_similarity
 
+try:
+    # 仓库根目录在 sys.path 上时可用（查询向量缓存）
+    from packages.rag_core.utils.lru_cache import LRUCache
+    from packages.rag_core.utils.text import normalize_query
+except ImportError:
+    LRUCache = None
+
+try:
+    # ONNX Runtime 编码后端（CPU 部署用），需要 onnxruntime
+    from packages.rag_core.encoder.onnx_encoder import ONNXEncoder
+except ImportError:
+    ONNXEncoder = None
+
 # 检查是否有CUDA可用
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
@@ -23,9 +36,16 @@ class SemanticSearcher:
     语义检索器类
     """
     
-    def __init__(self, model_name: str = "bert-base-chinese"):
+    def __init__(self, model_name: str = "bert-base-chinese", query_cache_size: int = 1024,
+                 query_cache_ttl: Optional[float] = None, onnx_dir: Optional[str] = None,
+                 quantized: bool = False):
         """
         初始化检索器
+        Args:
+            query_cache_size: 查询向量缓存的最大条数（0 表示不缓存）
+            query_cache_ttl: 缓存有效期（秒），None 表示不过期
+            onnx_dir: export_onnx(model_name, onnx_dir, pooling="cls") 导出的目录，设置后用 ONNX Runtime 编码查询
+            quantized: 使用 int8 量化后的 ONNX 模型
         """
         self.model_name = model_name
         self.tokenizer = None
@@ -34,6 +54,14 @@ class SemanticSearcher:
         self.id_mapping = None
         self.faiss_index = None
         self.max_length = 128
+        self.onnx_encoder = None
+        if onnx_dir:
+            if ONNXEncoder is None:
+                raise ImportError("ONNX 后端需要 packages.rag_core 和 onnxruntime")
+            self.onnx_encoder = ONNXEncoder(onnx_dir, quantized=quantized, pooling="cls", max_length=self.max_length)
+        self.query_cache = None
+        if query_cache_size and LRUCache is not None:
+            self.query_cache = LRUCache(query_cache_size, query_cache_ttl)
         
     def load_model(self):
         """
@@ -85,8 +113,24 @@ class SemanticSearcher:
     
     def encode_question(self, question: str) -> torch.Tensor:
         """
-        对单个问题进行编码
+        对单个问题进行编码（相同的问题直接返回缓存的向量）
+        """
+        if self.query_cache is not None:
+            key = normalize_query(question)
+            cached = self.query_cache.get(key)
+            if cached is not None:
+                return cached.clone()
+            embedding = self._encode(key)
+            self.query_cache.put(key, embedding)
+            return embedding.clone()
+        return self._encode(question)
+
+    def _encode(self, question: str) -> torch.Tensor:
+        """
+        运行BERT模型得到问题向量
         """
+        if self.onnx_encoder is not None:
+            return torch.from_numpy(self.onnx_encoder.encode([question])[0])
         if self.model is None:
             self.load_model()
         
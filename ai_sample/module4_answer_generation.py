@@ -13,20 +13,44 @@ from typing import List, Dict, Any, Optional
 import openai
 from module3_semantic_search import SemanticSearcher
 
+try:
+    # 仓库根目录在 sys.path 上时可用（语义回答缓存、上下文压缩）
+    from packages.rag_core.utils.answer_cache import SemanticAnswerCache
+    from packages.rag_core.utils.article import Article
+    from packages.rag_core.generator.context_packer import ContextPacker
+except ImportError:
+    SemanticAnswerCache = None
+    ContextPacker = None
+
 class AnswerGenerator:
     """
     回答生成器类
     """
     
-    def __init__(self, use_openai: bool = False, api_key: Optional[str] = None):
+    def __init__(self, use_openai: bool = False, api_key: Optional[str] = None,
+                 answer_cache_threshold: Optional[float] = None, answer_cache_ttl: Optional[float] = 3600,
+                 max_context_tokens: Optional[int] = None):
         """
         初始化回答生成器
         Args:
             use_openai: 是否使用OpenAI API
             api_key: OpenAI API密钥
+            answer_cache_threshold: 设置后缓存OpenAI回答；问题向量相似度不低于该值且检索到相同资料时直接复用
+            answer_cache_ttl: 缓存回答的有效期（秒）
+            max_context_tokens: 设置后提示词中的参考资料按token预算压缩（去重、保留与问题最相关的句子）
         """
         self.use_openai = use_openai
         self.searcher = None
+        self.answer_cache = None
+        if answer_cache_threshold is not None:
+            if SemanticAnswerCache is None:
+                raise ImportError("语义回答缓存需要 packages.rag_core（在仓库根目录运行）")
+            self.answer_cache = SemanticAnswerCache(threshold=answer_cache_threshold, ttl=answer_cache_ttl)
+        self.packer = None
+        if max_context_tokens is not None:
+            if ContextPacker is None:
+                raise ImportError("上下文压缩需要 packages.rag_core（在仓库根目录运行）")
+            self.packer = ContextPacker(model="gpt-3.5-turbo", max_tokens=max_context_tokens)
         
         if use_openai:
             if api_key:
@@ -46,6 +70,18 @@ class AnswerGenerator:
         self.searcher = SemanticSearcher()
         self.searcher.initialize(tensor_file, id_map_file, faiss_index_file)
     
+    def pack_context(self, question: str, context_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按token预算压缩检索结果：答案只保留与问题最相关的句子，放不下的结果被丢弃
+        """
+        if self.packer is None:
+            return context_results
+        articles = [Article(text=r['answer'], questions=[r['question']], id=str(i), link=r['link'], tags=r['tags'])
+                    for i, r in enumerate(context_results)]
+        packed, report = self.packer.pack(question, articles)
+        print(f"参考资料压缩到 {report['tokens_after']} tokens（节省 {report['tokens_saved']}）")
+        return [dict(context_results[int(a.id)], answer=" ... ".join(a.passage_texts())) for a in packed]
+
     def create_prompt(self, question: str, context_results: List[Dict[str, Any]]) -> str:
         """
         创建给语言模型的提示词
@@ -144,8 +180,19 @@ class AnswerGenerator:
         
         # 2. 生成回答
         if self.use_openai:
-            prompt = self.create_prompt(question, context_results)
-            generated_answer = self.generate_with_openai(prompt)
+            generated_answer, embedding = None, None
+            context_ids = [r['id'] for r in context_results]
+            if self.answer_cache is not None:
+                # 检索时已编码过该问题，这里命中查询向量缓存
+                embedding = self.searcher.encode_question(question).reshape(-1).cpu().numpy()
+                embedding = embedding / max(float((embedding ** 2).sum()) ** 0.5, 1e-12)
+                generated_answer = self.answer_cache.get(question, context_ids, embedding=embedding)
+
+            if generated_answer is None:
+                prompt = self.create_prompt(question, self.pack_context(question, context_results))
+                generated_answer = self.generate_with_openai(prompt)
+                if generated_answer is not None and self.answer_cache is not None:
+                    self.answer_cache.put(question, context_ids, generated_answer, embedding=embedding)
             
             if generated_answer is None:
                 print("OpenAI生成失败，使用模板回答")
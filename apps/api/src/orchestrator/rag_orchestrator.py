@@ -1,20 +1,615 @@
+import os
+import time
+import itertools
+import asyncio
+import logging
+import weakref
+from functools import partial
+from concurrent.futures import Executor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 from packages.rag_core.retriever.base import BaseRetriever
 from packages.rag_core.reranker.base import BaseReranker
+from packages.rag_core.reranker.cascade import CascadePolicy
 from packages.rag_core.generator.base import BaseGenerator
+from packages.rag_core.generator.context_packer import ContextPacker
+from packages.rag_core.generator.template import TemplateGenerator
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.trace import QueryTrace
+from packages.rag_core.utils.instrumentation import Instrumentation
+from packages.rag_core.utils.answer_cache import SemanticAnswerCache
+from packages.rag_core.utils.single_flight import AsyncSingleFlight, SingleFlight
+from packages.rag_core.utils.deadline import Deadline, DegradationPolicy
+from packages.rag_core.utils.text import normalize_query
+
+
+logger = logging.getLogger(__name__)
+
+
+def _article_info(article: Article) -> dict:
+    """What a client needs to show a retrieved article as a reference."""
+    return {
+        "id": article.id,
+        "question": article.questions[0] if article.questions else None,
+        "source": article.source,
+        "link": article.link,
+    }
+
+
+async def _once(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+STAGES = ("retrieve", "rerank", "generate")
+
+
+class StageTimeoutError(asyncio.TimeoutError):
+    """A stage of RAGOrchestrator.arun / arun_stream did not finish within its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} stage exceeded its {timeout}s timeout")
+        self.stage = stage
+        self.timeout = timeout
+
 
 class RAGOrchestrator():
-    def __init__(self, retriever: BaseRetriever, reranker: BaseReranker, generator: BaseGenerator):
+    def __init__(self, retriever: BaseRetriever, reranker: BaseReranker, generator: BaseGenerator,
+                 cascade: Optional[CascadePolicy] = None, max_concurrency: int = 256,
+                 executor: Optional[Executor] = None, stage_timeouts: Optional[Dict[str, float]] = None,
+                 answer_cache: Optional[SemanticAnswerCache] = None, packer: Optional[ContextPacker] = None,
+                 coalesce: bool = False, instrumentation: Optional[Instrumentation] = None,
+                 degradation: Optional[DegradationPolicy] = None, fallback_generator: Optional[BaseGenerator] = None):
+        """
+        cascade: skip / shrink the reranker when retrieval scores are already decisive
+        answer_cache: answers near-identical queries over the same reranked articles without the generator;
+                      queries are matched by the retriever's query embedding when it has one (embed_query)
+        packer: trims the reranked articles to a token budget before generation
+        coalesce: identical queries (after normalize_query) arriving while one is in flight join it and
+                  share its answer or event stream instead of running the pipeline again
+        instrumentation: traces every query (per-stage spans) into its sinks; without it only queries
+                         given an explicit QueryTrace are timed
+        degradation: how queries given a budget_ms trade quality for latency (shallower retrieval,
+                     truncated or skipped reranking, the fallback generator instead of the LLM)
+        fallback_generator: answers when the budget leaves no time for the generator or it fails;
+                            defaults to TemplateGenerator
+        max_concurrency: queries arun / arun_stream process at once (per event loop); the rest wait their turn
+        executor: where arun runs the CPU stages (retrieve, rerank); defaults to a thread pool owned by
+                  the orchestrator, sized to the CPU count
+        stage_timeouts: seconds per stage for arun / arun_stream, e.g. {"retrieve": 1, "generate": 20};
+                        a stage over its timeout raises StageTimeoutError (no entry = no timeout)
+        """
+        unknown = set(stage_timeouts or {}) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages {sorted(unknown)}, expected some of {STAGES}")
         self.retriever = retriever
         self.reranker = reranker
         self.generator = generator
+        self.cascade = cascade
+        self.answer_cache = answer_cache
+        self.packer = packer
+        self.max_concurrency = max_concurrency
+        self.stage_timeouts = dict(stage_timeouts or {})
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._semaphores = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+        self.coalesce = coalesce
+        self.single_flight = SingleFlight()
+        self._async_flights = weakref.WeakKeyDictionary()  # event loop -> AsyncSingleFlight
+        self.instrumentation = instrumentation or Instrumentation()
+        self.degradation = degradation or DegradationPolicy()
+        self.fallback_generator = fallback_generator or TemplateGenerator()
+        self._generate_executor = None
+
+    def _degrade(self, deadline: Deadline, trace: Optional[QueryTrace], degradation: str, **info):
+        self.degradation.degrade(deadline, degradation)
+        if trace is not None:
+            trace.record("degrade", action=degradation, remaining_ms=deadline.remaining_ms(), **info)
+        logger.debug("Degraded with %s, %.0fms left", degradation, deadline.remaining_ms())
+
+    def _retrieve(self, query: str, trace: Optional[QueryTrace], deadline: Optional[Deadline] = None):
+        start = time.perf_counter()
+        kwargs = {}
+        if deadline is not None:
+            kwargs["top_k"] = self.degradation.retrieval_depth(deadline)
+            if kwargs["top_k"] < self.degradation.top_k:
+                self._degrade(deadline, trace, "reduce_retrieval", top_k=kwargs["top_k"])
+        # tracing is opt-in: retrievers only see a trace when one is recorded
+        if trace is None:
+            retrieve_result = self.retriever.search(query, **kwargs)
+        else:
+            retrieve_result = self.retriever.traced_search(query, trace=trace, **kwargs)
+        if trace is not None:
+            trace.record("retrieve", (time.perf_counter() - start) * 1000, results=len(retrieve_result))
+        logger.debug("Retrieved %d articles", len(retrieve_result))
+        return retrieve_result
+
+    def _rerank(self, query: str, retrieve_result, trace: Optional[QueryTrace],
+                deadline: Optional[Deadline] = None) -> List[Article]:
+        start = time.perf_counter()
+        mode = "full" if deadline is None else self.degradation.rerank_mode(deadline)
+        if mode == "skip_rerank":
+            self._degrade(deadline, trace, mode, candidates=len(retrieve_result))
+            return self._retrieval_order(retrieve_result, trace, start)
+        if mode == "truncate_rerank":
+            self._degrade(deadline, trace, mode, candidates=len(retrieve_result))
+            retrieve_result = retrieve_result[:self.degradation.truncate_rerank_to]
+        reranker_result = self.reranker.cascade_rerank(query=query, articles=retrieve_result,
+                                                       policy=self.cascade, trace=trace)
+        if trace is not None:
+            skipped = trace.stage("cascade").get("action") == "skip"
+            trace.record("rerank", (time.perf_counter() - start) * 1000, candidates=len(retrieve_result),
+                         results=len(reranker_result), skipped=skipped)
+        logger.debug("Reranked down to %d articles", len(reranker_result))
+        return reranker_result
+
+    @staticmethod
+    def _retrieval_order(retrieve_result, trace: Optional[QueryTrace], start: float, top_k: int = 3) -> List[Article]:
+        """The articles the reranker would have kept, in retrieval order (as a cascade skip)."""
+        articles = [art[2] for art in retrieve_result[:top_k]]
+        if trace is not None:
+            trace.record("rerank", (time.perf_counter() - start) * 1000, candidates=len(retrieve_result),
+                         results=len(articles), skipped=True)
+        return articles
+
+    def _pack(self, query: str, articles: List[Article], trace: Optional[QueryTrace]) -> List[Article]:
+        if self.packer is None:
+            return articles
+        start = time.perf_counter()
+        packed, report = self.packer.pack(query, articles)
+        if trace is not None:
+            trace.record("pack", (time.perf_counter() - start) * 1000, **report)
+        logger.debug("Packed context into %d tokens (%d saved)", report["tokens_after"], report["tokens_saved"])
+        return packed
+
+    def _retrieve_and_rerank(self, query: str, trace: Optional[QueryTrace],
+                             deadline: Optional[Deadline] = None) -> List[Article]:
+        retrieve_result = self._retrieve(query, trace, deadline)
+        return self._pack(query, self._rerank(query, retrieve_result, trace, deadline), trace)
+
+    def _cached_answer(self, query: str, articles: List[Article], trace: Optional[QueryTrace]):
+        """(cached answer or None, query embedding to cache a fresh answer under)."""
+        if self.answer_cache is None:
+            return None, None
+        start = time.perf_counter()
+        # the retriever has just encoded this query; only retrievers without embeddings cost a forward pass
+        embedding = self.retriever.embed_query(query)
+        if embedding is None:
+            embedding = self.answer_cache.embed(query)
+        answer = self.answer_cache.get(query, [a.id for a in articles], embedding=embedding)
+        if trace is not None:
+            trace.record("answer_cache", (time.perf_counter() - start) * 1000, hit=answer is not None)
+        return answer, embedding
+
+    def _cache_answer(self, query: str, articles: List[Article], answer: str, embedding):
+        if self.answer_cache is not None and answer:
+            self.answer_cache.put(query, [a.id for a in articles], answer, embedding=embedding)
+
+    def _fallback(self, query: str, articles: List[Article], trace: Optional[QueryTrace], deadline: Deadline,
+                  reason: str) -> str:
+        """The fallback generator's answer, for a query whose budget cannot wait for the generator."""
+        self._degrade(deadline, trace, "template", reason=reason)
+        start = time.perf_counter()
+        answer = self.fallback_generator.generate(query=query, articles=articles)
+        if trace is not None:
+            trace.record("generate", (time.perf_counter() - start) * 1000, template=True)
+        return answer
+
+    @property
+    def generate_executor(self) -> Executor:
+        """Where run / run_stream wait on the generator under a budget (it is abandoned when late)."""
+        if self._generate_executor is None:
+            self._generate_executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                         thread_name_prefix="rag-generate")
+        return self._generate_executor
+
+    def _flight_key(self, kind: str, query: str, budget_ms: Optional[float] = None) -> tuple:
+        """Single-flight key: the normalized query, its budget and the components that shape its answer."""
+        components = (self.retriever, self.reranker, self.generator, self.cascade, self.packer, self.answer_cache)
+        return (kind, normalize_query(query), budget_ms) + tuple(id(c) for c in components)
+
+    def _deadline(self, budget_ms: Optional[float]) -> Optional[Deadline]:
+        return None if budget_ms is None else self.degradation.start(budget_ms)
+
+    def _record_shared(self, trace: Optional[QueryTrace], start: float, shared: bool):
+        if trace is not None and shared:
+            trace.record("coalesced", (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def _record_first_token(trace: Optional[QueryTrace], generate_start: float, cached: bool):
+        if trace is not None:
+            trace.record("first_token", (time.perf_counter() - generate_start) * 1000, cached=cached)
+
+    def run(self, query: str, trace: Optional[QueryTrace] = None, budget_ms: Optional[float] = None):
+        """
+        Answer a query; pass a QueryTrace to get per-stage timings and the cascade decision
+        (a query that joined an in-flight twin gets a single "coalesced" record instead).
+        With budget_ms the query degrades by the DegradationPolicy to answer within that many
+        milliseconds; each degradation applied is recorded in the trace as a "degrade" stage.
+        """
+        trace = self.instrumentation.start(query, trace)
+        deadline = self._deadline(budget_ms)
+        try:
+            if not self.coalesce:
+                answer = self._run(query, trace, deadline)
+            else:
+                start = time.perf_counter()
+                answer, shared = self.single_flight.do(self._flight_key("run", query, budget_ms),
+                                                       lambda: self._run(query, trace, deadline))
+                self._record_shared(trace, start, shared)
+        except BaseException as e:
+            self.instrumentation.finish(trace, e)
+            raise
+        self.instrumentation.finish(trace)
+        return answer
 
-    def run(self, query: str):
-        retrieve_result = self.retriever.search(query=query)
-        print(f"Successfully retrieved {len(retrieve_result)} articles.")
-        reranker_result = self.reranker.rerank(query=query, articles=retrieve_result)
-        print(f"Successfully reranked and left {len(reranker_result)} articles.")
+    def _run(self, query: str, trace: Optional[QueryTrace], deadline: Optional[Deadline] = None):
+        reranker_result = self._retrieve_and_rerank(query, trace, deadline)
+        cached, embedding = self._cached_answer(query, reranker_result, trace)
+        if cached is not None:
+            return cached
+        if deadline is not None:
+            return self._generate_within(query, reranker_result, trace, deadline, embedding)
+
+        start = time.perf_counter()
         generate_result = self.generator.generate(query = query, articles=reranker_result)
-        print("Successfully generated response.")
+        if trace is not None:
+            trace.record("generate", (time.perf_counter() - start) * 1000)
+        self._cache_answer(query, reranker_result, generate_result, embedding)
+        return generate_result
+
+    def _generate_within(self, query: str, articles: List[Article], trace: Optional[QueryTrace],
+                         deadline: Deadline, embedding) -> str:
+        """Generate, or fall back when the budget is too short, the generator is late or it fails."""
+        if self.degradation.use_template(deadline):
+            return self._fallback(query, articles, trace, deadline, "budget")
+        start = time.perf_counter()
+        future = self.generate_executor.submit(self.generator.generate, query=query, articles=articles)
+        try:
+            generate_result = future.result(timeout=deadline.remaining_s())
+        except FutureTimeoutError:
+            return self._fallback(query, articles, trace, deadline, "timeout")
+        except Exception:
+            logger.exception("Generator failed, answering from the template")
+            return self._fallback(query, articles, trace, deadline, "error")
+        if trace is not None:
+            trace.record("generate", (time.perf_counter() - start) * 1000)
+        self._cache_answer(query, articles, generate_result, embedding)
+        return generate_result
+
+    def run_stream(self, query: str, trace: Optional[QueryTrace] = None,
+                   budget_ms: Optional[float] = None) -> Iterator[dict]:
+        """
+        Answer a query as a stream of events:
+            {"event": "retrieval", "articles": [...]}    the references, before generation starts
+            {"event": "token", "text": "..."}            answer pieces as the generator produces them
+            {"event": "done", "answer": "...", "sources": [...], "ttft_ms": ..., "total_ms": ...,
+             "degraded": [...]}
+        With coalesce, a query joining an in-flight twin replays its events so far, then follows along.
+        With budget_ms the first token is due within the budget (the fallback answer is sent if the
+        generator has not produced one by then); "degraded" lists the degradations applied.
+        """
+        trace = self.instrumentation.start(query, trace)
+        deadline = self._deadline(budget_ms)
+        try:
+            if not self.coalesce:
+                yield from self._run_stream(query, trace, deadline)
+            else:
+                start = time.perf_counter()
+                key = self._flight_key("stream", query, budget_ms)
+                shared = self.single_flight.in_flight(key)
+                yield from self.single_flight.stream(key, lambda: self._run_stream(query, trace, deadline))
+                self._record_shared(trace, start, shared)
+        except GeneratorExit:
+            self.instrumentation.finish(trace)  # the client stopped reading
+            raise
+        except BaseException as e:
+            self.instrumentation.finish(trace, e)
+            raise
+        self.instrumentation.finish(trace)
+
+    def _first_chunk_within(self, query: str, articles: List[Article], trace: Optional[QueryTrace],
+                            deadline: Deadline):
+        """(generator stream, fallback answer): the stream resumed after its first chunk if that came in time."""
+        if self.degradation.use_template(deadline):
+            return None, self._fallback(query, articles, trace, deadline, "budget")
+        stream = iter(self.generator.generate_stream(query=query, articles=articles))
+        future = self.generate_executor.submit(next, stream, None)
+        try:
+            first = future.result(timeout=deadline.remaining_s())
+        except FutureTimeoutError:
+            # close the abandoned stream (and the LLM connection behind it) once its first chunk arrives
+            close = getattr(stream, "close", None)
+            if close is not None:
+                future.add_done_callback(lambda _: close())
+            return None, self._fallback(query, articles, trace, deadline, "timeout")
+        except Exception:
+            logger.exception("Generator failed, answering from the template")
+            return None, self._fallback(query, articles, trace, deadline, "error")
+        return ([] if first is None else itertools.chain([first], stream)), None
+
+    def _run_stream(self, query: str, trace: Optional[QueryTrace],
+                    deadline: Optional[Deadline] = None) -> Iterator[dict]:
+        start = time.perf_counter()
+        reranker_result = self._retrieve_and_rerank(query, trace, deadline)
+        yield {"event": "retrieval", "articles": [_article_info(a) for a in reranker_result]}
+        cached, embedding = self._cached_answer(query, reranker_result, trace)
+
+        generate_start = time.perf_counter()
+        ttft_ms, chunks, fallback = None, [], None
+        if cached is not None:
+            stream = [cached]
+        elif deadline is None:
+            stream = self.generator.generate_stream(query=query, articles=reranker_result)
+        else:
+            stream, fallback = self._first_chunk_within(query, reranker_result, trace, deadline)
+            if fallback is not None:
+                stream = [fallback]
+        for chunk in stream:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+                self._record_first_token(trace, generate_start, cached is not None)
+            chunks.append(chunk)
+            yield {"event": "token", "text": chunk}
+        if cached is None and fallback is None:
+            if trace is not None:
+                trace.record("generate", (time.perf_counter() - generate_start) * 1000, ttft_ms=ttft_ms,
+                             streamed=True)
+            self._cache_answer(query, reranker_result, "".join(chunks), embedding)
+
+        yield {
+            "event": "done",
+            "answer": "".join(chunks),
+            "sources": [a.link for a in reranker_result if a.link],
+            "ttft_ms": ttft_ms,
+            "total_ms": (time.perf_counter() - start) * 1000,
+            "degraded": [] if deadline is None else list(deadline.degraded),
+        }
+
+    # --- asyncio ---
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="rag-cpu")
+        return self._executor
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _stage(self, stage: str, awaitable):
+        """Await one stage under its timeout."""
+        timeout = self.stage_timeouts.get(stage)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise StageTimeoutError(stage, timeout) from None
+
+    async def _aretrieve_and_rerank(self, query: str, trace: Optional[QueryTrace],
+                                    deadline: Optional[Deadline] = None) -> List[Article]:
+        # a timed-out CPU stage keeps its worker thread until it finishes; only the query gives up on it
+        loop = asyncio.get_running_loop()
+        retrieve_result = await self._stage("retrieve", loop.run_in_executor(
+            self.executor, partial(self._retrieve, query, trace, deadline)))
+        # the rerank records into a scratch trace, merged only if it finishes in time: an abandoned
+        # rerank must not write into a trace that has already gone to the sinks
+        scratch = None if trace is None else QueryTrace(query)
+        rerank = loop.run_in_executor(self.executor, partial(self._rerank, query, retrieve_result, scratch, deadline))
+        if deadline is None:
+            reranker_result = await self._stage("rerank", rerank)
+        else:
+            reranker_result = await self._rerank_within(retrieve_result, trace, deadline, rerank)
+        if scratch is not None and rerank.done() and not rerank.cancelled():
+            trace.merge(scratch)
+        if self.packer is None:
+            return reranker_result
+        return await loop.run_in_executor(self.executor, partial(self._pack, query, reranker_result, trace))
+
+    async def _rerank_within(self, retrieve_result, trace: Optional[QueryTrace], deadline: Deadline, rerank):
+        """Await the rerank until the deadline or its stage timeout; past either, keep the retrieval order."""
+        start = time.perf_counter()
+        limit = deadline.remaining_s()
+        timeout = self.stage_timeouts.get("rerank")
+        if timeout is not None:
+            limit = min(limit, timeout)
+        try:
+            return await asyncio.wait_for(rerank, limit)
+        except asyncio.TimeoutError:
+            self._degrade(deadline, trace, "skip_rerank", reason="timeout")
+            return self._retrieval_order(retrieve_result, trace, start)
+
+    def _generate_timeout(self, deadline: Deadline, generate_start: float) -> float:
+        """Seconds left to generate: the deadline, or the generate stage timeout if that comes first."""
+        remaining = deadline.remaining_s()
+        timeout = self.stage_timeouts.get("generate")
+        if timeout is None:
+            return remaining
+        return min(remaining, timeout - (time.perf_counter() - generate_start))
+
+    async def _agenerate_within(self, query: str, articles: List[Article], trace: Optional[QueryTrace],
+                                deadline: Deadline, embedding) -> str:
+        if self.degradation.use_template(deadline):
+            return self._fallback(query, articles, trace, deadline, "budget")
+        start = time.perf_counter()
+        try:
+            generate_result = await asyncio.wait_for(self.generator.agenerate(query=query, articles=articles),
+                                                     self._generate_timeout(deadline, start))
+        except asyncio.TimeoutError:
+            return self._fallback(query, articles, trace, deadline, "timeout")
+        except Exception:
+            logger.exception("Generator failed, answering from the template")
+            return self._fallback(query, articles, trace, deadline, "error")
+        if trace is not None:
+            trace.record("generate", (time.perf_counter() - start) * 1000)
+        self._cache_answer(query, articles, generate_result, embedding)
         return generate_result
-        
 
+    async def _acached_answer(self, query: str, articles: List[Article], trace: Optional[QueryTrace]):
+        if self.answer_cache is None:
+            return None, None
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(self._cached_answer, query, articles, trace))
+
+    def _async_flight(self) -> AsyncSingleFlight:
+        loop = asyncio.get_running_loop()
+        flight = self._async_flights.get(loop)
+        if flight is None:
+            flight = self._async_flights[loop] = AsyncSingleFlight()
+        return flight
+
+    async def arun(self, query: str, trace: Optional[QueryTrace] = None, budget_ms: Optional[float] = None) -> str:
+        """
+        run() for asyncio: retrieve and rerank run in the executor, generation awaits the generator's
+        agenerate (an async HTTP client for OpenAIChatGenerator), so one worker can hold hundreds of
+        queries waiting on the LLM. At most max_concurrency queries run at once; coalesced queries
+        wait on their twin without taking a slot. The budget_ms includes the wait for a slot; under a
+        budget a rerank or generation that runs out of time degrades instead of raising StageTimeoutError.
+        """
+        trace = self.instrumentation.start(query, trace)
+        deadline = self._deadline(budget_ms)
+        try:
+            if not self.coalesce:
+                answer = await self._arun(query, trace, deadline)
+            else:
+                start = time.perf_counter()
+                answer, shared = await self._async_flight().do(self._flight_key("run", query, budget_ms),
+                                                               lambda: self._arun(query, trace, deadline))
+                self._record_shared(trace, start, shared)
+        except BaseException as e:
+            self.instrumentation.finish(trace, e)
+            raise
+        self.instrumentation.finish(trace)
+        return answer
+
+    def _record_queue(self, trace: Optional[QueryTrace], start: float):
+        """Time spent waiting for a max_concurrency slot."""
+        if trace is not None:
+            trace.record("queue", (time.perf_counter() - start) * 1000)
+
+    async def _arun(self, query: str, trace: Optional[QueryTrace], deadline: Optional[Deadline] = None) -> str:
+        queued = time.perf_counter()
+        async with self._semaphore():
+            self._record_queue(trace, queued)
+            reranker_result = await self._aretrieve_and_rerank(query, trace, deadline)
+            cached, embedding = await self._acached_answer(query, reranker_result, trace)
+            if cached is not None:
+                return cached
+            if deadline is not None:
+                return await self._agenerate_within(query, reranker_result, trace, deadline, embedding)
+
+            start = time.perf_counter()
+            generate_result = await self._stage("generate", self.generator.agenerate(query=query,
+                                                                                     articles=reranker_result))
+            if trace is not None:
+                trace.record("generate", (time.perf_counter() - start) * 1000)
+            self._cache_answer(query, reranker_result, generate_result, embedding)
+            return generate_result
+
+    async def arun_stream(self, query: str, trace: Optional[QueryTrace] = None,
+                          budget_ms: Optional[float] = None) -> AsyncIterator[dict]:
+        """
+        run_stream() for asyncio, same events; the generate timeout bounds the whole stream,
+        budget_ms the time to the first token.
+        """
+        trace = self.instrumentation.start(query, trace)
+        deadline = self._deadline(budget_ms)
+        try:
+            if not self.coalesce:
+                async for event in self._arun_stream(query, trace, deadline):
+                    yield event
+            else:
+                start = time.perf_counter()
+                flight = self._async_flight()
+                key = self._flight_key("stream", query, budget_ms)
+                shared = flight.in_flight(key)
+                async for event in flight.stream(key, lambda: self._arun_stream(query, trace, deadline)):
+                    yield event
+                self._record_shared(trace, start, shared)
+        except GeneratorExit:
+            self.instrumentation.finish(trace)
+            raise
+        except BaseException as e:
+            self.instrumentation.finish(trace, e)
+            raise
+        self.instrumentation.finish(trace)
+
+    async def _arun_stream(self, query: str, trace: Optional[QueryTrace],
+                           deadline: Optional[Deadline] = None) -> AsyncIterator[dict]:
+        queued = time.perf_counter()
+        async with self._semaphore():
+            self._record_queue(trace, queued)
+            start = time.perf_counter()
+            reranker_result = await self._aretrieve_and_rerank(query, trace, deadline)
+            yield {"event": "retrieval", "articles": [_article_info(a) for a in reranker_result]}
+            cached, embedding = await self._acached_answer(query, reranker_result, trace)
+
+            generate_start = time.perf_counter()
+            timeout = self.stage_timeouts.get("generate")
+            ttft_ms, chunks, fallback = None, [], None
+            if cached is not None:
+                stream = _once(cached)
+            elif deadline is not None and self.degradation.use_template(deadline):
+                fallback = self._fallback(query, reranker_result, trace, deadline, "budget")
+                stream = _once(fallback)
+            else:
+                stream = self.generator.agenerate_stream(query=query, articles=reranker_result)
+            try:
+                while True:
+                    # until the first token, a budgeted stream falls back instead of timing out
+                    first_due = deadline is not None and ttft_ms is None and cached is None and fallback is None
+                    if first_due:
+                        remaining = max(self._generate_timeout(deadline, generate_start), 0)
+                    else:
+                        remaining = None if timeout is None else timeout - (time.perf_counter() - generate_start)
+                        if remaining is not None and remaining <= 0:
+                            raise StageTimeoutError("generate", timeout)
+                    try:
+                        chunk = await asyncio.wait_for(stream.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        if not first_due:
+                            raise StageTimeoutError("generate", timeout) from None
+                        await stream.aclose()
+                        fallback = self._fallback(query, reranker_result, trace, deadline, "timeout")
+                        stream = _once(fallback)
+                        continue
+                    except Exception:
+                        if not first_due:
+                            raise
+                        logger.exception("Generator failed, answering from the template")
+                        await stream.aclose()
+                        fallback = self._fallback(query, reranker_result, trace, deadline, "error")
+                        stream = _once(fallback)
+                        continue
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                        self._record_first_token(trace, generate_start, cached is not None)
+                    chunks.append(chunk)
+                    yield {"event": "token", "text": chunk}
+            finally:
+                await stream.aclose()
+            if cached is None and fallback is None:
+                if trace is not None:
+                    trace.record("generate", (time.perf_counter() - generate_start) * 1000, ttft_ms=ttft_ms,
+                                 streamed=True)
+                self._cache_answer(query, reranker_result, "".join(chunks), embedding)
+
+            yield {
+                "event": "done",
+                "answer": "".join(chunks),
+                "sources": [a.link for a in reranker_result if a.link],
+                "ttft_ms": ttft_ms,
+                "total_ms": (time.perf_counter() - start) * 1000,
+                "degraded": [] if deadline is None else list(deadline.degraded),
+            }
+
+    def close(self):
+        """Shut down the executor if the orchestrator created it, and the budgeted generation pool."""
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._generate_executor is not None:
+            self._generate_executor.shutdown(wait=False)
+            self._generate_executor = None
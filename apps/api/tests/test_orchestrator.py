@@ -1,19 +1,37 @@
+import io
+import json
+import time
+import asyncio
+import contextlib
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple
 from packages.rag_core.utils.article import Article
 from packages.rag_core.retriever.base import BaseRetriever
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
 from packages.rag_core.reranker.base import BaseReranker
 from packages.rag_core.generator.base import BaseGenerator
-from apps.api.src.orchestrator.rag_orchestrator import RAGOrchestrator
+from packages.rag_core.reranker.cascade import CascadePolicy
+from packages.rag_core.utils.trace import QueryTrace
+from packages.rag_core.utils.answer_cache import SemanticAnswerCache
+from packages.rag_core.generator.context_packer import ContextPacker
+from packages.rag_core.utils.instrumentation import HistogramSink, Instrumentation, JSONLogSink
+from packages.rag_core.utils.deadline import DegradationPolicy
+from packages.rag_core.generator.template import TemplateGenerator
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+from packages.rag_core.generator.openai_chat import OpenAIChatGenerator
+from packages.rag_core.tests.fake_openai_server import FakeOpenAIServer
+from apps.api.src.orchestrator.rag_orchestrator import RAGOrchestrator, StageTimeoutError
 
 
 # Dummy Retriever: return first 3 articles
 class DummyRetriever(BaseRetriever):
     def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
         return [
-            (0, 0.9, Article(title="Title 1", raw_text="Content 1")),
-            (1, 0.8, Article(title="Title 2", raw_text="Content 2")),
-            (2, 0.7, Article(title="Title 3", raw_text="Content 3"))
+            (0, 0.9, Article(text="Content 1", questions=["Title 1"])),
+            (1, 0.8, Article(text="Content 2", questions=["Title 2"])),
+            (2, 0.7, Article(text="Content 3", questions=["Title 3"]))
         ]
 
 
@@ -26,14 +44,14 @@ class DummyReranker(BaseReranker):
 # Dummy Generator: return string
 class DummyGenerator(BaseGenerator):
     def generate(self, query: str, articles: List[Article]) -> str:
-        contents = [article.raw_text for article in articles]
+        contents = [article.text for article in articles]
         return f"Generated answer for '{query}' using: {' + '.join(contents)}"
 
 
 class TestRAGOrchestrator(unittest.TestCase):
 
     def setUp(self):
-        self.retriever = DummyRetriever()
+        self.retriever = DummyRetriever(input_list=[])
         self.reranker = DummyReranker()
         self.generator = DummyGenerator()
         self.orchestrator = RAGOrchestrator(
@@ -66,6 +84,560 @@ class TestRAGOrchestrator(unittest.TestCase):
         self.assertTrue("Content 1" in generated)
 
 
+# Counting Reranker: reverses the candidates it is given
+class CountingReranker(BaseReranker):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def rerank(self, query: str, articles: List[Tuple[int, float, Article]], top_k: int = 3) -> List[Article]:
+        self.calls.append(len(articles))
+        return [a[2] for a in reversed(articles)][:top_k]
+
+
+# Scored Retriever: returns fixed scores
+class ScoredRetriever(BaseRetriever):
+    def __init__(self, scores):
+        super().__init__(input_list=[])
+        self.scores = scores
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
+        return [(i, s, Article(text=f"Content {i}", questions=[f"Q{i}"])) for i, s in enumerate(self.scores)]
+
+
+class TestRAGOrchestratorCascade(unittest.TestCase):
+    def run_with(self, scores):
+        reranker = CountingReranker()
+        policy = CascadePolicy(skip_score=0.95, skip_margin=0.05, shrink_margin=0.02, shrink_to=2)
+        orchestrator = RAGOrchestrator(ScoredRetriever(scores), reranker, DummyGenerator(), cascade=policy)
+        trace = QueryTrace("q")
+        result = orchestrator.run("q", trace=trace)
+        return result, reranker, policy, trace
+
+    def test_decisive_retrieval_skips_reranker(self):
+        result, reranker, policy, trace = self.run_with([0.98, 0.70, 0.60])
+        self.assertEqual(reranker.calls, [])
+        self.assertIn("Content 0 + Content 1 + Content 2", result)  # retrieval order kept
+        self.assertEqual(trace.stage("cascade")["action"], "skip")
+        self.assertTrue(trace.stage("rerank")["skipped"])
+        self.assertEqual(policy.stats()["skip"], 1)
+
+    def test_confident_retrieval_shrinks_candidates(self):
+        _, reranker, policy, trace = self.run_with([0.80, 0.70, 0.69, 0.68])
+        self.assertEqual(reranker.calls, [2])
+        self.assertEqual(trace.stage("cascade")["action"], "shrink")
+
+    def test_close_scores_rerank_everything(self):
+        _, reranker, policy, trace = self.run_with([0.80, 0.79, 0.78])
+        self.assertEqual(reranker.calls, [3])
+        self.assertEqual(policy.stats(), {"skip": 0, "shrink": 0, "full": 1, "skip_rate": 0.0})
+        self.assertEqual([s["stage"] for s in trace.stages], ["retrieve", "cascade", "rerank", "generate"])
+
+
+# Streaming Generator: yields the answer word by word
+class StreamingGenerator(DummyGenerator):
+    def generate_stream(self, query: str, articles: List[Article]):
+        for word in self.generate(query, articles).split(" "):
+            yield word + " "
+
+
+class TestRAGOrchestratorStream(unittest.TestCase):
+    def test_run_stream_event_order(self):
+        orchestrator = RAGOrchestrator(DummyRetriever(input_list=[]), DummyReranker(), StreamingGenerator())
+        trace = QueryTrace("q")
+        events = list(orchestrator.run_stream("q", trace=trace))
+
+        self.assertEqual(events[0]["event"], "retrieval")
+        self.assertEqual([a["question"] for a in events[0]["articles"]], ["Title 1", "Title 2"])
+        tokens = [e["text"] for e in events if e["event"] == "token"]
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual(events[-1]["event"], "done")
+        self.assertEqual(events[-1]["answer"], "".join(tokens))
+        self.assertEqual(events[-1]["answer"].strip(), orchestrator.run("q"))
+        self.assertLessEqual(events[-1]["ttft_ms"], events[-1]["total_ms"])
+        self.assertTrue(trace.stage("generate")["streamed"])
+
+    def test_non_streaming_generator_yields_one_token(self):
+        orchestrator = RAGOrchestrator(DummyRetriever(input_list=[]), DummyReranker(), DummyGenerator())
+        events = list(orchestrator.run_stream("q"))
+        self.assertEqual([e["event"] for e in events], ["retrieval", "token", "done"])
+
+
+# Fixed Retriever: the same articles (same ids) on every call
+class FixedRetriever(BaseRetriever):
+    def __init__(self):
+        super().__init__(input_list=[])
+        self.articles = [Article(text=f"Content {i}", questions=[f"Title {i}"], id=f"a{i}") for i in range(3)]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
+        return [(i, 0.9 - i / 10, a) for i, a in enumerate(self.articles)]
+
+
+# Counting Generator: counts its calls
+class CountingGenerator(StreamingGenerator):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def generate(self, query: str, articles: List[Article]) -> str:
+        self.calls += 1
+        return super().generate(query, articles)
+
+
+class TestRAGOrchestratorAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.generator = CountingGenerator()
+        self.cache = SemanticAnswerCache(DummySentenceModel(), threshold=0.9)
+        self.orchestrator = RAGOrchestrator(FixedRetriever(), DummyReranker(), self.generator,
+                                            answer_cache=self.cache)
+        self.addCleanup(self.orchestrator.close)
+
+    def test_near_identical_query_skips_generator(self):
+        first = self.orchestrator.run("how do I take the tram")
+        trace = QueryTrace("q")
+        second = self.orchestrator.run("How do I take the tram?", trace=trace)
+        self.assertEqual(second, first)
+        self.assertEqual(self.generator.calls, 1)
+        self.assertTrue(trace.stage("answer_cache")["hit"])
+        self.assertEqual(trace.stage("generate"), {})
+        self.assertEqual(self.cache.stats()["hit_rate"], 0.5)
+
+    def test_other_query_calls_generator(self):
+        self.orchestrator.run("how do I take the tram")
+        self.orchestrator.run("student visa requirements")
+        self.assertEqual(self.generator.calls, 2)
+
+    def test_reuses_the_retriever_query_embedding(self):
+        articles = [Article(text=f"Content {i}", questions=[f"tram question {i}"], id=f"a{i}") for i in range(3)]
+        retriever = FAISSRetriever(articles, model_name="dummy")
+        retriever.model = DummySentenceModel()
+        orchestrator = RAGOrchestrator(retriever, DummyReranker(), self.generator,
+                                       answer_cache=SemanticAnswerCache(threshold=0.9))  # no encoder of its own
+        self.addCleanup(orchestrator.close)
+        orchestrator.run("tram question 1")
+        calls = retriever.model.encode_calls
+        orchestrator.run("Tram question 1?")
+        self.assertEqual(retriever.model.encode_calls, calls + 1)  # the new query, once
+        self.assertEqual(self.generator.calls, 1)
+
+    def test_streams_share_the_cache(self):
+        answer = self.orchestrator.run("myki card")
+        events = list(self.orchestrator.run_stream("myki card"))
+        self.assertEqual(events[-1]["answer"], answer)
+        self.assertEqual([e["event"] for e in events], ["retrieval", "token", "done"])
+        async_answer = asyncio.run(self.orchestrator.arun("myki card"))
+        self.assertEqual(async_answer, answer)
+        self.assertEqual(self.generator.calls, 1)
+
+
+class TestRAGOrchestratorPacking(unittest.TestCase):
+    def test_generator_receives_packed_articles(self):
+        retriever = FixedRetriever()
+        retriever.articles[0].text = "Trams are free in the CBD. The weather is mild. Myki is needed elsewhere."
+        orchestrator = RAGOrchestrator(retriever, DummyReranker(), DummyGenerator(),
+                                       packer=ContextPacker(max_tokens=12, max_sentences=1))
+        trace = QueryTrace("q")
+        seen = []
+        orchestrator.generator.generate = lambda query, articles: seen.extend(articles) or "answer"
+        orchestrator.run("free trams", trace=trace)
+
+        self.assertEqual(seen[0].passage_texts(), ["Trams are free in the CBD."])
+        self.assertEqual(retriever.articles[0].passages, [])
+        report = trace.stage("pack")
+        self.assertLessEqual(report["tokens_after"], 12)
+        self.assertGreater(report["tokens_saved"], 0)
+        self.assertEqual([s["stage"] for s in trace.stages], ["retrieve", "rerank", "pack", "generate"])
+
+
+# Slow Generator: an LLM call that takes a while
+class SlowGenerator(CountingGenerator):
+    def generate(self, query: str, articles: List[Article]) -> str:
+        time.sleep(0.2)
+        return super().generate(query, articles)
+
+
+class TestRAGOrchestratorCoalescing(unittest.TestCase):
+    def setUp(self):
+        self.generator = SlowGenerator()
+        self.orchestrator = RAGOrchestrator(FixedRetriever(), DummyReranker(), self.generator, coalesce=True)
+        self.addCleanup(self.orchestrator.close)
+
+    def test_identical_concurrent_queries_share_one_run(self):
+        traces = [QueryTrace("q") for _ in range(8)]
+        queries = ["墨尔本 电车", " 墨尔本  电车"] * 4  # same after normalize_query
+        with ThreadPoolExecutor(8) as pool:
+            answers = list(pool.map(lambda args: self.orchestrator.run(*args), zip(queries, traces)))
+        self.assertEqual(self.generator.calls, 1)
+        self.assertEqual(len(set(answers)), 1)
+        self.assertEqual(sum(1 for t in traces if t.stage("coalesced")), 7)
+
+    def test_different_queries_are_not_coalesced(self):
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(self.orchestrator.run, ["tram", "bus"]))
+        self.assertEqual(self.generator.calls, 2)
+
+    def test_streams_share_one_generation(self):
+        with ThreadPoolExecutor(4) as pool:
+            streams = list(pool.map(lambda q: list(self.orchestrator.run_stream(q)), ["tram"] * 4))
+        self.assertEqual(self.generator.calls, 1)
+        self.assertTrue(all(events == streams[0] for events in streams))
+        self.assertEqual(streams[0][-1]["event"], "done")
+
+    def test_disabled_by_default(self):
+        orchestrator = RAGOrchestrator(FixedRetriever(), DummyReranker(), self.generator)
+        with ThreadPoolExecutor(2) as pool:
+            list(pool.map(orchestrator.run, ["tram", "tram"]))
+        self.assertEqual(self.generator.calls, 2)
+
+
+# Failing Generator: the LLM is down
+class FailingGenerator(DummyGenerator):
+    def generate(self, query: str, articles: List[Article]) -> str:
+        raise ConnectionError("llm down")
+
+
+class TestRAGOrchestratorInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.histogram = HistogramSink()
+        self.log = io.StringIO()
+        self.instrumentation = Instrumentation([self.histogram, JSONLogSink(self.log)])
+
+    def orchestrator(self, generator=None):
+        orchestrator = RAGOrchestrator(FixedRetriever(), DummyReranker(), generator or StreamingGenerator(),
+                                       instrumentation=self.instrumentation)
+        self.addCleanup(orchestrator.close)
+        return orchestrator
+
+    def test_every_query_is_traced_without_printing(self):
+        orchestrator = self.orchestrator()
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            for _ in range(3):
+                orchestrator.run("q")
+            list(orchestrator.run_stream("q"))
+            asyncio.run(orchestrator.arun("q"))
+        self.assertEqual(stdout.getvalue(), "")
+
+        snapshot = self.histogram.snapshot()
+        self.assertEqual(snapshot["total"]["count"], 5)
+        self.assertEqual(snapshot["retrieve"]["count"], 5)
+        self.assertEqual(snapshot["rerank"]["count"], 5)
+        self.assertEqual(snapshot["first_token"]["count"], 1)
+        self.assertEqual(len(self.log.getvalue().splitlines()), 5)
+
+    def test_caller_trace_is_finished_and_emitted(self):
+        trace = QueryTrace("q")
+        self.orchestrator().run("q", trace=trace)
+        self.assertIsNotNone(trace.duration_ms)
+        self.assertEqual(json.loads(self.log.getvalue())["trace_id"], trace.trace_id)
+
+    def test_errors_are_recorded(self):
+        with self.assertRaises(ConnectionError):
+            self.orchestrator(FailingGenerator()).run("q")
+        record = json.loads(self.log.getvalue())
+        self.assertEqual(record["error"], "ConnectionError: llm down")
+        self.assertEqual(self.histogram.snapshot()["total"]["error_rate"], 1.0)
+
+    def test_abandoned_stream_is_still_emitted(self):
+        stream = self.orchestrator().run_stream("q")
+        next(stream)
+        stream.close()
+        record = json.loads(self.log.getvalue())
+        self.assertIsNone(record["error"])
+        self.assertEqual(record["stages"][-1]["stage"], "rerank")
+
+
+# Depth Retriever: returns top_k of 5 articles and remembers the depth asked for
+class DepthRetriever(BaseRetriever):
+    def __init__(self):
+        super().__init__(input_list=[])
+        self.articles = [Article(text=f"Content {i}", questions=[f"Title {i}"], id=f"a{i}") for i in range(5)]
+        self.depths = []
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
+        self.depths.append(top_k)
+        return [(i, 0.9 - i / 10, a) for i, a in enumerate(self.articles[:top_k])]
+
+
+def no_degradation(**steps):
+    """A DegradationPolicy with only the given steps enabled."""
+    thresholds = dict(reduce_retrieval_below_ms=None, truncate_rerank_below_ms=None,
+                      skip_rerank_below_ms=None, template_below_ms=None)
+    return DegradationPolicy(**{**thresholds, **steps})
+
+
+class TestRAGOrchestratorDeadline(unittest.TestCase):
+    def orchestrator(self, generator=None, policy=None):
+        self.retriever, self.reranker = DepthRetriever(), CountingReranker()
+        orchestrator = RAGOrchestrator(self.retriever, self.reranker, generator or StreamingGenerator(),
+                                       degradation=policy)
+        self.addCleanup(orchestrator.close)
+        return orchestrator
+
+    def test_generous_budget_runs_at_full_depth(self):
+        orchestrator = self.orchestrator()
+        trace = QueryTrace("q")
+        self.assertEqual(orchestrator.run("q", trace=trace, budget_ms=60000), orchestrator.run("q"))
+        self.assertEqual(self.retriever.depths, [5, 5])
+        self.assertEqual(self.reranker.calls, [5, 5])
+        self.assertEqual(trace.stage("degrade"), {})
+        events = list(orchestrator.run_stream("q", budget_ms=60000))
+        self.assertEqual(events[-1]["degraded"], [])
+
+    def test_tight_budget_degrades_every_stage(self):
+        policy = DegradationPolicy(reduced_top_k=2, reduce_retrieval_below_ms=60000, skip_rerank_below_ms=60000,
+                                   template_below_ms=60000)
+        generator = CountingGenerator()
+        orchestrator = self.orchestrator(generator, policy)
+        trace = QueryTrace("q")
+        answer = orchestrator.run("free tram", trace=trace, budget_ms=30000)
+
+        self.assertEqual(self.retriever.depths, [2])
+        self.assertEqual(self.reranker.calls, [])
+        self.assertEqual(generator.calls, 0)
+        self.assertEqual(answer, TemplateGenerator().generate("free tram", self.retriever.articles[:2]))
+        degrades = [s for s in trace.stages if s["stage"] == "degrade"]
+        self.assertEqual([d["action"] for d in degrades], ["reduce_retrieval", "skip_rerank", "template"])
+        self.assertEqual(degrades[-1]["reason"], "budget")
+        self.assertTrue(trace.stage("rerank")["skipped"])
+        self.assertTrue(trace.stage("generate")["template"])
+        stats = policy.stats()
+        self.assertEqual((stats["requests"], stats["reduce_retrieval"], stats["template"]), (1, 1, 1))
+
+    def test_truncated_rerank(self):
+        orchestrator = self.orchestrator(policy=no_degradation(truncate_rerank_below_ms=60000))
+        orchestrator.run("q", budget_ms=30000)
+        self.assertEqual(self.reranker.calls, [orchestrator.degradation.truncate_rerank_to])
+
+    def test_slow_llm_falls_back_within_budget(self):
+        generator = SlowGenerator()
+        orchestrator = self.orchestrator(generator, no_degradation())
+        trace = QueryTrace("q")
+        start = time.perf_counter()
+        answer = orchestrator.run("q", trace=trace, budget_ms=80)
+        self.assertLess(time.perf_counter() - start, 0.15)
+        self.assertIn("根据我的知识库", answer)
+        self.assertEqual(trace.stage("degrade")["reason"], "timeout")
+
+        start = time.perf_counter()
+        events = list(orchestrator.run_stream("q", budget_ms=80))
+        self.assertLess(time.perf_counter() - start, 0.15)
+        self.assertEqual([e["event"] for e in events], ["retrieval", "token", "done"])
+        self.assertEqual(events[-1]["degraded"], ["template"])
+
+    def test_late_stream_is_closed(self):
+        class SlowStream:
+            """An LLM response stream: the first chunk is slow, close() ends the connection."""
+
+            def __init__(self):
+                self.chunks = iter(["late ", "answer"])
+                self.closed = threading.Event()
+
+            def __iter__(self):
+                return self
+
+            def __next__(self):
+                time.sleep(0.2)
+                return next(self.chunks)
+
+            def close(self):
+                self.closed.set()
+
+        stream = SlowStream()
+        generator = StreamingGenerator()
+        generator.generate_stream = lambda query, articles: stream
+        events = list(self.orchestrator(generator, no_degradation()).run_stream("q", budget_ms=50))
+        self.assertEqual(events[-1]["degraded"], ["template"])
+        self.assertTrue(stream.closed.wait(1))  # once its first chunk comes, not at the end of the answer
+
+    def test_failing_llm_falls_back(self):
+        orchestrator = self.orchestrator(FailingGenerator(), no_degradation())
+        trace = QueryTrace("q")
+        with self.assertLogs("apps.api.src.orchestrator.rag_orchestrator", level="ERROR"):
+            answer = orchestrator.run("q", trace=trace, budget_ms=5000)
+        self.assertIn("根据我的知识库", answer)
+        self.assertEqual(trace.stage("degrade")["reason"], "error")
+        with self.assertRaises(ConnectionError):
+            orchestrator.run("q")  # without a budget errors still surface
+
+    def test_fallback_answers_are_not_cached(self):
+        generator = CountingGenerator()
+        orchestrator = RAGOrchestrator(FixedRetriever(), DummyReranker(), generator,
+                                       answer_cache=SemanticAnswerCache(DummySentenceModel()),
+                                       degradation=no_degradation(template_below_ms=60000))
+        self.addCleanup(orchestrator.close)
+        fallback = orchestrator.run("myki card", budget_ms=30000)
+        self.assertNotEqual(orchestrator.run("myki card"), fallback)
+        self.assertEqual(generator.calls, 1)
+
+
+# Slow Retriever: blocks like a CPU-bound search
+class SlowRetriever(DummyRetriever):
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
+        time.sleep(0.3)
+        return super().search(query, top_k)
+
+
+class TestRAGOrchestratorAsync(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = FakeOpenAIServer(delay=0.2)
+        self.base_url = self.server.start()
+        self.generator = OpenAIChatGenerator(api_key="test-key", base_url=self.base_url)
+
+    async def asyncTearDown(self):
+        await self.generator.aclose()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def orchestrator(self, retriever=None, **kwargs):
+        orchestrator = RAGOrchestrator(retriever or DummyRetriever(input_list=[]), DummyReranker(),
+                                       self.generator, **kwargs)
+        self.addCleanup(orchestrator.close)
+        return orchestrator
+
+    async def test_arun_matches_run_for_sync_generator(self):
+        orchestrator = RAGOrchestrator(DummyRetriever(input_list=[]), DummyReranker(), DummyGenerator())
+        self.addCleanup(orchestrator.close)
+        trace = QueryTrace("q")
+        self.assertEqual(await orchestrator.arun("q", trace=trace), orchestrator.run("q"))
+        self.assertEqual([s["stage"] for s in trace.stages], ["queue", "retrieve", "rerank", "generate"])
+
+    async def test_concurrent_queries_overlap_on_io(self):
+        orchestrator = self.orchestrator()
+        start = time.perf_counter()
+        answers = await asyncio.gather(*(orchestrator.arun(f"q{i}") for i in range(100)))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(answers, [self.server.reply] * 100)
+        self.assertLess(elapsed, 100 * 0.2 / 4)  # sequentially this would take 20s
+        self.assertGreater(self.server.peak_in_flight, 10)
+        self.assertLessEqual(len(self.server.connections), self.generator.max_connections)
+
+    async def test_max_concurrency_bounds_requests_in_flight(self):
+        orchestrator = self.orchestrator(max_concurrency=5)
+        await asyncio.gather(*(orchestrator.arun(f"q{i}") for i in range(20)))
+        self.assertEqual(len(self.server.requests), 20)
+        self.assertLessEqual(self.server.peak_in_flight, 5)
+
+    async def test_sequential_queries_reuse_one_connection(self):
+        self.server.delay = 0.0
+        orchestrator = self.orchestrator()
+        for i in range(5):
+            await orchestrator.arun(f"q{i}")
+        self.assertEqual(len(self.server.connections), 1)
+
+    async def test_coalesced_queries_make_one_llm_request(self):
+        orchestrator = self.orchestrator(coalesce=True)
+        answers = await asyncio.gather(*(orchestrator.arun("myki card") for _ in range(20)))
+        self.assertEqual(answers, [self.server.reply] * 20)
+        self.assertEqual(len(self.server.requests), 1)
+
+        async def consume():
+            return [e async for e in orchestrator.arun_stream("myki card")]
+        streams = await asyncio.gather(*(consume() for _ in range(5)))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertTrue(all(events == streams[0] for events in streams))
+        self.assertEqual(streams[0][-1]["answer"], self.server.reply)
+
+    async def test_generate_timeout(self):
+        orchestrator = self.orchestrator(stage_timeouts={"generate": 0.05})
+        with self.assertRaises(StageTimeoutError) as ctx:
+            await orchestrator.arun("q")
+        self.assertEqual(ctx.exception.stage, "generate")
+
+    async def test_retrieve_timeout_does_not_block_the_loop(self):
+        orchestrator = self.orchestrator(retriever=SlowRetriever(input_list=[]), stage_timeouts={"retrieve": 0.05})
+        start = time.perf_counter()
+        with self.assertRaises(StageTimeoutError) as ctx:
+            await orchestrator.arun("q")
+        self.assertEqual(ctx.exception.stage, "retrieve")
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(self.server.requests, [])
+
+    async def test_arun_stream_events(self):
+        self.server.delay = 0.0
+        orchestrator = self.orchestrator()
+        events = [e async for e in orchestrator.arun_stream("q")]
+        self.assertEqual(events[0]["event"], "retrieval")
+        self.assertEqual([e["text"] for e in events if e["event"] == "token"], self.server.tokens)
+        self.assertEqual(events[-1]["answer"], self.server.reply)
+
+    async def test_arun_stream_timeout(self):
+        self.server.token_delay = 0.2
+        orchestrator = self.orchestrator(stage_timeouts={"generate": 0.3})
+        with self.assertRaises(StageTimeoutError):
+            async for _ in orchestrator.arun_stream("q"):
+                pass
+
+    async def test_budget_falls_back_when_llm_is_slow(self):
+        orchestrator = self.orchestrator(degradation=no_degradation())
+        trace = QueryTrace("q")
+        start = time.perf_counter()
+        answer = await orchestrator.arun("q", trace=trace, budget_ms=100)
+        self.assertLess(time.perf_counter() - start, 0.18)
+        self.assertIn("根据我的知识库", answer)
+        self.assertEqual(trace.stage("degrade")["reason"], "timeout")
+
+        events = [e async for e in orchestrator.arun_stream("q", budget_ms=100)]
+        self.assertEqual([e["event"] for e in events], ["retrieval", "token", "done"])
+        self.assertEqual(events[-1]["degraded"], ["template"])
+        self.assertEqual(orchestrator.degradation.stats()["template_rate"], 1.0)
+
+    async def test_budget_bounds_only_the_first_token(self):
+        self.server.delay, self.server.token_delay = 0.0, 0.15
+        orchestrator = self.orchestrator(degradation=no_degradation())
+        events = [e async for e in orchestrator.arun_stream("q", budget_ms=250)]  # the stream takes 0.45s
+        self.assertEqual([e["text"] for e in events if e["event"] == "token"], self.server.tokens)
+        self.assertEqual(events[-1]["degraded"], [])
+
+    async def test_slow_rerank_keeps_retrieval_order(self):
+        class SlowReranker(DummyReranker):
+            def rerank(self, query, articles, top_k=2):
+                time.sleep(0.3)
+                return super().rerank(query, articles, top_k)
+
+        orchestrator = RAGOrchestrator(DummyRetriever(input_list=[]), SlowReranker(), DummyGenerator(),
+                                       degradation=no_degradation())
+        self.addCleanup(orchestrator.close)
+        start = time.perf_counter()
+        answer = await orchestrator.arun("q", budget_ms=100)
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertIn("Content 1", answer)
+        self.assertEqual(orchestrator.degradation.stats()["skip_rerank"], 1)
+
+        # a rerank stage timeout inside a generous budget degrades the same way
+        orchestrator = RAGOrchestrator(DummyRetriever(input_list=[]), SlowReranker(), DummyGenerator(),
+                                       degradation=no_degradation(), stage_timeouts={"rerank": 0.05})
+        self.addCleanup(orchestrator.close)
+        trace = QueryTrace("q")
+        start = time.perf_counter()
+        await orchestrator.arun("q", trace=trace, budget_ms=5000)
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(trace.stage("degrade")["action"], "skip_rerank")
+
+        # the abandoned rerank finishing later leaves the (already emitted) trace alone
+        stages = list(trace.stages)
+        await asyncio.sleep(0.35)
+        self.assertEqual(trace.stages, stages)
+        self.assertEqual([s["stage"] for s in stages].count("rerank"), 1)
+
+    async def test_budgeted_rerank_is_traced(self):
+        orchestrator = RAGOrchestrator(DummyRetriever(input_list=[]), DummyReranker(), DummyGenerator(),
+                                       degradation=no_degradation())
+        self.addCleanup(orchestrator.close)
+        trace = QueryTrace("q")
+        await orchestrator.arun("q", trace=trace, budget_ms=5000)
+        rerank = trace.stage("rerank")
+        self.assertEqual(rerank["results"], 2)
+        self.assertGreaterEqual(rerank["start_ms"], trace.stage("retrieve")["start_ms"])
+
+    def test_unknown_stage_timeout(self):
+        with self.assertRaises(ValueError):
+            RAGOrchestrator(DummyRetriever(input_list=[]), DummyReranker(), DummyGenerator(),
+                            stage_timeouts={"retrival": 1.0})
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,6 @@
+from .base import BaseEncoder
+from .sentence_transformer import SentenceTransformerEncoder
+from .onnx_encoder import ONNXEncoder, export_onnx
+from .batcher import MicroBatchEncoder
+
+__all__ = ["BaseEncoder", "SentenceTransformerEncoder", "ONNXEncoder", "export_onnx", "MicroBatchEncoder"]
@@ -0,0 +1,37 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class BaseEncoder(ABC):
+    """
+    Text -> embedding backend. encode() accepts the SentenceTransformer.encode keywords used
+    in this repo, so an encoder can be dropped in wherever a SentenceTransformer is expected.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def variant(self) -> str:
+        """Identifies backend settings that change the vectors (used in embedding cache keys)."""
+        return ""
+
+    @abstractmethod
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Raw (unnormalized) float32 embeddings, shape (len(texts), dim)."""
+        pass
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar=None, convert_to_numpy: bool = True,
+               convert_to_tensor: bool = False, normalize_embeddings: bool = False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vecs = np.asarray(self._encode(texts, batch_size), dtype="float32") if texts else np.empty((0, 0), "float32")
+        if normalize_embeddings and len(vecs):
+            vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        if single:
+            vecs = vecs[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(vecs)
+        return vecs
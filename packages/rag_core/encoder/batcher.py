@@ -0,0 +1,158 @@
+'''
+Dynamic micro-batching of concurrent encode calls.
+
+Requests from many threads / coroutines are queued; a single worker thread waits up to
+max_wait_ms after the first one arrives (or until max_batch texts are waiting) and runs
+them through the wrapped encoder as one padded batch. Every caller gets its own rows back
+through a future, so throughput under load follows batch efficiency, not request count.
+
+    encoder = MicroBatchEncoder(SentenceTransformerEncoder(model_name))
+    vecs = encoder.encode([query], normalize_embeddings=True)         # threads
+    vecs = await encoder.aencode([query], normalize_embeddings=True)  # asyncio
+    FAISSRetriever(articles, model_name, encoder=encoder)
+'''
+import time
+import queue
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import Future
+from typing import List
+
+from packages.rag_core.encoder.base import BaseEncoder
+
+
+class _Request:
+    __slots__ = ("texts", "future")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+
+
+class MicroBatchEncoder(BaseEncoder):
+    def __init__(self, encoder, max_batch: int = 32, max_wait_ms: float = 5.0):
+        """
+        encoder: anything with a SentenceTransformer-style encode() (a BaseEncoder, SentenceTransformer, ...)
+        max_batch: stop collecting once this many texts are waiting
+        max_wait_ms: how long to wait for more requests after the first one of a batch
+        """
+        super().__init__(getattr(encoder, "model_name", ""))
+        self.encoder = encoder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.counters = {"requests": 0, "batches": 0, "texts": 0}
+
+    @property
+    def variant(self) -> str:
+        return getattr(self.encoder, "variant", "")
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatchEncoder is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="micro-batch-encoder", daemon=True)
+                self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queue texts for encoding; the future resolves to their raw (n, dim) float32 embeddings."""
+        self._ensure_worker()
+        request = _Request(list(texts))
+        if not request.texts:
+            request.future.set_result(np.empty((0, 0), dtype="float32"))
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        # a large request (an index build) is queued in chunks, so it never becomes one huge padded
+        # forward pass and concurrent queries get batches in between
+        size = max(1, min(batch_size, self.max_batch))
+        futures = [self.submit(texts[i:i + size]) for i in range(0, len(texts), size)]
+        return np.vstack([future.result() for future in futures])
+
+    async def aencode(self, sentences, normalize_embeddings: bool = False, **kwargs):
+        """Awaitable encode(); the event loop is not blocked while the batch runs."""
+        single = isinstance(sentences, str)
+        vecs = await asyncio.wrap_future(self.submit([sentences] if single else sentences))
+        if normalize_embeddings and len(vecs):
+            vecs = vecs / np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+        return vecs[0] if single else vecs
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        """The first request plus whatever arrives within max_wait, up to max_batch texts."""
+        batch, size = [first], len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # let the main loop see the shutdown after this batch
+                break
+            if not request.future.set_running_or_notify_cancel():
+                continue  # the caller gave up (e.g. an asyncio timeout) while it was queued
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            if not first.future.set_running_or_notify_cancel():
+                continue
+            batch = self._collect(first)
+            try:
+                self._encode_batch(batch)
+            except Exception as e:  # never let one bad batch stop the worker
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _encode_batch(self, batch: List[_Request]):
+        # identical texts (the same popular question from many users) are encoded once
+        unique = list(dict.fromkeys(t for request in batch for t in request.texts))
+        try:
+            vecs = np.asarray(self.encoder.encode(unique, batch_size=max(min(len(unique), self.max_batch), 1),
+                                                  convert_to_numpy=True,
+                                                  normalize_embeddings=False, show_progress_bar=False),
+                              dtype="float32")
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        with self._lock:
+            self.counters["requests"] += len(batch)
+            self.counters["batches"] += 1
+            self.counters["texts"] += len(unique)
+        row = {t: i for i, t in enumerate(unique)}
+        for request in batch:
+            request.future.set_result(vecs[[row[t] for t in request.texts]].reshape(len(request.texts), -1))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters["mean_batch"] = counters["requests"] / counters["batches"] if counters["batches"] else 0.0
+        return counters
+
+    def close(self):
+        """Finish queued requests and stop the worker thread."""
+        with self._lock:
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(None)
+            worker.join()
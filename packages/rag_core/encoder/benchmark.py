@@ -0,0 +1,98 @@
+'''
+Parity and latency checks for encoder backends.
+
+    python -m packages.rag_core.encoder.benchmark --model <model_name> --onnx-dir <dir> [--quantize] [--export]
+
+Exports the model when asked, then compares the ONNX backend against the PyTorch path:
+cosine similarity of their embeddings and p50 / p99 per-query encode latency.
+'''
+import time
+import argparse
+import numpy as np
+from typing import List, Optional
+
+from packages.rag_core.encoder.base import BaseEncoder
+
+DEFAULT_QUERIES = [
+    "如何申请学生签证", "墨尔本哪里可以办理银行卡", "How do I top up my myki card?",
+    "485签证需要什么材料", "租房押金什么时候退", "Where can international students find part-time jobs?",
+    "Medicare和OSHC有什么区别", "悉尼大学附近有哪些中餐馆",
+]
+
+
+def parity_check(reference: BaseEncoder, candidate: BaseEncoder, texts: List[str],
+                 threshold: float = 0.99) -> dict:
+    """Per-text cosine similarity between two backends' embeddings of the same texts."""
+    a = reference.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    b = candidate.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    cosine = np.sum(a * b, axis=1)
+    return {
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "threshold": threshold,
+        "passed": bool(cosine.min() >= threshold),
+    }
+
+
+def encode_latency(encoder: BaseEncoder, queries: List[str], runs: int = 100, warmup: int = 5) -> dict:
+    """Latency of encoding one query at a time (the serving path), in milliseconds."""
+    for q in queries[:warmup]:
+        encoder.encode([q], normalize_embeddings=True)
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        encoder.encode([queries[i % len(queries)]], normalize_embeddings=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": runs,
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(np.mean(timings)),
+    }
+
+
+def compare_backends(reference: BaseEncoder, candidates: dict, queries: Optional[List[str]] = None,
+                     runs: int = 100, threshold: float = 0.99) -> dict:
+    """Parity of every candidate against the reference, plus latency of all of them."""
+    queries = queries or DEFAULT_QUERIES
+    report = {"reference": encode_latency(reference, queries, runs)}
+    for name, encoder in candidates.items():
+        report[name] = encode_latency(encoder, queries, runs)
+        report[name]["parity"] = parity_check(reference, encoder, queries, threshold)
+    return report
+
+
+def main():
+    from packages.rag_core.encoder.sentence_transformer import SentenceTransformerEncoder
+    from packages.rag_core.encoder.onnx_encoder import ONNXEncoder, export_onnx
+
+    parser = argparse.ArgumentParser(description="Compare the ONNX encoder backend with the PyTorch one")
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--onnx-dir", required=True)
+    parser.add_argument("--export", action="store_true", help="export the model to --onnx-dir first")
+    parser.add_argument("--quantize", action="store_true", help="also export / benchmark the int8 model")
+    parser.add_argument("--pooling", default="mean", choices=["mean", "cls"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--runs", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.export:
+        export_onnx(args.model, args.onnx_dir, pooling=args.pooling, quantize=args.quantize)
+
+    candidates = {"onnx_fp32": ONNXEncoder(args.onnx_dir, intra_op_threads=args.threads)}
+    if args.quantize:
+        candidates["onnx_int8"] = ONNXEncoder(args.onnx_dir, quantized=True, intra_op_threads=args.threads)
+    report = compare_backends(SentenceTransformerEncoder(args.model, device="cpu"), candidates, runs=args.runs)
+
+    for name, stats in report.items():
+        line = f"{name:<10} p50 {stats['p50_ms']:7.2f} ms   p99 {stats['p99_ms']:7.2f} ms"
+        if "parity" in stats:
+            parity = stats["parity"]
+            line += f"   cosine min {parity['min_cosine']:.4f} mean {parity['mean_cosine']:.4f}"
+            line += "" if parity["passed"] else "   PARITY FAILED"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
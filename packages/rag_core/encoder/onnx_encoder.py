@@ -0,0 +1,156 @@
+'''
+ONNX Runtime encoder backend for CPU serving:
+- export_onnx: export a HuggingFace / sentence-transformers model to ONNX, with optional
+  dynamic int8 quantisation of the weights
+- ONNXEncoder: runs the exported model under ONNX Runtime with mean or CLS pooling,
+  batching texts of similar length together to keep padding small
+
+onnxruntime (and onnx for quantisation) are optional dependencies:
+    pip install onnxruntime onnx
+'''
+import os
+import json
+import numpy as np
+from typing import List, Optional
+
+from packages.rag_core.encoder.base import BaseEncoder
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+POOLING_MODES = ("mean", "cls")
+MODEL_FILE = "model.onnx"
+QUANTIZED_FILE = "model.int8.onnx"
+CONFIG_FILE = "encoder.json"
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on (its affinity mask where the OS has one, e.g. Linux)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _require_onnxruntime():
+    if ort is None:
+        raise ImportError("onnxruntime is not installed; pip install onnxruntime onnx")
+
+
+def export_onnx(model_name: str, output_dir: str, pooling: str = "mean", max_length: int = 128,
+                quantize: bool = False, opset: int = 17) -> str:
+    """
+    Export the transformer of model_name to output_dir/model.onnx (plus model.int8.onnx with quantize),
+    next to its tokenizer and an encoder.json recording pooling / max_length.
+    Returns output_dir, ready for ONNXEncoder.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    if pooling not in POOLING_MODES:
+        raise ValueError(f"Unknown pooling '{pooling}', expected one of {POOLING_MODES}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    dummy = tokenizer(["export"], padding="max_length", max_length=8, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    class _LastHiddenState(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _LastHiddenState(model),
+            tuple(dummy[name] for name in input_names),
+            os.path.join(output_dir, MODEL_FILE),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False,
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(os.path.join(output_dir, MODEL_FILE), os.path.join(output_dir, QUANTIZED_FILE),
+                         weight_type=QuantType.QInt8)
+
+    with open(os.path.join(output_dir, CONFIG_FILE), "w") as f:
+        json.dump({"model_name": model_name, "pooling": pooling, "max_length": max_length,
+                   "quantized": quantize}, f, indent=4)
+    return output_dir
+
+
+class ONNXEncoder(BaseEncoder):
+    def __init__(self, model_dir: str, quantized: bool = False, pooling: Optional[str] = None,
+                 max_length: Optional[int] = None, intra_op_threads: Optional[int] = None):
+        """
+        model_dir: directory written by export_onnx
+        quantized: run model.int8.onnx instead of the fp32 model
+        pooling / max_length: override the values recorded at export
+        intra_op_threads: ONNX Runtime threads per call; defaults to the cores available to
+                          this process (one query at a time is the latency-bound case)
+        """
+        _require_onnxruntime()
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), "r") as f:
+            config = json.load(f)
+        super().__init__(config["model_name"])
+        self.model_dir = model_dir
+        self.quantized = quantized
+        self.pooling = pooling or config["pooling"]
+        self.max_length = max_length or config["max_length"]
+        if self.pooling not in POOLING_MODES:
+            raise ValueError(f"Unknown pooling '{self.pooling}', expected one of {POOLING_MODES}")
+
+        model_path = os.path.join(model_dir, QUANTIZED_FILE if quantized else MODEL_FILE)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; export it with export_onnx(quantize={quantized})")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or available_cpus()
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    @property
+    def variant(self) -> str:
+        return f"onnx-{'int8' if self.quantized else 'fp32'}-{self.pooling}-{self.max_length}"
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return hidden[:, 0, :]
+        mask = attention_mask[..., None].astype("float32")
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        # length-sorted batches pad less; results are written back in input order
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            inputs = self.tokenizer([texts[i] for i in rows], padding=True, truncation=True,
+                                    max_length=self.max_length, return_tensors="np")
+            feed = {name: inputs[name].astype("int64") for name in self.input_names}
+            hidden = self.session.run(["last_hidden_state"], feed)[0]
+            pooled = self._pool(hidden, inputs["attention_mask"])
+            if out is None:
+                out = np.empty((len(texts), pooled.shape[1]), dtype="float32")
+            out[rows] = pooled
+        return out
@@ -0,0 +1,23 @@
+import numpy as np
+from typing import List
+
+from packages.rag_core.encoder.base import BaseEncoder
+from packages.rag_core.utils.model_registry import get_model
+
+
+class SentenceTransformerEncoder(BaseEncoder):
+    """The PyTorch SentenceTransformer path, loaded on first use and shared through the model registry."""
+
+    def __init__(self, model_name: str, device: str = None):
+        super().__init__(model_name)
+        self.device = device
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_model("sentence_transformer", self.model_name, self.device)
+        return self._model
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
@@ -1,5 +1,7 @@
+import asyncio
 from packages.rag_core.utils.article import Article
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator
 
 class BaseGenerator(ABC):
     
@@ -8,4 +10,36 @@ class BaseGenerator(ABC):
 
     @abstractmethod
     def generate(self, query: str, articles: list[Article]) -> str:
-        pass
\ No newline at end of file
+        """
+        Answer the query from the articles. Build the context from article.passage_texts():
+        the passages retrieval matched, or the whole text when there are none.
+        """
+        pass
+
+    def generate_stream(self, query: str, articles: list[Article]) -> Iterator[str]:
+        """
+        Yield the answer in pieces as they are produced; joined they equal generate().
+        Generators that can stream (LLM APIs) override this; the default yields the whole answer once.
+        """
+        yield self.generate(query, articles)
+
+    async def agenerate(self, query: str, articles: list[Article]) -> str:
+        """
+        Async variant of generate. The default runs generate() in a worker thread;
+        HTTP-based generators override it with an async client.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.generate, query, articles)
+
+    async def agenerate_stream(self, query: str, articles: list[Article]) -> AsyncIterator[str]:
+        """
+        Async variant of generate_stream. The default pulls the sync iterator in a worker thread
+        so the event loop is never blocked; HTTP-based generators override it with an async client.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = self.generate_stream(query, articles)
+        done = object()
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
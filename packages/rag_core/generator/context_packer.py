@@ -0,0 +1,173 @@
+'''
+This is the context-packing stage between reranker and generator:
+- counts tokens for the target model (tiktoken when installed, else an estimate)
+- merges overlapping matched passages and drops sentences already used by a better-ranked article
+- trims each article to its most query-relevant sentences (lexical overlap with the query)
+- fills a token budget round-robin: every article's best sentence first, then the second best, ...
+The packed articles are copies whose .passages are the kept sentences, so generators that build
+their prompt from Article.passage_texts() need no change.
+'''
+import copy
+import math
+import re
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.chunking import split_sentences
+from packages.rag_core.utils.text import normalize_query, tokenize
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_estimate_pattern = re.compile(r"[㐀-䶿一-鿿豈-﫿]|[A-Za-z0-9]+|[^\sA-Za-z0-9㐀-䶿一-鿿豈-﫿]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: one per CJK character or symbol, one per four letters of a latin word."""
+    count = 0
+    for piece in _estimate_pattern.findall(text):
+        count += math.ceil(len(piece) / 4) if piece[0].isascii() and piece[0].isalnum() else 1
+    return count
+
+
+def token_counter(model: Optional[str] = None) -> Callable[[str], int]:
+    """Token counting function for an OpenAI model name; falls back to estimate_tokens without tiktoken."""
+    if tiktoken is None or not model:
+        return estimate_tokens
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+def _merge_spans(spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Union of (start, end) spans, sorted; overlapping or touching spans become one."""
+    merged = []
+    for start, end in sorted(tuple(s) for s in spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class ContextPacker:
+    def __init__(self, model: Optional[str] = "gpt-3.5-turbo", max_tokens: int = 1500, max_sentences: int = 5,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        model: target model whose tokenizer counts the budget (ignored when count_tokens is given)
+        max_tokens: budget for the whole context (article questions, links, tags and kept sentences)
+        max_sentences: most sentences kept per article
+        count_tokens: custom token counter, e.g. lambda t: len(hf_tokenizer.encode(t)) for a local model
+        """
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        self.model = model
+        self.max_tokens = max_tokens
+        self.max_sentences = max_sentences
+        self.count_tokens = count_tokens or token_counter(model)
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self._lock = threading.Lock()
+
+    def _header_tokens(self, article: Article) -> int:
+        parts = [article.questions[0] if article.questions else "", article.link or "", ", ".join(article.tags)]
+        return self.count_tokens("\n".join(p for p in parts if p))
+
+    def _sentences(self, article: Article) -> List[Tuple[int, int]]:
+        """Sentence spans of the article's matched passages (merged) or of its whole text."""
+        spans = _merge_spans(article.passages) if article.passages else [(0, len(article.text or ""))]
+        sentences = []
+        for start, end in spans:
+            for s, e in split_sentences(article.text[start:end]):
+                sentence = article.text[start + s:start + e]
+                s += len(sentence) - len(sentence.lstrip())
+                e -= len(sentence) - len(sentence.rstrip())
+                sentences.append((start + s, start + e))
+        return sentences
+
+    def _ranked(self, query_tokens: set, article: Article, sentences: List[Tuple[int, int]]):
+        """Sentences by query overlap (ties keep text order), at most max_sentences."""
+        def overlap(span):
+            tokens = set(tokenize(article.text[span[0]:span[1]]))
+            return len(query_tokens & tokens) / len(query_tokens) if query_tokens else 0.0
+        order = sorted(range(len(sentences)), key=lambda i: (-overlap(sentences[i]), i))
+        return [sentences[i] for i in order[:self.max_sentences]]
+
+    def pack(self, query: str, articles: List[Article]) -> Tuple[List[Article], dict]:
+        """
+        Packed copies of articles (reranker order, articles that did not fit dropped) and a report:
+        tokens_before / tokens_after / tokens_saved, articles_before / articles_after, duplicates.
+        """
+        query_tokens = set(tokenize(query))
+        headers = [self._header_tokens(a) for a in articles]
+        tokens_before = sum(headers) + sum(self.count_tokens(t) for a in articles for t in a.passage_texts())
+
+        seen, duplicates, candidates = set(), 0, []
+        for article in articles:
+            unique = []
+            for span in self._sentences(article):
+                key = normalize_query(article.text[span[0]:span[1]])
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                unique.append(span)
+            candidates.append(self._ranked(query_tokens, article, unique))
+
+        used = 0
+        included = [False] * len(articles)
+        kept = [[] for _ in articles]
+        for rank in range(max((len(c) for c in candidates), default=0) + 1):
+            for i, article in enumerate(articles):
+                if rank == 0 and not candidates[i]:
+                    # nothing left to quote (no text, or all of it already quoted): the header alone
+                    if used + headers[i] <= self.max_tokens and article.questions:
+                        included[i] = True
+                        used += headers[i]
+                    continue
+                if rank >= len(candidates[i]) or (rank > 0 and not included[i]):
+                    continue
+                span = candidates[i][rank]
+                cost = self.count_tokens(article.text[span[0]:span[1]]) + (0 if included[i] else headers[i])
+                if used + cost <= self.max_tokens or used == 0:
+                    # the best article always keeps its best sentence, even over budget
+                    kept[i].append(span)
+                    included[i] = True
+                    used += cost
+
+        packed = []
+        for i, article in enumerate(articles):
+            if not included[i]:
+                continue
+            article = copy.copy(article)
+            article.passages = sorted(kept[i]) or ([(0, 0)] if article.text else [])
+            packed.append(article)
+
+        report = {
+            "tokens_before": tokens_before,
+            "tokens_after": used,
+            "tokens_saved": max(tokens_before - used, 0),
+            "articles_before": len(articles),
+            "articles_after": len(packed),
+            "duplicates": duplicates,
+        }
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += used
+        return packed, report
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": max(self.tokens_before - self.tokens_after, 0),
+            "saved_rate": 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0,
+        }
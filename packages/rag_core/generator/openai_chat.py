@@ -0,0 +1,168 @@
+'''
+This is a Generator that:
+- calls an OpenAI-compatible /chat/completions endpoint (OpenAI, vLLM, Ollama, ...) over httpx
+- builds the prompt from the passages retrieval matched (Article.passage_texts()),
+  in the format of ai_sample/module4_answer_generation.py
+- streams the answer token by token (server-sent events), from threads or asyncio
+'''
+import os
+import json
+from typing import AsyncIterator, Iterator, List, Optional
+
+from packages.rag_core.utils.article import Article
+from packages.rag_core.generator.base import BaseGenerator
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+SYSTEM_PROMPT = "你是一个专业的墨尔本生活助手。"
+_DONE = object()
+
+
+def build_prompt(query: str, articles: List[Article]) -> str:
+    """User prompt with the articles' matched passages as numbered references."""
+    context_text = ""
+    for i, article in enumerate(articles, 1):
+        context_text += f"\n参考资料 {i}:\n"
+        if article.questions:
+            context_text += f"问题: {article.questions[0]}\n"
+        context_text += f"内容: {' ... '.join(article.passage_texts())}\n"
+        if article.link:
+            context_text += f"链接: {article.link}\n"
+        if article.tags:
+            context_text += f"标签: {', '.join(article.tags)}\n"
+
+    return f"""你是一个专业的墨尔本生活助手，专门回答关于墨尔本交通、生活等方面的问题。
+
+用户问题: {query}
+
+参考资料:{context_text}
+
+请根据上述参考资料，为用户提供准确、有用的中文回答。要求：
+1. 回答要简洁明了，直接解决用户问题
+2. 如果参考资料中有相关信息，请结合这些信息给出答案
+3. 如果有有用的链接，请在回答末尾提供
+4. 用友好、专业的语气回答
+5. 如果参考资料不足以回答问题，请诚实说明并给出建议
+
+回答:"""
+
+
+def _parse_sse(line: str):
+    """Text delta of one server-sent-events line; None for keep-alives / empty deltas, _DONE at the end."""
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return _DONE
+    choices = json.loads(data).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or None
+
+
+class OpenAIChatGenerator(BaseGenerator):
+    def __init__(self, model: str = "gpt-3.5-turbo", api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 500, timeout: float = 30.0,
+                 connect_timeout: float = 5.0, max_connections: int = 200, max_keepalive_connections: int = 50,
+                 system_prompt: str = SYSTEM_PROMPT):
+        """
+        api_key / base_url: default to $OPENAI_API_KEY / $OPENAI_BASE_URL (else the OpenAI API)
+        timeout: seconds per HTTP read / write (each read while streaming); connect_timeout for connecting
+        max_connections / max_keepalive_connections: size of the connection pool shared by all
+                                                    requests of this generator (per client, sync and async)
+        """
+        super().__init__()
+        if httpx is None:
+            raise ImportError("OpenAIChatGenerator requires httpx; pip install httpx")
+        self.model = model
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.system_prompt = system_prompt
+        self._client = None
+        self._async_client = None
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    def _client_options(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "headers": self._headers(),
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(max_connections=self.max_connections,
+                                   max_keepalive_connections=self.max_keepalive_connections),
+        }
+
+    @property
+    def client(self) -> "httpx.Client":
+        """Keep-alive connection pool, reused by every call from this generator."""
+        if self._client is None:
+            self._client = httpx.Client(**self._client_options())
+        return self._client
+
+    @property
+    def async_client(self) -> "httpx.AsyncClient":
+        """Async keep-alive connection pool; bound to the event loop that first uses it (aclose() when done)."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options())
+        return self._async_client
+
+    def _payload(self, query: str, articles: List[Article], stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": build_prompt(query, articles)},
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+
+    def generate(self, query: str, articles: List[Article]) -> str:
+        response = self.client.post("/chat/completions", json=self._payload(query, articles, stream=False))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    async def agenerate(self, query: str, articles: List[Article]) -> str:
+        response = await self.async_client.post("/chat/completions", json=self._payload(query, articles, stream=False))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"].strip()
+
+    def generate_stream(self, query: str, articles: List[Article]) -> Iterator[str]:
+        with self.client.stream("POST", "/chat/completions", json=self._payload(query, articles, stream=True)) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                delta = _parse_sse(line)
+                if delta is _DONE:
+                    return
+                if delta:
+                    yield delta
+
+    async def agenerate_stream(self, query: str, articles: List[Article]) -> AsyncIterator[str]:
+        async with self.async_client.stream("POST", "/chat/completions",
+                                            json=self._payload(query, articles, stream=True)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                delta = _parse_sse(line)
+                if delta is _DONE:
+                    return
+                if delta:
+                    yield delta
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
@@ -0,0 +1,47 @@
+'''
+This is a Generator that:
+- answers without an LLM, from the best article and the titles of the next ones,
+  like AnswerGenerator.generate_template_answer in ai_sample/module4_answer_generation.py
+- takes microseconds, so the orchestrator uses it when a request's latency budget
+  leaves no room for the LLM (or the LLM fails)
+'''
+from typing import List
+
+from packages.rag_core.utils.article import Article
+from packages.rag_core.generator.base import BaseGenerator
+
+
+class TemplateGenerator(BaseGenerator):
+    def __init__(self, max_related: int = 2, max_chars: int = 500):
+        """
+        max_related: further articles listed under 相关信息
+        max_chars: longest excerpt of the best article
+        """
+        super().__init__()
+        self.max_related = max_related
+        self.max_chars = max_chars
+
+    def generate(self, query: str, articles: List[Article]) -> str:
+        if not articles:
+            return f"抱歉，我没有找到关于'{query}'的相关信息。建议您查看墨尔本官方网站或咨询相关部门。"
+
+        best = articles[0]
+        content = " ... ".join(best.passage_texts())
+        if len(content) > self.max_chars:
+            content = content[:self.max_chars] + "..."
+        answer = f"根据我的知识库，关于您的问题'{query}'：\n\n{content}\n\n"
+
+        related = articles[1:1 + self.max_related]
+        if related:
+            answer += "相关信息：\n"
+            for i, article in enumerate(related, 1):
+                title = article.questions[0] if article.questions else ""
+                answer += f"{i}. {title} - {article.summary(100)}\n"
+            answer += "\n"
+
+        links = [a.link for a in articles[:1 + self.max_related] if a.link]
+        if links:
+            answer += "详细信息请参考：\n"
+            for i, link in enumerate(links, 1):
+                answer += f"{i}. {link}\n"
+        return answer
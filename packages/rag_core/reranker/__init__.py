@@ -1,3 +1,5 @@
 from .cross_encoder import CrossEncoderReranker
+from .late_interaction import LateInteractionReranker
+from .cascade import CascadePolicy
 
-__all__ = ["CrossEncoderReranker"]
\ No newline at end of file
+__all__ = ["CrossEncoderReranker", "LateInteractionReranker", "CascadePolicy"]
\ No newline at end of file
@@ -9,3 +9,20 @@ class BaseReranker(ABC):
     @abstractmethod
     def rerank(self, query: str, articles: List[Tuple[int, float, Article]], top_k: int = 3) -> List[Article]:
         pass
+
+    def cascade_rerank(self, query: str, articles: List[Tuple[int, float, Article]], top_k: int = 3,
+                       policy=None, trace=None) -> List[Article]:
+        """
+        rerank() behind a CascadePolicy: skipped when retrieval is decisive (retrieval order is kept),
+        limited to the top candidates when it is fairly confident. The decision goes into the trace.
+        """
+        if policy is None:
+            return self.rerank(query, articles, top_k)
+        action, info = policy.decide(articles)
+        if trace is not None:
+            trace.record("cascade", action=action, candidates=len(articles), **info)
+        if action == "skip":
+            return [art[2] for art in articles[:top_k]]
+        if action == "shrink":
+            articles = articles[:policy.shrink_to]
+        return self.rerank(query, articles, top_k)
@@ -0,0 +1,62 @@
+'''
+Score-margin cascade in front of the cross-encoder.
+
+Looks at the retrieval scores of a result list and decides:
+- "skip":   the top hit is decisive (high score and clearly ahead of the runner-up);
+            keep the retrieval order and do not run the reranker at all
+- "shrink": retrieval is fairly confident; rerank only the first shrink_to candidates
+- "full":   rerank everything
+
+Thresholds are in the retriever's score scale (cosine for FAISSRetriever, BM25 / fused
+scores otherwise), so tune them per retriever. A threshold of None disables that path.
+'''
+import threading
+from typing import List, Optional, Tuple
+
+from packages.rag_core.utils.article import Article
+
+CASCADE_ACTIONS = ("skip", "shrink", "full")
+
+
+class CascadePolicy:
+    def __init__(self, skip_score: Optional[float] = 0.95, skip_margin: float = 0.05,
+                 shrink_score: Optional[float] = None, shrink_margin: Optional[float] = 0.02, shrink_to: int = 5):
+        """
+        skip_score / skip_margin: skip reranking when top score >= skip_score and
+                                  top - second >= skip_margin (or there is only one hit)
+        shrink_score / shrink_margin: rerank only the top shrink_to hits when either is reached
+        """
+        self.skip_score = skip_score
+        self.skip_margin = skip_margin
+        self.shrink_score = shrink_score
+        self.shrink_margin = shrink_margin
+        self.shrink_to = shrink_to
+        self._lock = threading.Lock()
+        self.counters = {action: 0 for action in CASCADE_ACTIONS}
+
+    def decide(self, articles: List[Tuple[int, float, Article]]) -> Tuple[str, dict]:
+        """The action for one result list, plus the scores it was based on (for the trace)."""
+        if not articles:
+            return "skip", {"top_score": None, "margin": None}
+        top = float(articles[0][1])
+        margin = top - float(articles[1][1]) if len(articles) > 1 else float("inf")
+        info = {"top_score": top, "margin": margin}
+
+        if self.skip_score is not None and top >= self.skip_score and margin >= self.skip_margin:
+            action = "skip"
+        elif len(articles) > self.shrink_to and (
+                (self.shrink_score is not None and top >= self.shrink_score)
+                or (self.shrink_margin is not None and margin >= self.shrink_margin)):
+            action = "shrink"
+        else:
+            action = "full"
+        with self._lock:
+            self.counters[action] += 1
+        return action, info
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        total = sum(counters.values())
+        counters["skip_rate"] = counters["skip"] / total if total else 0.0
+        return counters
@@ -1,20 +1,101 @@
 from .base import BaseReranker
 from packages.rag_core.utils.article import Article
-from typing import List, Tuple
-from sentence_transformers import CrossEncoder
+from packages.rag_core.utils.lru_cache import LRUCache
+from packages.rag_core.utils.model_registry import get_model
+from packages.rag_core.utils.text import normalize_query
+from typing import List, Tuple, Optional
+import numpy as np
 
 class CrossEncoderReranker(BaseReranker):
-    model = CrossEncoder('cross-encoder/ms-marco-MiniLM-L12-v2')
+    DEFAULT_MODEL = 'cross-encoder/ms-marco-MiniLM-L12-v2'
 
-    def __init__(self, model):
+    def __init__(self, model: str = DEFAULT_MODEL, device: Optional[str] = None, cache_size: int = 65536,
+                 cache_ttl: Optional[float] = None, max_tokens: int = 256, batch_size: int = 32):
+        """
+        cache_size / cache_ttl: LRU of (query, article, passage) -> score (size 0 disables it)
+        max_tokens: passages are truncated to this many tokens before scoring
+        batch_size: pairs per forward pass; uncached pairs are sorted by length so each batch pads little
+        """
         super().__init__()
-        self.model = CrossEncoder(model)
+        self.model_name = model
+        self.device = device
+        self.max_tokens = max_tokens
+        self.batch_size = batch_size
+        self.score_cache = LRUCache(cache_size, cache_ttl) if cache_size else None
+        self._model = None
 
-    def rerank(self, query, articles, top_k) -> List[Article]:
+    @property
+    def model(self):
+        """The CrossEncoder, loaded on first use and shared through the model registry."""
+        if self._model is None:
+            self._model = get_model("cross_encoder", self.model_name, self.device)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _truncate(self, passages: List[str]) -> Tuple[List[str], List[int]]:
+        """Passages cut to max_tokens and their token counts, from a single tokenizer pass."""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+            return passages, [len(p) for p in passages]
+        encoded = tokenizer(passages, add_special_tokens=False, truncation=True, max_length=self.max_tokens,
+                            return_offsets_mapping=True)
+        truncated, lengths = [], []
+        for passage, offsets in zip(passages, encoded["offset_mapping"]):
+            truncated.append(passage[:offsets[-1][1]] if offsets else passage)
+            lengths.append(len(offsets))
+        return truncated, lengths
+
+    def _predict(self, query: str, passages: List[str]) -> np.ndarray:
+        """Scores for (query, passage) pairs, run in length-sorted batches."""
+        passages, lengths = self._truncate(passages)
+        order = np.argsort(lengths, kind="stable")
+        scores = np.empty(len(passages), dtype="float32")
+        for start in range(0, len(order), self.batch_size):
+            rows = order[start:start + self.batch_size]
+            batch = [(query, passages[i]) for i in rows]
+            scores[rows] = np.asarray(self.model.predict(batch, batch_size=len(batch), show_progress_bar=False),
+                                      dtype="float32").reshape(-1)
+        return scores
+
+    def _score(self, query: str, keys: List[Tuple], passages: List[str]) -> np.ndarray:
+        """Cached scores where available; only unseen pairs reach the model."""
+        if self.score_cache is None:
+            return self._predict(query, passages)
+
+        scores = np.array([self.score_cache.get(key, np.nan) for key in keys], dtype="float32")
+        missing = np.flatnonzero(np.isnan(scores)).tolist()
+        if missing:
+            todo = {}  # identical pairs (same article twice) are scored once
+            for i in missing:
+                todo.setdefault(keys[i], passages[i])
+            fresh = dict(zip(todo, self._predict(query, list(todo.values())).tolist()))
+            for key, score in fresh.items():
+                self.score_cache.put(key, score)
+            for i in missing:
+                scores[i] = fresh[keys[i]]
+        return scores
+
+    def rerank(self, query, articles, top_k=3) -> List[Article]:
         if not articles:
             return []
-        
-        pairs = [(query, art[2].raw_text) for art in articles]
-        scores = self.model.predict(pairs)
+
+        # one pair per matched passage (whole text when retrieval attached none), best passage wins;
+        # the model scores the same normalized query the cache is keyed on
+        query = normalize_query(query)
+        keys, passages, owners = [], [], []
+        for i, art in enumerate(articles):
+            for passage in art[2].passage_texts():
+                keys.append((self.model_name, query, art[2].id, hash(passage)))
+                passages.append(passage)
+                owners.append(i)
+        scores = np.full(len(articles), -np.inf, dtype="float32")
+        if passages:
+            np.maximum.at(scores, np.asarray(owners), self._score(query, keys, passages))
         sorted_articles = sorted(zip(articles, scores), key=lambda x: x[1], reverse=True)
         return [art[0][2] for art in sorted_articles[:top_k]]
+
+    def stats(self) -> dict:
+        return self.score_cache.stats() if self.score_cache is not None else {}
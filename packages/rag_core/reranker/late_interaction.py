@@ -0,0 +1,192 @@
+'''
+This is a Reranker that:
+- scores candidates ColBERT-style: sum over query tokens of the max similarity to any document token (MaxSim)
+- computes document token embeddings once, at index time (build), into one (n_tokens, dim) matrix
+  with per-unit offsets; fp16 by default, saved as .npy and memory-mapped on load
+- a unit is an article's questions or one passage of its text (same splitting as FAISSRetriever
+  chunk_size), so candidates carrying matched passages are scored on those passages only
+- encodes only the query at search time and scores all candidates with a few matrix ops
+'''
+import os
+import json
+import numpy as np
+from typing import List, Optional, Tuple
+
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.chunking import split_passages
+from packages.rag_core.utils.model_registry import get_model
+from packages.rag_core.reranker.base import BaseReranker
+
+STORAGE_DTYPES = ("float16", "float32")
+
+
+class LateInteractionReranker(BaseReranker):
+    def __init__(self, model_name: str, dtype: str = "float16", max_doc_tokens: int = 256,
+                 max_query_tokens: int = 32, chunk_size: Optional[int] = None, chunk_overlap: int = 50,
+                 batch_size: int = 32):
+        """
+        model_name: SentenceTransformer model whose token embeddings are used
+        dtype: storage of the document token matrix ("float16" halves memory, scores stay float32)
+        max_doc_tokens / max_query_tokens: tokens kept per unit / per query
+        chunk_size / chunk_overlap: passage splitting of article texts; match the retriever's settings
+        """
+        super().__init__()
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unknown dtype '{dtype}', expected one of {STORAGE_DTYPES}")
+        self.model_name = model_name
+        self.dtype = dtype
+        self.max_doc_tokens = max_doc_tokens
+        self.max_query_tokens = max_query_tokens
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self._model = None
+
+        self.tokens = None        # (n_tokens, dim) normalized token embeddings of every unit
+        self.offsets = None       # (n_units + 1,) start of each unit's tokens
+        self.unit_article = None  # (n_units,) article row of each unit
+        self.unit_spans = None    # (n_units, 2) passage offsets, (-1, -1) for the questions unit
+        self.article_ids = []     # article row -> article id
+        self._rows = {}           # article id -> article row
+
+    @property
+    def model(self):
+        """The SentenceTransformer, loaded on first use and shared through the model registry."""
+        if self._model is None:
+            self._model = get_model("sentence_transformer", self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _encode_tokens(self, texts: List[str], max_tokens: int) -> List[np.ndarray]:
+        """L2-normalized float32 token embeddings, (n_tokens, dim) per text."""
+        outputs = self.model.encode(texts, output_value="token_embeddings", batch_size=self.batch_size,
+                                    convert_to_numpy=True, show_progress_bar=False)
+        result = []
+        for out in outputs:
+            out = out.detach().cpu().numpy() if hasattr(out, "detach") else np.asarray(out)
+            out = out[:max_tokens].astype("float32")
+            result.append(out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12))
+        return result
+
+    def _units(self, article: Article) -> List[Tuple[str, Tuple[int, int]]]:
+        """(text, span) units of one article: its questions together, then its text or text passages."""
+        units = []
+        questions = " ".join(q for q in article.questions if q)
+        if questions:
+            units.append((questions, (-1, -1)))
+        if article.text:
+            if self.chunk_size:
+                units.extend((article.text[s:e], (s, e))
+                             for s, e in split_passages(article.text, self.chunk_size, self.chunk_overlap))
+            else:
+                units.append((article.text, (0, len(article.text))))
+        return units
+
+    def build(self, articles: List[Article]):
+        """Encode the token embeddings of every article once (index time)."""
+        texts, unit_article, unit_spans = [], [], []
+        self.article_ids = []
+        for row, article in enumerate(a for a in articles if a is not None):
+            self.article_ids.append(article.id)
+            for text, span in self._units(article):
+                texts.append(text)
+                unit_article.append(row)
+                unit_spans.append(span)
+        self._rows = {aid: row for row, aid in enumerate(self.article_ids)}
+
+        embeddings = self._encode_tokens(texts, self.max_doc_tokens) if texts else []
+        lengths = [len(e) for e in embeddings]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths)]).astype("int64")
+        dim = embeddings[0].shape[1] if embeddings else 0
+        self.tokens = (np.concatenate(embeddings) if embeddings else np.empty((0, dim))).astype(self.dtype)
+        self.unit_article = np.asarray(unit_article, dtype="int64")
+        self.unit_spans = np.asarray(unit_spans, dtype="int32").reshape(-1, 2)
+        return self
+
+    def _candidate_units(self, article: Article) -> np.ndarray:
+        """Indexed units of a candidate, restricted to its matched passages when it carries any."""
+        row = self._rows.get(article.id)
+        if row is None:
+            return np.empty(0, dtype="int64")
+        # units are stored article by article, so an article's units are one contiguous range
+        start, end = np.searchsorted(self.unit_article, [row, row + 1])
+        units = np.arange(start, end)
+        if article.passages:
+            wanted = {tuple(span) for span in article.passages}
+            matched = units[[tuple(self.unit_spans[u]) in wanted for u in units.tolist()]]
+            if len(matched):
+                return matched
+        return units
+
+    def _maxsim(self, query_tokens: np.ndarray, doc_tokens: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """MaxSim of the query against consecutive token segments beginning at starts."""
+        if len(starts) == 0:
+            return np.empty(0, dtype="float32")
+        sims = query_tokens @ doc_tokens.astype("float32").T        # (q_tokens, doc_tokens)
+        return np.maximum.reduceat(sims, starts, axis=1).sum(axis=0)  # (segments,)
+
+    def score(self, query: str, articles: List[Article]) -> np.ndarray:
+        """Late-interaction score of every article (-inf for articles without text)."""
+        if self.tokens is None:
+            raise RuntimeError("Must build (or load) the token index first")
+        query_tokens = self._encode_tokens([query], self.max_query_tokens)[0]
+
+        segments, owners = [], []
+        unindexed = [i for i, a in enumerate(articles) if a.id not in self._rows]
+        for i, article in enumerate(articles):
+            for u in self._candidate_units(article).tolist():
+                segments.append(self.tokens[self.offsets[u]:self.offsets[u + 1]])
+                owners.append(i)
+        if unindexed:
+            # articles added after build(): encoded on the fly, not stored
+            texts, text_owners = [], []
+            for i in unindexed:
+                for text, _ in self._units(articles[i]):
+                    texts.append(text)
+                    text_owners.append(i)
+            if texts:
+                segments.extend(self._encode_tokens(texts, self.max_doc_tokens))
+                owners.extend(text_owners)
+
+        scores = np.full(len(articles), -np.inf, dtype="float32")
+        keep = [j for j, seg in enumerate(segments) if len(seg)]
+        if keep:
+            lengths = [len(segments[j]) for j in keep]
+            starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype("int64")
+            unit_scores = self._maxsim(query_tokens, np.concatenate([segments[j] for j in keep]), starts)
+            np.maximum.at(scores, np.asarray([owners[j] for j in keep]), unit_scores)
+        return scores
+
+    def rerank(self, query: str, articles: List[Tuple[int, float, Article]], top_k: int = 3) -> List[Article]:
+        if not articles:
+            return []
+        scores = self.score(query, [art[2] for art in articles])
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [articles[i][2] for i in order]
+
+    # --- Persistence ---
+    def save(self, directory: str):
+        """Write the token matrix and offsets as .npy (memory-mappable) plus settings as JSON."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ("tokens", "offsets", "unit_article", "unit_spans"):
+            np.save(os.path.join(directory, f"{name}.npy"), np.asarray(getattr(self, name)))
+        with open(os.path.join(directory, "late_interaction.json"), "w", encoding="utf-8") as f:
+            json.dump({"model_name": self.model_name, "dtype": self.dtype, "max_doc_tokens": self.max_doc_tokens,
+                       "max_query_tokens": self.max_query_tokens, "chunk_size": self.chunk_size,
+                       "chunk_overlap": self.chunk_overlap, "article_ids": self.article_ids}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "LateInteractionReranker":
+        """Load a saved token index; the token matrix is memory-mapped, nothing is re-encoded."""
+        with open(os.path.join(directory, "late_interaction.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        article_ids = meta.pop("article_ids")
+        reranker = cls(**meta)
+        for name in ("tokens", "offsets", "unit_article", "unit_spans"):
+            setattr(reranker, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        reranker.article_ids = article_ids
+        reranker._rows = {aid: row for row, aid in enumerate(article_ids)}
+        return reranker
@@ -1,6 +1,7 @@
 from packages.rag_core.utils.article import Article
 from abc import ABC, abstractmethod
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+import numpy as np
 class BaseRetriever(ABC):
     def __init__(self, input_list: List[Article], model_name: str = None):
         self.articles = input_list
@@ -10,3 +11,21 @@ class BaseRetriever(ABC):
     @abstractmethod
     def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
         pass
+
+    def traced_search(self, query: str, top_k: int = 5, trace=None) -> List[Tuple[int, float, Article]]:
+        """
+        search() that also records its sub-stages (encode, ANN search, ...) into a QueryTrace.
+        Retrievers that can break their latency down override this; the default just searches.
+        """
+        return self.search(query, top_k)
+
+    def embed_query(self, query: str) -> Optional[np.ndarray]:
+        """
+        The normalized float32 query embedding this retriever searches with, for callers that
+        match queries by meaning (e.g. SemanticAnswerCache). None for retrievers without one.
+        """
+        return None
+
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[int, float, Article]]]:
+        """Retrieve top-k articles for every query. Subclasses may override with a batched version."""
+        return [self.search(query, top_k) for query in queries]
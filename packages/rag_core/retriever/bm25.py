@@ -0,0 +1,130 @@
+'''
+This is a Retriever that:
+- uses BM25 over questions + text (no neural model)
+- tokenizes Chinese as character unigrams + bigrams, latin / digits as words (utils/text.tokenize)
+- stores the inverted index as CSR postings with BM25 weights precomputed per posting,
+  so a query is a few array slices plus one np.bincount
+'''
+import os
+import json
+import numpy as np
+from collections import Counter
+from typing import List, Tuple
+
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.article_store import ArticleStore
+from packages.rag_core.utils.text import tokenize
+from packages.rag_core.retriever.base import BaseRetriever
+
+
+class BM25Retriever(BaseRetriever):
+    def __init__(self, input_list: List[Article], k1: float = 1.5, b: float = 0.75,
+                 fields: Tuple[str, ...] = ("questions", "text")):
+        """
+        k1, b: standard BM25 term-frequency saturation and length normalization
+        fields: Article fields that are indexed ("questions", "text")
+        """
+        super().__init__(input_list, model_name=None)
+
+        if not isinstance(input_list, ArticleStore) and not all(isinstance(x, Article) for x in input_list):
+            raise TypeError("input_list must be a list of Article")
+
+        self.k1 = k1
+        self.b = b
+        self.fields = tuple(fields)
+        self.vocab = {}           # term -> term id
+        self.indptr = None        # (n_terms + 1,) start of each term's postings
+        self.doc_ids = None       # (n_postings,) article index of each posting
+        self.weights = None       # (n_postings,) precomputed BM25 contribution of each posting
+        self.doc_len = None       # (n_docs,) token count per article
+
+        if not isinstance(input_list, ArticleStore):
+            self._build()
+
+    def _doc_tokens(self, article: Article) -> List[str]:
+        tokens = []
+        if "questions" in self.fields:
+            for q in article.questions:
+                tokens.extend(tokenize(q))
+        if "text" in self.fields and article.text:
+            tokens.extend(tokenize(article.text))
+        return tokens
+
+    def _build(self):
+        """Tokenize every article and lay the postings out term by term (CSR)."""
+        term_ids, doc_ids, tfs = [], [], []
+        doc_len = np.zeros(len(self.articles), dtype="float32")
+        for d, article in enumerate(self.articles):
+            counts = Counter(self._doc_tokens(article))
+            doc_len[d] = sum(counts.values())
+            for term, tf in counts.items():
+                term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                doc_ids.append(d)
+                tfs.append(tf)
+
+        term_ids = np.asarray(term_ids, dtype="int64")
+        order = np.argsort(term_ids, kind="stable")
+        term_ids = term_ids[order]
+        doc_ids = np.asarray(doc_ids, dtype="int32")[order]
+        tfs = np.asarray(tfs, dtype="float32")[order]
+
+        n_docs = len(self.articles)
+        df = np.bincount(term_ids, minlength=len(self.vocab)).astype("float32")
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(doc_len.mean()) if n_docs and doc_len.mean() > 0 else 1.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len[doc_ids] / avgdl)
+
+        self.indptr = np.concatenate([[0], np.cumsum(df)]).astype("int64")
+        self.doc_ids = doc_ids
+        self.weights = (idf[term_ids] * tfs * (self.k1 + 1) / (tfs + norm)).astype("float32")
+        self.doc_len = doc_len
+
+    def _score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate article indexes and their BM25 scores (only articles sharing a term)."""
+        query_terms = Counter(t for t in tokenize(query) if t in self.vocab)
+        if not query_terms:
+            return np.empty(0, dtype="int32"), np.empty(0, dtype="float32")
+
+        docs, weights = [], []
+        for term, qtf in query_terms.items():
+            t = self.vocab[term]
+            start, end = self.indptr[t], self.indptr[t + 1]
+            docs.append(self.doc_ids[start:end])
+            weights.append(self.weights[start:end] * qtf)
+        docs = np.concatenate(docs)
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights)).astype("float32")
+        return candidates, scores
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
+        """Retrieve top-k articles by BM25 score; articles sharing no term with the query are not returned."""
+        candidates, scores = self._score(query)
+        if len(candidates) > top_k:
+            part = np.argpartition(-scores, top_k - 1)[:top_k]
+            candidates, scores = candidates[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return [(int(candidates[i]), float(scores[i]), self.articles[int(candidates[i])]) for i in order]
+
+    # --- Persistence ---
+    def save(self, directory: str):
+        """Write postings as .npy arrays (memory-mappable), plus vocabulary, settings and articles as JSON."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ("indptr", "doc_ids", "weights", "doc_len"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "bm25.json"), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "fields": list(self.fields), "vocab": list(self.vocab)},
+                      f, ensure_ascii=False)
+        with open(os.path.join(directory, "idmap.json"), "w", encoding="utf-8") as f:
+            json.dump({str(i): a.to_dict() for i, a in enumerate(self.articles)}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "BM25Retriever":
+        """Load a saved index; postings are memory-mapped and articles materialised on demand."""
+        with open(os.path.join(directory, "bm25.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        retriever = cls(ArticleStore.from_idmap(os.path.join(directory, "idmap.json")),
+                        k1=meta["k1"], b=meta["b"], fields=tuple(meta["fields"]))
+        retriever.vocab = {term: i for i, term in enumerate(meta["vocab"])}
+        for name in ("indptr", "doc_ids", "weights", "doc_len"):
+            setattr(retriever, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        return retriever
@@ -0,0 +1,277 @@
+'''
+FAISS index backends used by FAISSRetriever.
+- flat:     exact brute-force inner product (IndexFlatIP)
+- ivf_flat: inverted file over a trained k-means quantiser, full vectors in the lists
+- hnsw:     HNSW graph over full vectors
+- ivf_pq:   inverted file with product-quantised codes (smallest, lossy)
+All indexes use inner product, so normalized embeddings give cosine scores.
+
+Vector storage for flat / ivf_flat / hnsw can be compressed with a scalar quantiser:
+- fp32: 4 bytes per dimension (default)
+- fp16: 2 bytes per dimension, practically lossless for normalized embeddings
+- int8: 1 byte per dimension, per-dimension ranges learned at train time
+
+When explicit vector ids are given, IVF indexes store them natively and the other types are
+wrapped in IndexIDMap2, so vectors can later be added and removed by id without a rebuild.
+'''
+import time
+import math
+import faiss
+import numpy as np
+from typing import Callable, Optional, List
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+STORAGE_TYPES = {
+    "fp32": None,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def _default_nlist(n: int) -> int:
+    """Rule of thumb nlist ~ 4 * sqrt(n), but never more clusters than training points."""
+    return max(1, min(n, int(4 * math.sqrt(n))))
+
+
+def _default_pq_m(dim: int) -> int:
+    """Largest divisor of dim that gives sub-vectors of at least 4 dimensions (e.g. 384 -> 96)."""
+    for m in range(dim // 4, 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    ids: Optional[np.ndarray] = None,
+    nlist: Optional[int] = None,
+    nprobe: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    ef_search: int = 64,
+    pq_m: Optional[int] = None,
+    pq_nbits: int = 8,
+    storage: str = "fp32",
+) -> faiss.Index:
+    """Build, train and fill an inner-product index of the requested type and vector storage."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index_type '{index_type}', expected one of {INDEX_TYPES}")
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown storage '{storage}', expected one of {tuple(STORAGE_TYPES)}")
+    if index_type == "ivf_pq" and storage != "fp32":
+        raise ValueError("ivf_pq already stores product-quantised codes; use storage='fp32'")
+    qtype = STORAGE_TYPES[storage]
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, dim = vectors.shape
+
+    if index_type == "flat":
+        if qtype is None:
+            index = faiss.IndexFlatIP(dim)
+        else:
+            index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+
+    elif index_type == "hnsw":
+        if qtype is None:
+            index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexHNSWSQ(dim, qtype, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+
+    else:
+        nlist = nlist or _default_nlist(n)
+        quantizer = faiss.IndexFlatIP(dim)
+        if index_type == "ivf_flat" and qtype is None:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "ivf_flat":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, qtype, faiss.METRIC_INNER_PRODUCT)
+        else:
+            pq_m = pq_m or _default_pq_m(dim)
+            if dim % pq_m != 0:
+                raise ValueError(f"pq_m={pq_m} must divide the embedding dimension {dim}")
+            # k-means on each sub-space needs at least 2**nbits points
+            pq_nbits = min(pq_nbits, max(1, int(math.log2(max(n, 2)))))
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = min(nprobe, nlist)
+
+    if not index.is_trained:
+        index.train(vectors)
+    if ids is None:
+        index.add(vectors)
+        return index
+
+    if not isinstance(index, faiss.IndexIVF):
+        index = faiss.IndexIDMap2(index)
+    index.add_with_ids(vectors, np.ascontiguousarray(ids, dtype="int64"))
+    return index
+
+
+def unwrap_index(index: faiss.Index) -> faiss.Index:
+    """The underlying index of an IndexIDMap / IndexIDMap2 wrapper (or the index itself)."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def supports_ids(index: faiss.Index) -> bool:
+    """True if vectors can be added with explicit ids (and so updated in place)."""
+    index = faiss.downcast_index(index)
+    return isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2, faiss.IndexIVF))
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Size of the index in bytes (its serialized size, which tracks the in-memory footprint)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def memory_report(index: faiss.Index) -> dict:
+    """Bytes used by the index compared with a plain float32 flat index of the same vectors."""
+    index_bytes = index_memory_bytes(index)
+    fp32_bytes = int(index.ntotal) * int(index.d) * 4
+    return {
+        "index_bytes": index_bytes,
+        "fp32_flat_bytes": fp32_bytes,
+        "compression": fp32_bytes / index_bytes if index_bytes else 0.0,
+    }
+
+
+def search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                  sel: Optional[faiss.IDSelector] = None):
+    """
+    Per-call search parameters for the given index, or None to use the index defaults.
+    Knobs that do not apply to the index type are ignored, so callers can always pass both.
+    sel restricts the scan to the selected vector ids (filter push-down).
+    """
+    index = unwrap_index(index)
+    if isinstance(index, faiss.IndexIVF) and (nprobe is not None or sel is not None):
+        params = faiss.SearchParametersIVF(nprobe=nprobe if nprobe is not None else index.nprobe)
+    elif isinstance(index, faiss.IndexHNSW) and (ef_search is not None or sel is not None):
+        params = faiss.SearchParametersHNSW(efSearch=ef_search if ef_search is not None else index.hnsw.efSearch)
+    elif sel is not None:
+        params = faiss.SearchParameters()
+    else:
+        return None
+    if sel is not None:
+        params.sel = sel
+    return params
+
+
+def id_selector(mask: np.ndarray):
+    """
+    IDSelectorBitmap over vector ids from a boolean mask.
+    Returns (selector, bits); keep `bits` alive for as long as the selector is used.
+    """
+    bits = np.packbits(mask.astype(bool), bitorder="little")
+    return faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits)), bits
+
+
+def recall_at_k(
+    index: faiss.Index,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 5,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
+    search_fn: Optional[Callable] = None,
+    live: Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Compare an approximate index against exact flat search over the same vectors.
+    search_fn(queries, top_k) -> (scores, ids) replaces index.search, e.g. to include re-scoring.
+    Vector ids are row numbers of `vectors`; `live` masks out rows that were removed from the index.
+
+    Returns {"recall": share of the exact top-k recovered, "ms_per_query": search latency}.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    live_vectors = vectors if live is None else np.ascontiguousarray(vectors[live])
+    top_k = min(top_k, len(live_vectors))
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(live_vectors)
+    truth_scores, _ = exact.search(queries, top_k)
+
+    params = search_params(index, nprobe, ef_search)
+    start = time.perf_counter()
+    if search_fn is None:
+        _, found = index.search(queries, top_k, params=params)
+    else:
+        _, found = search_fn(queries, top_k)
+    elapsed = time.perf_counter() - start
+
+    # a returned vector counts as a hit if its exact score reaches the true k-th score,
+    # so ties between equally similar vectors are not counted as misses
+    valid = found >= 0
+    exact_found = np.einsum("qkd,qd->qk", vectors[np.where(valid, found, 0)], queries)
+    kth = truth_scores[:, -1:]
+    hits = int(((exact_found >= kth - 1e-5) & valid).sum())
+    total = truth_scores.size
+    return {
+        "recall": min(hits / total, 1.0) if total else 1.0,
+        "ms_per_query": 1000 * elapsed / max(len(queries), 1),
+    }
+
+
+def sample_queries(vectors: np.ndarray, n: int = 1000, seed: int = 0) -> np.ndarray:
+    """Pick up to n stored vectors to use as self-queries when no query set is at hand."""
+    rng = np.random.default_rng(seed)
+    rows: List[int] = sorted(rng.choice(len(vectors), size=min(n, len(vectors)), replace=False))
+    return np.asarray(vectors[rows], dtype="float32")
+
+
+def aggregate_by_article(
+    scores: np.ndarray,
+    vector_ids: np.ndarray,
+    vector_to_article: np.ndarray,
+    top_k: int,
+    mode: str = "max",
+):
+    """
+    Roll vector-level hits up to article-level hits, for a whole batch at once.
+
+    scores, vector_ids: (n_queries, fetch) FAISS output; -1 ids are empty slots
+    vector_to_article:  article index for every vector id (-1 = vector no longer live)
+    mode: "max" keeps each article's best vector score, "sum" adds them up
+
+    Returns (article_scores, article_ids, distinct): two (n_queries, top_k) arrays sorted by
+    descending score, padded with -inf / -1, and the number of distinct articles seen per query.
+    """
+    if mode not in ("max", "sum"):
+        raise ValueError(f"Unknown aggregate mode '{mode}', expected 'max' or 'sum'")
+
+    n_rows = vector_ids.shape[0]
+    out_scores = np.full((n_rows, top_k), -np.inf, dtype="float32")
+    out_ids = np.full((n_rows, top_k), -1, dtype="int64")
+
+    valid = vector_ids >= 0
+    articles = np.where(valid, vector_to_article[np.where(valid, vector_ids, 0)], -1)
+    valid &= articles >= 0
+    if not valid.any():
+        return out_scores, out_ids, np.zeros(n_rows, dtype="int64")
+
+    rows = np.broadcast_to(np.arange(n_rows)[:, None], vector_ids.shape)[valid]
+    articles = articles[valid]
+    hit_scores = scores[valid].astype("float64")
+
+    # one key per (query row, article) pair
+    n_articles = int(articles.max()) + 1
+    keys, inverse = np.unique(rows.astype("int64") * n_articles + articles, return_inverse=True)
+    if mode == "max":
+        agg = np.full(len(keys), -np.inf)
+        np.maximum.at(agg, inverse, hit_scores)
+    else:
+        agg = np.bincount(inverse, weights=hit_scores, minlength=len(keys))
+
+    key_rows, key_articles = keys // n_articles, keys % n_articles
+    order = np.lexsort((-agg, key_rows))
+    key_rows, key_articles, agg = key_rows[order], key_articles[order], agg[order]
+
+    distinct = np.bincount(key_rows, minlength=n_rows)
+    rank = np.arange(len(key_rows)) - np.searchsorted(key_rows, key_rows)
+    keep = rank < top_k
+    out_scores[key_rows[keep], rank[keep]] = agg[keep]
+    out_ids[key_rows[keep], rank[keep]] = key_articles[keep]
+    return out_scores, out_ids, distinct
@@ -1,97 +1,625 @@
 '''
 This is a Retriever that: 
 - using FAISS techinique, 
-- use only the original question (no question generated)
-- use sentence-transformer
+- index every question of an article (text as fallback), hits aggregated per article
+- use sentence-transformer, or any encoder backend (e.g. ONNX Runtime, see encoder/)
+- index backend selectable: flat (exact), ivf_flat, hnsw, ivf_pq (see faiss_index.py)
+- vector storage selectable: fp32, fp16, int8, with optional float re-scoring of the top candidates
+- articles can be added / updated / removed in place, keyed by article id, without a rebuild
+- metadata filters (tags, source, language, post_date, created_at) are pushed into the FAISS scan
+- long texts can be split into passages (chunk_size), each indexed as its own vector; results
+  carry the matched passages so rerankers / generators only see the relevant parts of a page
 '''
+import os
+import copy
 import json
-import torch
+import time
 import faiss
 import numpy as np
 from typing import List, Tuple, Optional
-from sentence_transformers import SentenceTransformer
 
 from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.article_store import ArticleStore
+from packages.rag_core.utils.embedding_cache import EmbeddingCache
+from packages.rag_core.utils.lru_cache import LRUCache
+from packages.rag_core.utils.text import normalize_query
+from packages.rag_core.utils.chunking import split_passages
+from packages.rag_core.utils.model_registry import get_model
+from packages.rag_core.encoder.base import BaseEncoder
 from packages.rag_core.retriever.base import BaseRetriever
+from packages.rag_core.retriever.faiss_index import (
+    build_index, search_params, recall_at_k, sample_queries, memory_report, aggregate_by_article, supports_ids,
+    id_selector
+)
+from packages.rag_core.retriever.metadata_index import MetadataIndex
 
 
 class FAISSRetriever(BaseRetriever):
-    def __init__(self, input_list: List[Article], model_name: str):
+    def __init__(self, input_list: List[Article], model_name: str, index_type: str = "flat",
+                 rescore: bool = False, rescore_factor: int = 4, text_fallback: bool = True,
+                 aggregate: str = "max", overfetch: int = 4, cache_dir: Optional[str] = None,
+                 query_cache_size: int = 1024, query_cache_ttl: Optional[float] = None,
+                 chunk_size: Optional[int] = None, chunk_overlap: int = 50, max_passages: int = 3,
+                 encoder: Optional[BaseEncoder] = None, **index_kwargs):
+        """
+        index_type: "flat" | "ivf_flat" | "hnsw" | "ivf_pq"
+        text_fallback: index an article's text when it has no questions
+        aggregate: "max" or "sum" of an article's vector scores
+        overfetch: vectors fetched per requested article when articles have several vectors
+        cache_dir: on-disk embedding cache; only texts not seen before by this model are encoded
+        query_cache_size / query_cache_ttl: in-memory LRU of query embeddings (size 0 disables it)
+        chunk_size: split every article's text into passages of at most chunk_size characters
+                    (sharing up to chunk_overlap) and index them next to its questions
+        max_passages: matched passages attached to each returned article (Article.passages)
+        encoder: backend used instead of a SentenceTransformer of model_name (e.g. ONNXEncoder)
+        rescore: fetch top_k * rescore_factor candidates from a compressed index and re-rank
+                 them with exact scores against the stored float embeddings
+        index_kwargs: build options forwarded to faiss_index.build_index
+                      (storage, nlist, nprobe, hnsw_m, ef_construction, ef_search, pq_m, pq_nbits)
+        """
         super().__init__(input_list, model_name)
 
-        if not all(isinstance(x, Article) for x in input_list):
+        if isinstance(input_list, ArticleStore):
+            # already-serialized articles, materialised on demand
+            self.id_mapping = input_list
+        elif all(isinstance(x, Article) for x in input_list):
+            self.articles = list(input_list)  # own copy, add/remove must not touch the caller's list
+            self.id_mapping = {i: article for i, article in enumerate(self.articles)}
+        else:
             raise TypeError("input_list must be a list of Article")
 
         if not model_name:
             raise ValueError("FAISSRetriever requires a model_name.")
 
-        self.model = SentenceTransformer(self.model_name)
-        self.id_mapping = {i: article for i, article in enumerate(self.articles)}
+        self.index_type = index_type
+        self.index_kwargs = index_kwargs
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        self.text_fallback = text_fallback
+        self.aggregate = aggregate
+        self.overfetch = overfetch
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_passages = max_passages
+        self._model = encoder
+        variant = encoder.variant if encoder is not None else ""
+        self.embedding_cache = EmbeddingCache(cache_dir, model_name, normalize=True, variant=variant) if cache_dir else None
+        self.query_cache = LRUCache(query_cache_size, query_cache_ttl) if query_cache_size else None
         self.question_embeddings = None
+        self.vector_to_article = None  # article index of every indexed vector
+        self.vector_spans = None  # (start, end) text offsets of every vector, (-1, -1) for questions; chunking only
+        self._max_per_article = 1
+        self._slots = None  # article id -> article index, built on first use
+        self._metadata = None  # MetadataIndex, built on the first filtered search
         self.index = None
+        self._read_only = False
         self._is_built = False
 
-    def _encode_articles(self):
-        """Encode each article’s first question into normalized embeddings."""
-        questions = []
-        for a in self.articles:
-            if not a.questions:
-                raise ValueError(f"Article {a.id} has no questions")
-            questions.append(a.questions[0])
-
-        self.question_embeddings = self.model.encode(
-            questions,
-            convert_to_tensor=True,
+    @property
+    def model(self):
+        """The encoder: the one passed in, or the registry's shared SentenceTransformer, loaded on first use."""
+        if self._model is None:
+            self._model = get_model("sentence_transformer", self.model_name)
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _article_units(self, article: Article) -> List[Tuple[str, Tuple[int, int]]]:
+        """
+        (text, span) pairs indexed for one article: every question (span (-1, -1)), then
+        with chunking every passage of its text, otherwise its text only when there are no questions.
+        """
+        units = [(q, (-1, -1)) for q in article.questions if q]
+        if self.chunk_size and article.text:
+            units.extend(
+                (article.text[start:end], (start, end))
+                for start, end in split_passages(article.text, self.chunk_size, self.chunk_overlap)
+            )
+        elif not units and self.text_fallback and article.text:
+            units = [(article.text, (0, len(article.text)))]
+        if not units:
+            raise ValueError(f"Article {article.id} has no questions")
+        return units
+
+    def _article_texts(self, article: Article) -> List[str]:
+        return [text for text, _ in self._article_units(article)]
+
+    def _texts_for(self, slots) -> Tuple[List[str], List[int], np.ndarray]:
+        """Texts to index for the given article indexes, the owning index and the text span of each."""
+        texts, owners, spans = [], [], []
+        for i in slots:
+            units = self._article_units(self.articles[i])
+            texts.extend(text for text, _ in units)
+            spans.extend(span for _, span in units)
+            owners.extend([i] * len(units))
+        return texts, owners, np.asarray(spans, dtype="int32").reshape(-1, 2)
+
+    def _encode_texts(self, texts: List[str]) -> "torch.Tensor":
+        """Normalized embeddings for texts to index, served from the embedding cache when possible."""
+        if self.embedding_cache is None:
+            return self.model.encode(
+                texts,
+                convert_to_tensor=True,
+                normalize_embeddings=True,
+                batch_size=32,
+                show_progress_bar=True
+            )
+        vectors = self.embedding_cache.encode(texts, lambda todo: self.model.encode(
+            todo,
+            convert_to_numpy=True,
             normalize_embeddings=True,
             batch_size=32,
             show_progress_bar=True
-        )
+        ))
+        import torch  # imported where needed, importing the retriever stays cheap
+        return torch.from_numpy(vectors)
+
+    def _encode_articles(self):
+        """Encode every question of every article into normalized embeddings, one vector each."""
+        live = [i for i, a in enumerate(self.articles) if a is not None]
+        texts, owners, spans = self._texts_for(live)
+        self._set_vector_map(np.asarray(owners, dtype="int64"), spans if self.chunk_size else None)
+        self.question_embeddings = self._encode_texts(texts)
         return self.question_embeddings
 
-    def _build_index(self):
-        """Build a FAISS index (IndexFlatIP) using the encoded question embeddings."""
+    def _set_vector_map(self, vector_to_article: np.ndarray, vector_spans: Optional[np.ndarray] = None):
+        self.vector_to_article = vector_to_article
+        self.vector_spans = vector_spans
+        live = vector_to_article[vector_to_article >= 0]
+        self._max_per_article = int(np.bincount(live).max()) if len(live) else 1
+
+    def _vectors(self) -> np.ndarray:
+        """The encoded question embeddings as a float32 numpy matrix."""
         if self.question_embeddings is None:
             raise RuntimeError("Must encode articles first")
+        return self.question_embeddings.detach().cpu().numpy().astype("float32")
 
-        vectors = self.question_embeddings.detach().cpu().numpy().astype("float32")
-        dim = vectors.shape[1]
-
-        self.index = faiss.IndexFlatIP(dim)
-        self.index.add(vectors)
+    def _build_index(self):
+        """Build the configured FAISS index type; vector ids are row numbers of the embeddings."""
+        ids = np.flatnonzero(self.vector_to_article >= 0)
+        self.index = build_index(self._vectors()[ids], self.index_type, ids=ids, **self.index_kwargs)
         self._is_built = True
+        self._compact_embeddings()
+
+    def _compact_embeddings(self):
+        """
+        With a compressed storage mode the index holds the vectors: keep fp16 embeddings for
+        re-scoring, or none at all without it, so the worker really gets the memory saving.
+        """
+        if self.index_kwargs.get("storage", "fp32") == "fp32" or self.question_embeddings is None:
+            return
+        self.question_embeddings = self.question_embeddings.half() if self.rescore else None
+
+    def _reference_vectors(self) -> np.ndarray:
+        """Float embeddings of every vector id, re-encoded when they are not kept in memory."""
+        if self.question_embeddings is not None:
+            return self._vectors()
+        vector_map = np.asarray(self.vector_to_article)
+        ids = np.flatnonzero(vector_map >= 0)
+        ids = ids[np.lexsort((ids, vector_map[ids]))]  # by article, then in the order its texts were added
+        texts, _, _ = self._texts_for(sorted(set(vector_map[ids].tolist())))
+        encoded = self._encode_texts(texts).detach().cpu().numpy().astype("float32")
+        vectors = np.zeros((len(vector_map), encoded.shape[1]), dtype="float32")
+        vectors[ids] = encoded
+        return vectors
 
     def _encode_query(self, query: str) -> np.ndarray:
         """Encode a query string into a normalized float32 numpy vector."""
-        vec = self.model.encode(
-            [query],
+        return self._encode_queries([query])
+
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode a batch of queries, shape (len(queries), dim).
+        Queries are normalized first; cached ones skip the model and the rest go in one forward pass.
+        """
+        queries = [normalize_query(q) for q in queries]
+        if self.query_cache is None:
+            return self._run_query_model(queries)
+
+        cached = [self.query_cache.get(q) for q in queries]
+        missing = list(dict.fromkeys(q for q, v in zip(queries, cached) if v is None))
+        if missing:
+            fresh = dict(zip(missing, self._run_query_model(missing)))
+            for q, vec in fresh.items():
+                self.query_cache.put(q, vec)
+            cached = [v if v is not None else fresh[q] for q, v in zip(queries, cached)]
+        return np.stack(cached)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """The query vector search() used; served from the query LRU right after a search."""
+        return self._encode_queries([query])[0]
+
+    def _run_query_model(self, queries: List[str]) -> np.ndarray:
+        vecs = self.model.encode(
+            queries,
             normalize_embeddings=True,
-            convert_to_numpy=True
+            convert_to_numpy=True,
+            batch_size=32
         ).astype("float32")
-        return vec
+        return vecs
+
+    def _collect(self, scores: np.ndarray, indices: np.ndarray,
+                 vector_hits=None) -> List[List[Tuple[int, float, Article]]]:
+        """
+        Turn raw FAISS output rows into (idx, score, Article) lists, dropping empty slots (-1).
+        With vector_hits (the vector-level scores and ids), articles carry their matched passages.
+        """
+        batch = []
+        for row, (row_idx, row_scores) in enumerate(zip(indices, scores)):
+            passages = self._matched_passages(*(hits[row] for hits in vector_hits)) if vector_hits else {}
+            results = []
+            for i, score in zip(row_idx, row_scores):
+                if i < 0:
+                    continue
+                article = self.id_mapping[int(i)]
+                if int(i) in passages:
+                    article = copy.copy(article)  # the stored article is shared between queries
+                    article.passages = passages[int(i)]
+                results.append((int(i), float(score), article))
+            batch.append(results)
+        return batch
+
+    def _matched_passages(self, vector_scores: np.ndarray, vector_ids: np.ndarray) -> dict:
+        """Article index -> spans of its best-scoring passage vectors (best first, at most max_passages)."""
+        passages = {}
+        for vid, _ in sorted(zip(vector_ids.tolist(), vector_scores.tolist()), key=lambda hit: -hit[1]):
+            if vid < 0:
+                continue
+            slot = int(self.vector_to_article[vid])
+            start, end = (int(x) for x in self.vector_spans[vid])
+            if slot < 0 or start < 0:
+                continue
+            spans = passages.setdefault(slot, [])
+            if len(spans) < self.max_passages:
+                spans.append((start, end))
+        return passages
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
-        """Retrieve top-k articles given a query string."""
+    def _ensure_built(self):
         if not self._is_built:
             self._encode_articles()
             self._build_index()
 
-        vec = self._encode_query(query)  # shape: (1, dim)
-        scores, indices = self.index.search(vec, top_k)
+    def traced_search(self, query: str, top_k: int = 5, trace=None) -> List[Tuple[int, float, Article]]:
+        return self.search(query, top_k, trace=trace)
 
-        results = []
-        for i, score in zip(indices[0], scores[0]):
-            article = self.id_mapping[i]
-            results.append((int(i), float(score), article))
+    def search(self, query: str, top_k: int = 5, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+               filters: Optional[dict] = None, trace=None) -> List[Tuple[int, float, Article]]:
+        """
+        Retrieve top-k articles given a query string.
+        nprobe (IVF) and ef_search (HNSW) override the index defaults for this call only.
+        filters restrict the search to matching articles, e.g. {"tags": "交通", "post_date": {"gte": "2024-01-01"}}
+        (see metadata_index.py for the syntax).
+        trace: a QueryTrace to record the encode and ANN search stages into
+        """
+        return self.search_batch([query], top_k, nprobe=nprobe, ef_search=ef_search, filters=filters, trace=trace)[0]
+
+    def search_batch(self, queries: List[str], top_k: int = 5, nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None, filters: Optional[dict] = None,
+                     trace=None) -> List[List[Tuple[int, float, Article]]]:
+        """Retrieve top-k articles for many queries with one encode call and one FAISS search."""
+        self._ensure_built()
+
+        if not queries:
+            return []
+
+        if trace is None:
+            vecs = self._encode_queries(queries)  # shape: (len(queries), dim)
+            scores, indices, vector_hits = self._search_articles(vecs, top_k, nprobe, ef_search, filters)
+            return self._collect(scores, indices, vector_hits if self.vector_spans is not None else None)
+
+        start = time.perf_counter()
+        cached = self.query_cache is not None and all(normalize_query(q) in self.query_cache for q in queries)
+        vecs = self._encode_queries(queries)
+        trace.record("encode", (time.perf_counter() - start) * 1000, queries=len(queries), cache_hit=cached)
+
+        start = time.perf_counter()
+        scores, indices, vector_hits = self._search_articles(vecs, top_k, nprobe, ef_search, filters)
+        results = self._collect(scores, indices, vector_hits if self.vector_spans is not None else None)
+        trace.record("search", (time.perf_counter() - start) * 1000, candidates=int((vector_hits[1] >= 0).sum()),
+                     results=sum(len(r) for r in results), filtered=bool(filters))
         return results
 
+    def _metadata_index(self) -> MetadataIndex:
+        if self._metadata is None:
+            if isinstance(self.id_mapping, ArticleStore):
+                self._metadata = MetadataIndex([self.id_mapping.record(i) for i in range(len(self.id_mapping))])
+            else:
+                self._metadata = MetadataIndex.from_articles(self.articles)
+        return self._metadata
+
+    def _search_articles(self, vecs: np.ndarray, top_k: int, nprobe: Optional[int] = None,
+                         ef_search: Optional[int] = None, filters: Optional[dict] = None):
+        """
+        Article-level top-k: over-fetch vectors, aggregate per article, and widen the
+        fetch until every query has top_k distinct articles, or its search came back short
+        (the probed IVF lists / HNSW beam / filter hold no more vectors, so widening cannot help).
+        With filters, only vectors of matching articles are scanned.
+        Returns article scores, article indexes and the vector-level (scores, ids) they came from.
+        """
+        ntotal = self.index.ntotal
+        wanted = min(top_k, len(self._slot_index()))
+        sel = None
+        if filters:
+            article_mask = self._metadata_index().mask(filters)
+            wanted = min(top_k, int(article_mask.sum()))
+            if wanted == 0:
+                empty = np.full((len(vecs), top_k), -1, dtype="int64")
+                no_scores = np.full((len(vecs), top_k), -np.inf, dtype="float32")
+                return no_scores, empty, (no_scores, empty)
+            vector_map = np.asarray(self.vector_to_article)
+            vector_mask = (vector_map >= 0) & article_mask[np.maximum(vector_map, 0)]
+            sel, bits = id_selector(vector_mask)  # bits backs the selector, keep it referenced while searching
+            ntotal = int(vector_mask.sum())
+
+        fetch = min(ntotal, top_k * min(self._max_per_article, self.overfetch))
+        while True:
+            scores, vector_ids = self._search_vectors(vecs, max(fetch, 1), nprobe, ef_search, sel)
+            agg_scores, article_ids, distinct = aggregate_by_article(
+                scores, vector_ids, self.vector_to_article, top_k, self.aggregate
+            )
+            exhausted = (vector_ids >= 0).sum(axis=1) < fetch
+            if np.all((distinct >= wanted) | exhausted) or fetch >= ntotal:
+                return agg_scores, article_ids, (scores, vector_ids)
+            fetch = min(ntotal, fetch * 2)
+
+    def _search_vectors(self, vecs: np.ndarray, top_k: int, nprobe: Optional[int] = None,
+                        ef_search: Optional[int] = None, sel=None):
+        """Raw FAISS search over encoded queries, re-scored with float embeddings when enabled."""
+        params = search_params(self.index, nprobe, ef_search, sel)
+        if not self.rescore or self.question_embeddings is None:
+            return self.index.search(vecs, top_k, params=params)
+
+        _, candidates = self.index.search(vecs, top_k * self.rescore_factor, params=params)
+        return self._rescore(vecs, candidates, top_k)
+
+    def _rescore(self, vecs: np.ndarray, candidates: np.ndarray, top_k: int):
+        """Exact inner products for the candidate ids, keeping the best top_k per query."""
+        stored = self.question_embeddings.detach().cpu().numpy()  # view, may be fp16
+        valid = candidates >= 0
+        cand_vecs = stored[np.where(valid, candidates, 0)].astype("float32")
+        exact = np.einsum("qkd,qd->qk", cand_vecs, vecs)
+        exact[~valid] = -np.inf
+
+        order = np.argsort(-exact, axis=1)[:, :top_k]
+        scores = np.take_along_axis(exact, order, axis=1)
+        indices = np.take_along_axis(candidates, order, axis=1)
+        indices[~np.isfinite(scores)] = -1
+        return scores, indices
+
+    def evaluate_recall(self, queries: Optional[List[str]] = None, top_k: int = 5,
+                        nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> dict:
+        """
+        Recall@k of the current index against exact flat search, plus search latency.
+        Without queries, a sample of the indexed questions is used as self-queries.
+        Call it with different nprobe / ef_search values to pick serving settings.
+        """
+        self._ensure_built()
+        vectors = self._reference_vectors()
+        live = np.asarray(self.vector_to_article) >= 0
+        if queries:
+            query_vecs = self._encode_queries(queries)
+        else:
+            query_vecs = sample_queries(vectors[live])
+        return recall_at_k(
+            self.index, vectors, query_vecs, top_k, nprobe=nprobe, ef_search=ef_search,
+            search_fn=lambda q, k: self._search_vectors(q, k, nprobe, ef_search), live=live
+        )
+
+    def storage_report(self, queries: Optional[List[str]] = None, top_k: int = 5,
+                       nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> dict:
+        """
+        Memory used by the index plus the embeddings kept next to it vs. float32 flat,
+        and the recall@k given up for it.
+        """
+        self._ensure_built()
+        report = memory_report(self.index)
+        embeddings = self.question_embeddings
+        report["embedding_bytes"] = 0 if embeddings is None else embeddings.element_size() * embeddings.nelement()
+        report["total_bytes"] = report["index_bytes"] + report["embedding_bytes"]
+        report["index_compression"] = report["compression"]
+        report["compression"] = report["fp32_flat_bytes"] / report["total_bytes"] if report["total_bytes"] else 0.0
+        report["storage"] = self.index_kwargs.get("storage", "fp32")
+        report["rescore"] = self.rescore
+        report.update(self.evaluate_recall(queries, top_k, nprobe=nprobe, ef_search=ef_search))
+        report["recall_lost"] = 1.0 - report["recall"]
+        return report
+
+    # --- Incremental updates ---
+    def _slot_index(self) -> dict:
+        """Article id -> article index for every live article."""
+        if self._slots is None:
+            if isinstance(self.id_mapping, ArticleStore):
+                ids = self.id_mapping.article_ids()
+            else:
+                ids = [None if a is None else a.id for a in self.articles]
+            self._slots = {aid: i for i, aid in enumerate(ids) if aid is not None}
+        return self._slots
+
+    def _set_article(self, slot: int, article: Optional[Article]):
+        self._metadata = None
+        if slot == len(self.articles):
+            self.articles.append(article)
+        else:
+            self.articles[slot] = article
+        if self.id_mapping is not self.articles:
+            self.id_mapping[slot] = article
+
+    def _check_mutable(self):
+        if not self._is_built:
+            return
+        if self._read_only:
+            raise RuntimeError("Index was loaded memory-mapped read-only; load it with mmap=False to update it")
+        if not supports_ids(self.index):
+            raise RuntimeError("Index has no vector ids (built before incremental updates); rebuild and save it again")
+
+    def _index_slots(self, slots: List[int]):
+        """Encode and add the vectors of the given articles, appending new vector ids."""
+        texts, owners, spans = self._texts_for(slots)
+        if not texts:
+            return
+        new = self._encode_texts(texts)
+        # embeddings not kept (compressed storage without re-scoring, or loaded without them) stay absent
+        if self.question_embeddings is not None:
+            import torch
+            self.question_embeddings = torch.cat([self.question_embeddings.detach().cpu(),
+                                                  new.detach().cpu().to(self.question_embeddings.dtype)])
+
+        start = len(self.vector_to_article)
+        ids = np.arange(start, start + len(texts), dtype="int64")
+        vecs = new.detach().cpu().numpy().astype("float32")
+        self.index.add_with_ids(vecs, ids)
+        self._set_vector_map(
+            np.concatenate([np.asarray(self.vector_to_article), np.asarray(owners, dtype="int64")]),
+            None if self.vector_spans is None else np.concatenate([np.asarray(self.vector_spans), spans])
+        )
+
+    def _drop_vectors(self, slots: List[int]):
+        """Remove the vectors of the given articles from the index (tombstoned if it cannot delete)."""
+        vector_map = np.array(self.vector_to_article)
+        ids = np.flatnonzero(np.isin(vector_map, slots))
+        if len(ids) == 0:
+            return
+        try:
+            self.index.remove_ids(ids)
+        except RuntimeError:
+            pass  # e.g. HNSW: vectors stay in the graph but no longer map to an article
+        vector_map[ids] = -1
+        self._set_vector_map(vector_map, self.vector_spans)
+
+    def add_articles(self, articles: List[Article]) -> int:
+        """Add new articles; only they are encoded. Returns the number of vectors added."""
+        if not all(isinstance(x, Article) for x in articles):
+            raise TypeError("articles must be a list of Article")
+        self._check_mutable()
+        slots = self._slot_index()
+        new_ids = [a.id for a in articles]
+        if len(set(new_ids)) != len(new_ids):
+            raise ValueError("Duplicate article ids in articles")
+        for aid in new_ids:
+            if aid in slots:
+                raise ValueError(f"Article {aid} is already indexed; use update_articles")
+
+        before = self.index.ntotal if self._is_built else 0
+        start = len(self.articles)
+        for offset, article in enumerate(articles):
+            self._set_article(start + offset, article)
+            slots[article.id] = start + offset
+        if self._is_built:
+            self._index_slots(list(range(start, start + len(articles))))
+        return (self.index.ntotal if self._is_built else 0) - before
+
+    def update_articles(self, articles: List[Article]) -> int:
+        """
+        Replace existing articles (matched by id). Articles whose indexed texts did not change
+        only have their metadata swapped; the rest are re-encoded. Returns the number re-encoded.
+        """
+        if not all(isinstance(x, Article) for x in articles):
+            raise TypeError("articles must be a list of Article")
+        self._check_mutable()
+        slots = self._slot_index()
+        reencode = []
+        for article in articles:
+            if article.id not in slots:
+                raise KeyError(f"Article {article.id} is not indexed; use add_articles")
+            slot = slots[article.id]
+            if self._article_texts(self.articles[slot]) != self._article_texts(article):
+                reencode.append(slot)
+            self._set_article(slot, article)
+
+        if self._is_built and reencode:
+            self._drop_vectors(reencode)
+            self._index_slots(reencode)
+        return len(reencode)
+
+    def remove_articles(self, article_ids: List[str]) -> int:
+        """Remove articles by id. Returns the number of articles removed."""
+        self._check_mutable()
+        slots = self._slot_index()
+        missing = [aid for aid in article_ids if aid not in slots]
+        if missing:
+            raise KeyError(f"Articles not indexed: {missing}")
+
+        removed = [slots.pop(aid) for aid in article_ids]
+        for slot in removed:
+            self._set_article(slot, None)
+        if self._is_built:
+            self._drop_vectors(removed)
+        return len(removed)
+
+    # --- Persistence ---
+    @staticmethod
+    def _vecmap_path(index_path):
+        return f"{index_path}.vecmap.npy"
+
+    @staticmethod
+    def _spans_path(index_path):
+        return f"{index_path}.spans.npy"
+
     def save_all(self, embed_path, index_path, idmap_path):
-        """Save embeddings, FAISS index, and ID mapping to disk."""
-        torch.save(self.question_embeddings.detach().cpu(), embed_path)
+        """
+        Save embeddings, FAISS index, and ID mapping to disk.
+        The vector -> article array is written next to the index as <index_path>.vecmap.npy
+        (and, with chunking, the passage offsets of every vector as <index_path>.spans.npy);
+        vector ids in the index are row numbers of that array, removed articles are null in the id map.
+        With a compressed storage mode, embeddings are kept as fp16 (enough for re-scoring), and
+        not at all without re-scoring (embed_path is then not written).
+        """
+        if self.question_embeddings is not None:
+            import torch
+            torch.save(self.question_embeddings.detach().cpu(), embed_path)
         faiss.write_index(self.index, index_path)
+        np.save(self._vecmap_path(index_path), np.asarray(self.vector_to_article))
+        if self.vector_spans is not None:
+            np.save(self._spans_path(index_path), np.asarray(self.vector_spans))
+        if isinstance(self.id_mapping, ArticleStore):
+            idmap = self.id_mapping.to_json()
+        else:
+            idmap = {str(k): (v.to_dict() if v is not None else None) for k, v in self.id_mapping.items()}
         with open(idmap_path, 'w') as f:
-            json.dump({str(k): v.to_dict() for k, v in self.id_mapping.items()}, f, indent=4)
+            json.dump(idmap, f, indent=4)
 
-    def load_index(self, index_path):
-        """Load an existing FAISS index from disk."""
-        self.index = faiss.read_index(index_path)
+    def load_index(self, index_path, mmap: bool = False):
+        """Load an existing FAISS index from disk, optionally memory-mapped and read-only."""
+        if mmap:
+            self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        else:
+            self.index = faiss.read_index(index_path)
+        self._read_only = mmap
         self._is_built = True
+
+    @classmethod
+    def load_all(cls, embed_path, index_path, idmap_path, model_name: str, mmap: bool = True, **kwargs):
+        """
+        Rebuild a serving retriever from the files written by save_all.
+
+        Nothing is re-encoded: the index (and embeddings) are memory-mapped,
+        articles are materialised only when a search returns them, and the
+        SentenceTransformer is loaded on the first query.
+        kwargs are passed to the constructor (e.g. rescore=True for a compressed index).
+        """
+        retriever = cls(ArticleStore.from_idmap(idmap_path), model_name, **kwargs)
+        retriever.load_index(index_path, mmap=mmap)
+        if embed_path and os.path.exists(embed_path):
+            import torch
+            retriever.question_embeddings = torch.load(embed_path, mmap=mmap, weights_only=True)
+
+        vecmap_path, spans_path = cls._vecmap_path(index_path), cls._spans_path(index_path)
+        if os.path.exists(vecmap_path):
+            spans = np.load(spans_path, mmap_mode="r" if mmap else None) if os.path.exists(spans_path) else None
+            retriever._set_vector_map(np.load(vecmap_path, mmap_mode="r" if mmap else None), spans)
+        else:
+            # bundles from before multi-vector indexing: one vector per article
+            retriever._set_vector_map(np.arange(retriever.index.ntotal, dtype="int64"))
+
+        # removed vectors stay in the map as -1 (and may stay in an HNSW graph as tombstones)
+        live = int(np.count_nonzero(np.asarray(retriever.vector_to_article) >= 0))
+        if not live <= retriever.index.ntotal <= len(retriever.vector_to_article):
+            raise ValueError(
+                f"Index has {retriever.index.ntotal} vectors but the vector map has {live} live "
+                f"of {len(retriever.vector_to_article)}"
+            )
+        if len(retriever.vector_to_article) and np.max(retriever.vector_to_article) >= len(retriever.id_mapping):
+            raise ValueError("Vector map points past the end of the id map")
+        return retriever
@@ -0,0 +1,163 @@
+'''
+This is a Retriever that:
+- wraps a dense retriever (e.g. FAISSRetriever) and a lexical one (e.g. BM25Retriever)
+- runs both legs concurrently and fuses them with reciprocal-rank fusion or
+  weighted min-max normalized scores
+- can skip the dense leg (and its embedding forward pass) when the lexical leg
+  finds a curated question that exactly matches the query
+'''
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional
+
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.text import normalize_query
+from packages.rag_core.retriever.base import BaseRetriever
+
+FUSION_METHODS = ("rrf", "weighted")
+_TRAILING = " ？?！!。.，,"
+
+
+def _canonical(text: str) -> str:
+    return normalize_query(text).lower().rstrip(_TRAILING)
+
+
+class HybridRetriever(BaseRetriever):
+    def __init__(self, dense: BaseRetriever, sparse: BaseRetriever, fusion: str = "rrf",
+                 dense_weight: float = 0.5, rrf_k: int = 60, dense_k: int = 20, sparse_k: int = 20,
+                 skip_dense_on_exact: bool = True, skip_dense_score: Optional[float] = None):
+        """
+        fusion: "rrf" (reciprocal-rank fusion) or "weighted" (min-max normalized scores)
+        dense_weight: weight of the dense leg, the lexical leg gets 1 - dense_weight
+        dense_k / sparse_k: default candidate depth of each leg
+        skip_dense_on_exact: answer from the lexical leg alone when its top hit has a
+                             question identical to the query (after normalization)
+        skip_dense_score: also skip the dense leg when the top lexical score reaches this value
+        """
+        super().__init__(dense.articles, dense.model_name)
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion '{fusion}', expected one of {FUSION_METHODS}")
+
+        self.dense = dense
+        self.sparse = sparse
+        self.fusion = fusion
+        self.dense_weight = dense_weight
+        self.rrf_k = rrf_k
+        self.dense_k = dense_k
+        self.sparse_k = sparse_k
+        self.skip_dense_on_exact = skip_dense_on_exact
+        self.skip_dense_score = skip_dense_score
+
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hybrid")
+        self._lock = threading.Lock()
+        self.counters = {"queries": 0, "dense_skipped": 0}
+
+    def embed_query(self, query: str):
+        return self.dense.embed_query(query)
+
+    def _count(self, queries: int, skipped: int):
+        with self._lock:
+            self.counters["queries"] += queries
+            self.counters["dense_skipped"] += skipped
+
+    @property
+    def _skip_enabled(self) -> bool:
+        return self.skip_dense_on_exact or self.skip_dense_score is not None
+
+    def _lexical_is_decisive(self, query: str, sparse_results: List[Tuple[int, float, Article]]) -> bool:
+        if not sparse_results:
+            return False
+        _, score, article = sparse_results[0]
+        if self.skip_dense_score is not None and score >= self.skip_dense_score:
+            return True
+        if self.skip_dense_on_exact:
+            target = _canonical(query)
+            return any(_canonical(q) == target for q in article.questions)
+        return False
+
+    def _fuse(self, dense_results, sparse_results, top_k: int) -> List[Tuple[int, float, Article]]:
+        """Merge both result lists by article id."""
+        weights = (self.dense_weight, 1.0 - self.dense_weight)
+        fused, first_seen = {}, {}
+        for weight, results in zip(weights, (dense_results, sparse_results)):
+            if not results:
+                continue
+            if self.fusion == "rrf":
+                contributions = [weight / (self.rrf_k + rank) for rank in range(1, len(results) + 1)]
+            else:
+                scores = [s for _, s, _ in results]
+                low, high = min(scores), max(scores)
+                span = high - low
+                contributions = [weight * ((s - low) / span if span > 0 else 1.0) for s in scores]
+            for (idx, _, article), contribution in zip(results, contributions):
+                fused[article.id] = fused.get(article.id, 0.0) + contribution
+                first_seen.setdefault(article.id, (idx, article))
+
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(first_seen[aid][0], float(score), first_seen[aid][1]) for aid, score in ranked]
+
+    @staticmethod
+    def _leg(retriever: BaseRetriever, stage: str, query: str, k: int, trace) -> List[Tuple[int, float, Article]]:
+        """One leg's search; with a trace, the leg records its own sub-stages plus its total as stage."""
+        if trace is None:
+            return retriever.search(query, k)
+        start = time.perf_counter()
+        results = retriever.traced_search(query, k, trace=trace)
+        trace.record(stage, (time.perf_counter() - start) * 1000, results=len(results))
+        return results
+
+    def traced_search(self, query: str, top_k: int = 5, trace=None) -> List[Tuple[int, float, Article]]:
+        return self.search(query, top_k, trace=trace)
+
+    def search(self, query: str, top_k: int = 5, dense_k: Optional[int] = None,
+               sparse_k: Optional[int] = None, trace=None) -> List[Tuple[int, float, Article]]:
+        """
+        Retrieve top-k articles from both legs and fuse them.
+        With a skip policy the (cheap) lexical leg runs first and the dense leg only if needed;
+        otherwise both legs run concurrently.
+        trace: a QueryTrace to record each leg ("dense_search", "sparse_search") and the
+               dense leg's own sub-stages into
+        """
+        dense_k = dense_k or self.dense_k
+        sparse_k = sparse_k or self.sparse_k
+
+        if self._skip_enabled:
+            sparse_results = self._leg(self.sparse, "sparse_search", query, sparse_k, trace)
+            if self._lexical_is_decisive(query, sparse_results):
+                self._count(1, 1)
+                return sparse_results[:top_k]
+            dense_results = self._leg(self.dense, "dense_search", query, dense_k, trace)
+        else:
+            dense_future = self._executor.submit(self._leg, self.dense, "dense_search", query, dense_k, trace)
+            sparse_results = self._leg(self.sparse, "sparse_search", query, sparse_k, trace)
+            dense_results = dense_future.result()
+
+        self._count(1, 0)
+        return self._fuse(dense_results, sparse_results, top_k)
+
+    def search_batch(self, queries: List[str], top_k: int = 5, dense_k: Optional[int] = None,
+                     sparse_k: Optional[int] = None) -> List[List[Tuple[int, float, Article]]]:
+        """Batched variant: one dense search_batch call for all queries the lexical leg cannot settle."""
+        dense_k = dense_k or self.dense_k
+        sparse_k = sparse_k or self.sparse_k
+
+        sparse_future = self._executor.submit(self.sparse.search_batch, queries, sparse_k)
+        if not self._skip_enabled:
+            dense_all = self.dense.search_batch(queries, dense_k)
+            sparse_all = sparse_future.result()
+            self._count(len(queries), 0)
+            return [self._fuse(d, s, top_k) for d, s in zip(dense_all, sparse_all)]
+
+        sparse_all = sparse_future.result()
+        pending = [i for i, (q, s) in enumerate(zip(queries, sparse_all)) if not self._lexical_is_decisive(q, s)]
+        dense_all = dict(zip(pending, self.dense.search_batch([queries[i] for i in pending], dense_k)))
+        self._count(len(queries), len(queries) - len(pending))
+
+        return [
+            self._fuse(dense_all[i], sparse_all[i], top_k) if i in dense_all else sparse_all[i][:top_k]
+            for i in range(len(queries))
+        ]
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,120 @@
+'''
+Columnar metadata index over Article attributes, used to push filters into vector search.
+- tags, source, language: one boolean bitmap (over article indexes) per distinct value
+- post_date, created_at:  sorted value array + article order, range queries via searchsorted
+
+Filter expressions are dicts; keys are AND-ed:
+    {"tags": "交通"}                         tag equals
+    {"tags": ["交通", "签证"]}                 any of
+    {"language": "zh", "source": [...]}
+    {"post_date": {"gte": "2024-01-01"}}     range, ops: gt / gte / lt / lte (dates or ISO strings)
+    {"created_at": {"lt": datetime(...)}}
+'''
+import numpy as np
+from datetime import date, datetime
+from typing import Dict, List, Optional, Union
+
+CATEGORICAL_FIELDS = ("tags", "source", "language")
+DATE_FIELDS = ("post_date", "created_at")
+RANGE_OPS = ("gt", "gte", "lt", "lte")
+
+
+def _date_value(field: str, value: Union[str, date, datetime, None]) -> Optional[float]:
+    """post_date -> day ordinal, created_at -> POSIX timestamp, so both sort as numbers."""
+    if value is None or value == "":
+        return None
+    if field == "post_date":
+        if isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        if isinstance(value, datetime):
+            value = value.date()
+        return float(value.toordinal())
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    elif not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    return value.timestamp()
+
+
+class MetadataIndex:
+    def __init__(self, records: List[Optional[dict]]):
+        """
+        records: one Article.to_dict()-style dict per article index, None for removed articles
+        """
+        self.n = len(records)
+        self.live = np.array([r is not None for r in records], dtype=bool)
+
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in CATEGORICAL_FIELDS}
+        for i, record in enumerate(records):
+            if record is None:
+                continue
+            for field in CATEGORICAL_FIELDS:
+                values = record.get(field)
+                if values is None:
+                    continue
+                for value in (values if isinstance(values, list) else [values]):
+                    bitmap = self.bitmaps[field].get(value)
+                    if bitmap is None:
+                        bitmap = self.bitmaps[field][value] = np.zeros(self.n, dtype=bool)
+                    bitmap[i] = True
+
+        # sorted columns for range queries; articles without the field are left out
+        self.sorted_values, self.sorted_articles = {}, {}
+        for field in DATE_FIELDS:
+            values = np.full(self.n, np.nan)
+            for i, record in enumerate(records):
+                value = None if record is None else _date_value(field, record.get(field))
+                if value is not None:
+                    values[i] = value
+            present = np.flatnonzero(~np.isnan(values))
+            order = present[np.argsort(values[present], kind="stable")]
+            self.sorted_values[field] = values[order]
+            self.sorted_articles[field] = order
+
+    @classmethod
+    def from_articles(cls, articles) -> "MetadataIndex":
+        return cls([None if a is None else a.to_dict() for a in articles])
+
+    def _categorical(self, field: str, condition) -> np.ndarray:
+        wanted = condition if isinstance(condition, (list, tuple, set)) else [condition]
+        mask = np.zeros(self.n, dtype=bool)
+        for value in wanted:
+            bitmap = self.bitmaps[field].get(value)
+            if bitmap is not None:
+                mask |= bitmap
+        return mask
+
+    def _range(self, field: str, condition: dict) -> np.ndarray:
+        unknown = set(condition) - set(RANGE_OPS)
+        if unknown:
+            raise ValueError(f"Unknown range operators for {field}: {sorted(unknown)}")
+        values = self.sorted_values[field]
+        lo, hi = 0, len(values)
+        for op, bound in condition.items():
+            bound = _date_value(field, bound)
+            if op == "gt":
+                lo = max(lo, np.searchsorted(values, bound, side="right"))
+            elif op == "gte":
+                lo = max(lo, np.searchsorted(values, bound, side="left"))
+            elif op == "lt":
+                hi = min(hi, np.searchsorted(values, bound, side="left"))
+            else:
+                hi = min(hi, np.searchsorted(values, bound, side="right"))
+        mask = np.zeros(self.n, dtype=bool)
+        if lo < hi:
+            mask[self.sorted_articles[field][lo:hi]] = True
+        return mask
+
+    def mask(self, filters: dict) -> np.ndarray:
+        """Boolean mask over article indexes of the live articles matching every condition."""
+        mask = self.live.copy()
+        for field, condition in filters.items():
+            if field in CATEGORICAL_FIELDS:
+                mask &= self._categorical(field, condition)
+            elif field in DATE_FIELDS:
+                if not isinstance(condition, dict):
+                    raise ValueError(f"{field} filter must be a range dict, e.g. {{'gte': '2024-01-01'}}")
+                mask &= self._range(field, condition)
+            else:
+                raise ValueError(f"Cannot filter on '{field}', expected one of {CATEGORICAL_FIELDS + DATE_FIELDS}")
+        return mask
@@ -0,0 +1,43 @@
+import re
+import zlib
+import numpy as np
+
+
+class DummySentenceModel:
+    """Deterministic bag-of-tokens encoder standing in for SentenceTransformer in unit tests."""
+
+    def __init__(self, model_name: str = "dummy", dim: int = 64, *args, **kwargs):
+        self.model_name = model_name
+        self.dim = dim
+        self.encode_calls = 0
+        self.encoded_texts = 0
+
+    def _tokens(self, text: str):
+        text = text.lower()
+        return re.findall(r"[a-z0-9]+", text) + re.findall(r"[一-鿿]", text)
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=None, convert_to_numpy=True,
+               convert_to_tensor=False, normalize_embeddings=False, output_value="sentence_embedding", **kwargs):
+        self.encode_calls += 1
+        self.encoded_texts += len(sentences)
+        if output_value == "token_embeddings":
+            # one vector per token: its hashed one-hot plus a small shared component
+            result = []
+            for sentence in sentences:
+                tokens = self._tokens(sentence) or [""]
+                vecs = np.full((len(tokens), self.dim), 0.01, dtype="float32")
+                for row, token in enumerate(tokens):
+                    vecs[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+                result.append(vecs)
+            return result
+        vecs = np.zeros((len(sentences), self.dim), dtype="float32")
+        for row, sentence in enumerate(sentences):
+            for token in self._tokens(sentence):
+                vecs[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+            vecs = vecs / np.maximum(norms, 1e-12)
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(vecs)
+        return vecs
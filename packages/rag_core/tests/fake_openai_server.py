@@ -0,0 +1,116 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # accept bursts of concurrent clients without refusing connections
+
+
+class FakeOpenAIServer:
+    """
+    Local stand-in for an OpenAI-compatible /chat/completions endpoint, for unit tests.
+    Replies with `tokens` (streamed as server-sent events when the request asks for it),
+    waiting `delay` seconds before the first token and `token_delay` between tokens.
+    Records request payloads, client connections and the peak number of requests in flight.
+    """
+
+    def __init__(self, tokens=("墨尔本", "的", "电车", "免费区"), delay: float = 0.0, token_delay: float = 0.0,
+                 status: int = 200):
+        self.tokens = list(tokens)
+        self.delay = delay
+        self.token_delay = token_delay
+        self.status = status
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def reply(self) -> str:
+        return "".join(self.tokens)
+
+    def _enter(self, payload, client):
+        with self._lock:
+            self.requests.append(payload)
+            self.connections.add(client)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def log_message(self, *args):
+                pass
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                server._enter(payload, self.client_address)
+                try:
+                    time.sleep(server.delay)
+                    if server.status != 200:
+                        body = json.dumps({"error": {"message": "stand-in error"}}).encode()
+                        self.send_response(server.status)
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Content-Length", str(len(body)))
+                        self.end_headers()
+                        self.wfile.write(body)
+                    elif payload.get("stream"):
+                        self.send_response(200)
+                        self.send_header("Content-Type", "text/event-stream")
+                        self.send_header("Transfer-Encoding", "chunked")
+                        self.end_headers()
+                        for i, token in enumerate(server.tokens):
+                            if i:
+                                time.sleep(server.token_delay)
+                            event = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                            self._chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self._chunk(b"data: [DONE]\n\n")
+                        self._chunk(b"")
+                    else:
+                        body = json.dumps({"choices": [{"index": 0, "message": {"role": "assistant",
+                                                                                "content": server.reply}}]},
+                                          ensure_ascii=False).encode("utf-8")
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/json")
+                        self.send_header("Content-Length", str(len(body)))
+                        self.end_headers()
+                        self.wfile.write(body)
+                finally:
+                    server._exit()
+
+        return Handler
+
+    def start(self) -> str:
+        """Serve on a free local port in a background thread; returns the base URL."""
+        self._server = _Server(("127.0.0.1", 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.base_url = self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
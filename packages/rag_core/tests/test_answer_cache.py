@@ -0,0 +1,63 @@
+import time
+import unittest
+import numpy as np
+from packages.rag_core.utils.answer_cache import SemanticAnswerCache
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.model = DummySentenceModel()
+        self.cache = SemanticAnswerCache(self.model, threshold=0.9, maxsize=8)
+
+    def test_paraphrase_over_same_context_hits(self):
+        self.cache.put("How do I take the tram in Melbourne", ["a1", "a2"], "Use a myki card.")
+        self.assertEqual(self.cache.get("how do I take the tram in Melbourne?", ["a1", "a2"]), "Use a myki card.")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_different_context_misses(self):
+        self.cache.put("墨尔本怎么坐公交车", ["a1", "a2"], "answer")
+        self.assertIsNone(self.cache.get("墨尔本怎么坐公交车", ["a1", "a3"]))
+        self.assertIsNone(self.cache.get("墨尔本怎么坐公交车", ["a2", "a1"]))  # prompt order matters
+        self.assertEqual(self.cache.stats()["context_misses"], 2)
+
+    def test_dissimilar_query_misses(self):
+        self.cache.put("student visa requirements", ["a1"], "answer")
+        self.assertIsNone(self.cache.get("airport bus to the city", ["a1"]))
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (0, 1, 0.0))
+
+    def test_threshold_is_applied_to_cosine_similarity(self):
+        base = np.array([1.0, 0.0], dtype="float32")
+        close = np.array([0.95, np.sqrt(1 - 0.95 ** 2)], dtype="float32")
+        self.cache.put("q", ["a"], "answer", embedding=base)
+        self.assertEqual(self.cache.get("q'", ["a"], embedding=close), "answer")
+        self.cache.threshold = 0.96
+        self.assertIsNone(self.cache.get("q'", ["a"], embedding=close))
+
+    def test_ttl_expiry(self):
+        cache = SemanticAnswerCache(self.model, ttl=0.01)
+        cache.put("myki card", ["a"], "answer")
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("myki card", ["a"]))
+        self.assertEqual(len(cache), 0)
+
+    def test_capacity_evicts_least_recently_used(self):
+        for i in range(8):
+            self.cache.put(f"question {i}", [f"a{i}"], f"answer {i}")
+        self.cache.get("question 0", ["a0"])
+        self.cache.put("question 8", ["a8"], "answer 8")
+        self.assertEqual(len(self.cache), 8)
+        self.assertEqual(self.cache.get("question 0", ["a0"]), "answer 0")
+        self.assertIsNone(self.cache.get("question 1", ["a1"]))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_near_duplicate_put_replaces_entry(self):
+        self.cache.put("myki card top up", ["a"], "old")
+        self.cache.put("myki card top up?", ["a"], "new")
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual(self.cache.get("myki card top up", ["a"]), "new")
+
+
+if __name__ == "__main__":
+    unittest.main()
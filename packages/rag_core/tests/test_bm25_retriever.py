@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+from packages.rag_core.retriever.bm25 import BM25Retriever
+from packages.rag_core.utils.article import Article
+
+
+class TestBM25Retriever(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(text="火车电车巴士出租车", questions=["墨尔本的公共交通系统包括哪些交通工具"]),
+            Article(text="Myki卡可以在火车站和便利店充值", questions=["如何使用Myki卡"]),
+            Article(text="毕业后可以申请485签证留在澳洲工作", questions=["485签证申请条件"]),
+            Article(text="学生签证需要提供录取通知书和资金证明", questions=["学生签证怎么申请"]),
+        ]
+        self.retriever = BM25Retriever(self.articles)
+
+    def test_keyword_queries(self):
+        self.assertIs(self.retriever.search("Myki", top_k=1)[0][2], self.articles[1])
+        self.assertIs(self.retriever.search("485签证", top_k=1)[0][2], self.articles[2])
+        self.assertIs(self.retriever.search("墨爾本交通", top_k=1)[0][2], self.articles[0])
+
+    def test_result_format_and_order(self):
+        results = self.retriever.search("签证申请", top_k=3)
+        self.assertEqual(len(results), 2)
+        for idx, score, article in results:
+            self.assertIsInstance(idx, int)
+            self.assertIsInstance(score, float)
+            self.assertIs(article, self.articles[idx])
+        self.assertGreaterEqual(results[0][1], results[1][1])
+
+    def test_no_matching_terms(self):
+        self.assertEqual(self.retriever.search("parking", top_k=3), [])
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.retriever.save(tmp)
+            loaded = BM25Retriever.load(tmp)
+            expected = self.retriever.search("Myki卡充值", top_k=2)
+            results = loaded.search("Myki卡充值", top_k=2)
+            self.assertEqual([r[0] for r in results], [r[0] for r in expected])
+            for (_, a, _), (_, b, _) in zip(results, expected):
+                self.assertAlmostEqual(a, b, places=5)
+            self.assertEqual(results[0][2].id, self.articles[1].id)
+
+
+if __name__ == "__main__":
+    unittest.main()
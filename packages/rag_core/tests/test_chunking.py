@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.chunking import split_passages
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+LONG_TEXT = (
+    "Immanuel College is a Lutheran school in Adelaide. It was founded in 1895. "
+    "The college offers boarding for students from regional areas. "
+    "Tuition fees for international students are listed on the website. "
+    "The school motto is Plus Ultra. "
+    "Sports include rowing, football and netball."
+)
+
+
+class TestSplitPassages(unittest.TestCase):
+    def test_passages_are_bounded_and_cover_the_text(self):
+        spans = split_passages(LONG_TEXT, max_chars=80, overlap=20)
+        self.assertGreater(len(spans), 1)
+        self.assertTrue(all(0 < end - start <= 80 for start, end in spans))
+        self.assertEqual(spans[0][0], 0)
+        self.assertEqual(spans[-1][1], len(LONG_TEXT))
+        for (_, prev_end), (start, _) in zip(spans, spans[1:]):
+            self.assertLessEqual(start, prev_end)  # no gaps between passages
+
+    def test_chinese_sentences_and_long_sentences(self):
+        text = "该学院成立于1895年。它是阿德莱德唯一一所设有寄宿生的路德教会学院！" + "长" * 50
+        spans = split_passages(text, max_chars=20, overlap=0)
+        self.assertEqual(text[spans[0][0]:spans[0][1]], "该学院成立于1895年。")
+        self.assertTrue(all(end - start <= 20 for start, end in spans))
+        self.assertEqual(spans[-1][1], len(text))
+
+    def test_empty_text(self):
+        self.assertEqual(split_passages("   "), [])
+
+
+class TestFAISSRetrieverChunks(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(id="school", text=LONG_TEXT, questions=["Immanuel College"]),
+            Article(id="visa", text="Student visa holders must keep enrolment. Work is limited to 48 hours.",
+                    questions=[]),
+        ]
+        self.retriever = FAISSRetriever(input_list=self.articles, model_name="dummy", chunk_size=80, chunk_overlap=20)
+        self.retriever.model = DummySentenceModel()
+
+    def test_passages_are_indexed_and_attached(self):
+        results = self.retriever.search("tuition fees for international students", top_k=1)
+        article = results[0][2]
+        self.assertEqual(article.id, "school")
+        self.assertGreater(self.retriever.index.ntotal, 3)
+        self.assertTrue(article.passages)
+        self.assertIn("Tuition fees", article.passage_texts()[0])
+        self.assertLessEqual(len(article.passages), self.retriever.max_passages)
+        # the stored article is not modified, callers get a copy
+        self.assertEqual(self.articles[0].passages, [])
+        self.assertEqual(self.articles[0].passage_texts(), [LONG_TEXT])
+
+    def test_question_hits_are_not_passages(self):
+        results = self.retriever.search("Immanuel College", top_k=1)
+        self.assertEqual(results[0][2].id, "school")
+        self.assertTrue(all(start >= 0 for start, _ in results[0][2].passages))
+
+    def test_spans_survive_add_and_save(self):
+        self.retriever.search("visa", top_k=1)
+        self.retriever.add_articles([Article(id="myki", text="Top up your myki card at any train station.",
+                                             questions=[])])
+        self.assertEqual(len(self.retriever.vector_spans), len(self.retriever.vector_to_article))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, name) for name in ("emb.pt", "index.faiss", "idmap.json")]
+            self.retriever.save_all(*paths)
+            loaded = FAISSRetriever.load_all(*paths, model_name="dummy", mmap=False)
+            loaded.model = DummySentenceModel()
+            article = loaded.search("top up myki card", top_k=1)[0][2]
+            self.assertEqual(article.id, "myki")
+            self.assertEqual(article.passage_texts(), ["Top up your myki card at any train station."])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from packages.rag_core.utils.article import Article
+from packages.rag_core.generator.context_packer import ContextPacker, estimate_tokens
+from packages.rag_core.generator.openai_chat import build_prompt
+
+TEXT = ("Melbourne has a free tram zone in the CBD. "
+        "Trams outside the zone need a myki card. "
+        "The weather changes quickly in spring. "
+        "You can top up myki at stations and 7-Eleven stores. "
+        "Parking in the city is expensive.")
+
+
+class TestEstimateTokens(unittest.TestCase):
+    def test_counts_cjk_characters_and_latin_words(self):
+        self.assertEqual(estimate_tokens("墨尔本"), 3)
+        self.assertEqual(estimate_tokens("myki card"), 2)
+        self.assertEqual(estimate_tokens("transportation"), 4)
+        self.assertEqual(estimate_tokens("免费区?"), 4)
+
+
+class TestContextPacker(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(text=TEXT, questions=["How do I use myki?"], id="a1"),
+            Article(text="Trams outside the zone need a myki card. Buses also take myki.",
+                    questions=["Buses"], id="a2"),
+            Article(text="Visa applications are made online. Processing takes weeks.",
+                    questions=["Visa"], id="a3"),
+        ]
+
+    def test_large_budget_keeps_the_most_relevant_sentences(self):
+        packer = ContextPacker(max_tokens=10_000, max_sentences=2)
+        packed, report = packer.pack("how do I top up my myki card", self.articles)
+        texts = packed[0].passage_texts()
+        self.assertEqual(len(texts), 2)
+        self.assertIn("myki card", texts[0])           # text order kept
+        self.assertIn("top up myki", texts[1])
+        self.assertGreater(report["tokens_saved"], 0)
+        self.assertEqual(report["tokens_before"] - report["tokens_after"], report["tokens_saved"])
+
+    def test_duplicate_sentences_are_dropped(self):
+        packed, report = ContextPacker(max_tokens=10_000).pack("myki card", self.articles)
+        self.assertEqual(report["duplicates"], 1)
+        self.assertEqual(packed[1].passage_texts(), ["Buses also take myki."])
+
+    def test_overlapping_passages_are_merged(self):
+        article = Article(text=TEXT, questions=["q"], id="a1")
+        article.passages = [(0, 84), (43, 120)]
+        packed, _ = ContextPacker(max_tokens=10_000, max_sentences=10).pack("tram", [article])
+        texts = packed[0].passage_texts()
+        self.assertEqual(len(texts), len(set(texts)))
+        self.assertNotIn("Parking", " ".join(texts))    # stays within the matched passages
+
+    def test_budget_is_respected(self):
+        packer = ContextPacker(max_tokens=40)
+        packed, report = packer.pack("myki card", self.articles)
+        self.assertLessEqual(report["tokens_after"], 40)
+        prompt_context = sum(estimate_tokens(t) for a in packed for t in a.passage_texts())
+        self.assertLessEqual(prompt_context, 40)
+        self.assertEqual([a.id for a in packed], [a.id for a in self.articles][:len(packed)])
+
+    def test_round_robin_gives_every_article_its_best_sentence_first(self):
+        packer = ContextPacker(max_tokens=35)
+        packed, _ = packer.pack("myki", self.articles)
+        self.assertEqual([a.id for a in packed], ["a1", "a2", "a3"])
+        self.assertEqual([len(a.passage_texts()) for a in packed], [1, 1, 1])
+
+    def test_best_sentence_kept_even_over_budget(self):
+        packed, report = ContextPacker(max_tokens=1).pack("myki", self.articles)
+        self.assertEqual(len(packed), 1)
+        self.assertEqual(len(packed[0].passage_texts()), 1)
+
+    def test_originals_untouched_and_prompt_uses_packed_passages(self):
+        packed, _ = ContextPacker(max_tokens=30).pack("myki", self.articles)
+        self.assertEqual(self.articles[0].passages, [])
+        prompt = build_prompt("myki", packed)
+        self.assertNotIn("weather", prompt)
+
+    def test_stats_accumulate(self):
+        packer = ContextPacker(max_tokens=30)
+        packer.pack("myki", self.articles)
+        packer.pack("visa", self.articles)
+        stats = packer.stats()
+        self.assertEqual(stats["requests"], 2)
+        self.assertGreater(stats["saved_rate"], 0.0)
+
+    def test_custom_token_counter(self):
+        packer = ContextPacker(max_tokens=100, count_tokens=len)
+        _, report = packer.pack("myki", self.articles)
+        self.assertLessEqual(report["tokens_after"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+from packages.rag_core.reranker.cross_encoder import CrossEncoderReranker
+from packages.rag_core.utils.article import Article
+
+
+class DummyCrossEncoder:
+    """Scores a (query, passage) pair by the number of shared words; records every batch it sees."""
+
+    def __init__(self, tokenizer=None):
+        self.tokenizer = tokenizer
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        self.batches.append(list(pairs))
+        return [len(set(q.lower().split()) & set(p.lower().split())) for q, p in pairs]
+
+    @property
+    def scored(self):
+        return [pair for batch in self.batches for pair in batch]
+
+
+def hits(*articles):
+    return [(i, 1.0 - i * 0.1, a) for i, a in enumerate(articles)]
+
+
+class TestCrossEncoderReranker(unittest.TestCase):
+    def setUp(self):
+        self.model = DummyCrossEncoder()
+        self.reranker = CrossEncoderReranker(batch_size=2)
+        self.reranker.model = self.model
+        self.articles = [
+            Article(id="a", text="student visa application steps", questions=[]),
+            Article(id="b", text="myki top up at stations", questions=[]),
+            Article(id="c", text="a much longer text about student visa conditions and work limits", questions=[]),
+        ]
+
+    def test_model_is_not_loaded_on_construction(self):
+        self.assertIsNone(CrossEncoderReranker()._model)
+
+    def test_rerank_scores_matched_passages(self):
+        text = "Boarding is available. Tuition fees are listed online."
+        long_page = Article(id="page", text=text, questions=[])
+        long_page.passages = [(23, len(text))]
+        other = Article(id="other", text="tuition", questions=[])
+        results = self.reranker.rerank("tuition fees listed", hits(other, long_page), top_k=2)
+        self.assertEqual([a.id for a in results], ["page", "other"])
+        self.assertIn(("tuition fees listed", "Tuition fees are listed online."), self.model.scored)
+
+    def test_only_novel_pairs_reach_the_model(self):
+        first = self.reranker.rerank("student visa", hits(*self.articles), top_k=3)
+        self.assertEqual(len(self.model.scored), 3)
+
+        again = self.reranker.rerank("student  visa ", hits(*self.articles), top_k=3)  # same after normalization
+        self.assertEqual(len(self.model.scored), 3)
+        self.assertEqual([a.id for a in again], [a.id for a in first])
+
+        extra = Article(id="d", text="student accommodation", questions=[])
+        self.reranker.rerank("student visa", hits(*self.articles, extra), top_k=3)
+        self.assertEqual(len(self.model.scored), 4)
+        self.assertEqual(self.reranker.stats()["hits"], 6)
+
+    def test_model_scores_the_normalized_query(self):
+        reranker = CrossEncoderReranker(cache_size=0)  # uncached pairs too
+        reranker.model = self.model
+        reranker.rerank("學生  visa ", hits(*self.articles), top_k=3)
+        self.reranker.rerank("学生 visa", hits(*self.articles), top_k=3)
+        self.assertEqual({q for q, _ in self.model.scored}, {"学生 visa"})
+
+    def test_misses_are_batched_by_length(self):
+        self.reranker.rerank("student visa", hits(*self.articles), top_k=3)
+        lengths = [[len(p) for _, p in batch] for batch in self.model.batches]
+        self.assertEqual([len(b) for b in lengths], [2, 1])
+        self.assertLessEqual(max(lengths[0]), min(lengths[1]))
+
+    def test_token_truncation(self):
+        from transformers import BertTokenizerFast
+
+        with tempfile.TemporaryDirectory() as tmp:
+            vocab = os.path.join(tmp, "vocab.txt")
+            with open(vocab, "w", encoding="utf-8") as f:
+                f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "student", "visa", "myki", "top", "up"]))
+            model = DummyCrossEncoder(tokenizer=BertTokenizerFast(vocab))
+        reranker = CrossEncoderReranker(max_tokens=2)
+        reranker.model = model
+        reranker.rerank("visa", hits(Article(id="a", text="student visa myki top up", questions=[])))
+        self.assertEqual(model.scored, [("visa", "student visa")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import time
+import unittest
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.deadline import Deadline, DegradationPolicy
+from packages.rag_core.generator.template import TemplateGenerator
+
+
+class TestDeadline(unittest.TestCase):
+    def test_remaining_counts_down_to_zero(self):
+        deadline = Deadline(50)
+        self.assertLessEqual(deadline.remaining_ms(), 50)
+        self.assertFalse(deadline.expired)
+        time.sleep(0.06)
+        self.assertEqual(deadline.remaining_ms(), 0.0)
+        self.assertTrue(deadline.expired)
+
+    def test_budget_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            Deadline(0)
+
+
+class TestDegradationPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = DegradationPolicy(top_k=5, reduced_top_k=2, reduce_retrieval_below_ms=1000,
+                                        truncate_rerank_below_ms=800, skip_rerank_below_ms=500,
+                                        template_below_ms=300)
+
+    def test_generous_budget_keeps_full_depth(self):
+        deadline = self.policy.start(10000)
+        self.assertEqual(self.policy.retrieval_depth(deadline), 5)
+        self.assertEqual(self.policy.rerank_mode(deadline), "full")
+        self.assertFalse(self.policy.use_template(deadline))
+
+    def test_degrades_in_steps(self):
+        self.assertEqual(self.policy.retrieval_depth(Deadline(900)), 2)
+        self.assertEqual(self.policy.rerank_mode(Deadline(900)), "full")
+        self.assertEqual(self.policy.rerank_mode(Deadline(700)), "truncate_rerank")
+        self.assertEqual(self.policy.rerank_mode(Deadline(400)), "skip_rerank")
+        self.assertFalse(self.policy.use_template(Deadline(400)))
+        self.assertTrue(self.policy.use_template(Deadline(200)))
+
+    def test_disabled_steps(self):
+        policy = DegradationPolicy(reduce_retrieval_below_ms=None, truncate_rerank_below_ms=None,
+                                   skip_rerank_below_ms=None, template_below_ms=None)
+        deadline = Deadline(1)
+        self.assertEqual(policy.retrieval_depth(deadline), policy.top_k)
+        self.assertEqual(policy.rerank_mode(deadline), "full")
+        time.sleep(0.002)
+        self.assertTrue(policy.use_template(deadline))  # an expired budget still cannot wait for the LLM
+
+    def test_degradations_are_counted(self):
+        deadline = self.policy.start(100)
+        self.policy.degrade(deadline, "skip_rerank")
+        self.policy.degrade(deadline, "template")
+        self.policy.start(100)
+        self.assertEqual(deadline.degraded, ["skip_rerank", "template"])
+        stats = self.policy.stats()
+        self.assertEqual((stats["requests"], stats["skip_rerank"], stats["template"]), (2, 1, 1))
+        self.assertEqual(stats["template_rate"], 0.5)
+
+
+class TestTemplateGenerator(unittest.TestCase):
+    def test_answers_from_best_article_with_related_and_links(self):
+        articles = [Article(text="Trams are free in the CBD.", questions=["墨尔本电车免费吗"],
+                            link="https://example.com/tram"),
+                    Article(text="Myki is needed outside the free zone.", questions=["Myki卡怎么用"],
+                            link="https://example.com/myki"),
+                    Article(text="Buses run every 15 minutes.", questions=["公交车多久一班"])]
+        answer = TemplateGenerator().generate("free tram", articles)
+        self.assertIn("Trams are free in the CBD.", answer)
+        self.assertIn("相关信息：\n1. Myki卡怎么用", answer)
+        self.assertIn("2. 公交车多久一班", answer)
+        self.assertIn("详细信息请参考：\n1. https://example.com/tram\n2. https://example.com/myki", answer)
+
+    def test_uses_matched_passages(self):
+        article = Article(text="Trams are free. The weather is mild. Myki is needed.", questions=["q"])
+        article.passages = [(0, 15), (37, 52)]
+        answer = TemplateGenerator().generate("q", [article])
+        self.assertIn("Trams are free. ... Myki is needed.", answer)
+        self.assertNotIn("weather", answer)
+
+    def test_no_articles(self):
+        self.assertIn("抱歉", TemplateGenerator().generate("签证", []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import hashlib
+import tempfile
+import unittest
+import numpy as np
+from packages.rag_core.utils.embedding_cache import EmbeddingCache
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.model = DummySentenceModel()
+        self.encode = lambda texts: self.model.encode(texts, normalize_embeddings=True)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_only_misses_are_encoded(self):
+        cache = EmbeddingCache(self.tmpdir.name, "dummy")
+        first = cache.encode(["a b", "c d", "a b"], self.encode)
+        self.assertEqual(self.model.encoded_texts, 2)  # duplicates encoded once
+
+        second = cache.encode(["c d", "e f", "a b"], self.encode)
+        self.assertEqual(self.model.encoded_texts, 3)
+        np.testing.assert_allclose(second[2], first[0])
+        np.testing.assert_allclose(second[0], first[1])
+
+    def test_persists_across_instances_and_namespaces(self):
+        EmbeddingCache(self.tmpdir.name, "dummy").encode(["a b", "c d"], self.encode)
+        reopened = EmbeddingCache(self.tmpdir.name, "dummy")
+        self.assertEqual(len(reopened), 2)
+        _, missing = reopened.get_many(["a b", "x y"])
+        self.assertEqual(missing, [1])
+
+        other_model = EmbeddingCache(self.tmpdir.name, "other-model")
+        self.assertEqual(len(other_model), 0)
+        unnormalized = EmbeddingCache(self.tmpdir.name, "dummy", normalize=False)
+        self.assertEqual(len(unnormalized), 0)
+
+    def test_eviction_keeps_recently_used(self):
+        cache = EmbeddingCache(self.tmpdir.name, "dummy", max_entries=3)
+        cache.encode(["a", "b", "c"], self.encode)
+        cache.get_many(["a"])
+        cache.encode(["d"], self.encode)
+        self.assertEqual(len(cache), 3)
+        _, missing = cache.get_many(["a", "d", "b", "c"])
+        self.assertEqual(len(missing), 1)
+        self.assertNotIn(0, missing)
+        self.assertNotIn(1, missing)
+
+    def test_digest_ending_in_nul_survives_reload(self):
+        text = "text3"
+        self.assertTrue(hashlib.sha1(text.encode("utf-8")).digest().endswith(b"\x00"))
+        for _ in range(3):
+            EmbeddingCache(self.tmpdir.name, "dummy").encode([text], self.encode)
+        self.assertEqual(self.model.encoded_texts, 1)
+        self.assertEqual(len(EmbeddingCache(self.tmpdir.name, "dummy")), 1)
+
+    def test_adding_entries_writes_in_place(self):
+        cache = EmbeddingCache(self.tmpdir.name, "dummy")
+        cache.encode([f"text {i}" for i in range(10)], self.encode)
+        vectors_file = os.path.join(cache.path, "vectors.npy")
+        inode, capacity = os.stat(vectors_file).st_ino, cache.capacity
+
+        cache.encode(["edited article"], self.encode)
+        self.assertEqual(os.stat(vectors_file).st_ino, inode)  # no rewrite of the existing rows
+        self.assertEqual(cache.capacity, capacity)
+        reopened = EmbeddingCache(self.tmpdir.name, "dummy")
+        self.assertEqual(len(reopened), 11)
+        np.testing.assert_allclose(reopened.encode(["edited article"], self.encode)[0],
+                                   self.encode(["edited article"])[0], rtol=1e-6)
+
+    def test_capacity_grows_up_to_max_entries(self):
+        cache = EmbeddingCache(self.tmpdir.name, "dummy", max_entries=1500)
+        cache.encode([f"text {i}" for i in range(1200)], self.encode)
+        self.assertEqual((len(cache), cache.capacity), (1200, 1200))
+        cache.encode([f"more {i}" for i in range(400)], self.encode)  # grows to 1500, evicts 100
+        self.assertEqual((len(cache), cache.capacity), (1500, 1500))
+        reopened = EmbeddingCache(self.tmpdir.name, "dummy", max_entries=1500)
+        self.assertEqual(len(reopened), 1500)
+        _, missing = reopened.get_many(["more 399", "text 0", "text 100"])
+        self.assertEqual(missing, [1])
+
+    def test_retriever_rebuild_uses_cache(self):
+        articles = [Article(text=f"body {i}", questions=[f"question number {i}"]) for i in range(10)]
+        first = FAISSRetriever(articles, model_name="dummy", cache_dir=self.tmpdir.name)
+        first.model = DummySentenceModel()
+        first.search("question", top_k=1)
+        self.assertEqual(first.model.encoded_texts, 10 + 1)
+
+        articles[3] = Article(text="edited", questions=["melbourne parking rules"])
+        rebuilt = FAISSRetriever(articles, model_name="dummy", cache_dir=self.tmpdir.name)
+        rebuilt.model = DummySentenceModel()
+        results = rebuilt.search("parking rules", top_k=1)
+        self.assertEqual(rebuilt.model.encoded_texts, 1 + 1)
+        self.assertIs(results[0][2], articles[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+import importlib.util
+import numpy as np
+from packages.rag_core.encoder.base import BaseEncoder
+from packages.rag_core.encoder.benchmark import parity_check, encode_latency
+from packages.rag_core.encoder.onnx_encoder import available_cpus
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+HAS_ONNX = all(importlib.util.find_spec(name) for name in ("onnx", "onnxruntime"))
+
+
+class DummyEncoder(BaseEncoder):
+    """DummySentenceModel vectors, optionally perturbed to stand in for a lossy backend."""
+
+    def __init__(self, noise: float = 0.0):
+        super().__init__("dummy")
+        self.inner = DummySentenceModel()
+        self.noise = noise
+
+    def _encode(self, texts, batch_size):
+        vecs = self.inner.encode(texts)
+        return vecs + self.noise * np.random.default_rng(0).standard_normal(vecs.shape).astype("float32")
+
+
+class TestEncoderBackends(unittest.TestCase):
+    def test_encode_matches_sentence_transformer_interface(self):
+        encoder = DummyEncoder()
+        vecs = encoder.encode(["student visa", "myki"], normalize_embeddings=True)
+        self.assertEqual(vecs.shape, (2, 64))
+        self.assertTrue(np.allclose(np.linalg.norm(vecs, axis=1), 1.0))
+        self.assertEqual(encoder.encode("student visa").shape, (64,))
+        self.assertEqual(tuple(encoder.encode(["myki"], convert_to_tensor=True).shape), (1, 64))
+
+    def test_parity_check(self):
+        texts = ["student visa", "myki top up", "学生签证"]
+        self.assertTrue(parity_check(DummyEncoder(), DummyEncoder(), texts)["passed"])
+        report = parity_check(DummyEncoder(), DummyEncoder(noise=1.0), texts)
+        self.assertFalse(report["passed"])
+        self.assertLess(report["min_cosine"], 0.99)
+
+    def test_encode_latency(self):
+        report = encode_latency(DummyEncoder(), ["student visa", "myki"], runs=20)
+        self.assertEqual(report["runs"], 20)
+        self.assertLessEqual(report["p50_ms"], report["p99_ms"])
+
+    def test_available_cpus_without_affinity_api(self):
+        self.assertGreaterEqual(available_cpus(), 1)
+        affinity = getattr(os, "sched_getaffinity", None)
+        if affinity is not None:
+            del os.sched_getaffinity  # as on macOS / Windows
+            self.addCleanup(setattr, os, "sched_getaffinity", affinity)
+        self.assertEqual(available_cpus(), os.cpu_count() or 1)
+
+    def test_retriever_uses_encoder(self):
+        articles = [Article(text="visa", questions=["student visa"]), Article(text="myki", questions=["myki top up"])]
+        retriever = FAISSRetriever(input_list=articles, model_name="dummy", encoder=DummyEncoder())
+        self.assertIs(retriever.search("student visa", top_k=1)[0][2], articles[0])
+
+
+@unittest.skipUnless(HAS_ONNX, "onnx / onnxruntime not installed")
+class TestONNXEncoder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from transformers import BertConfig, BertModel, BertTokenizer
+        from packages.rag_core.encoder.onnx_encoder import export_onnx
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        model_dir = os.path.join(cls.tmp.name, "bert")
+        os.makedirs(model_dir)
+        vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list("abcdefghijklmnopqrstuvwxyz") + list("学生签证")
+        with open(os.path.join(model_dir, "vocab.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(vocab))
+        BertTokenizer(os.path.join(model_dir, "vocab.txt")).save_pretrained(model_dir)
+        config = BertConfig(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2,
+                            num_attention_heads=2, intermediate_size=64)
+        BertModel(config).save_pretrained(model_dir)
+
+        cls.model_dir = model_dir
+        cls.onnx_dir = export_onnx(model_dir, os.path.join(cls.tmp.name, "onnx"), quantize=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_parity_with_torch(self):
+        from packages.rag_core.encoder.onnx_encoder import ONNXEncoder
+        from packages.rag_core.encoder.sentence_transformer import SentenceTransformerEncoder
+
+        texts = ["student visa", "a", "学生签证 how long does it take"]
+        reference = SentenceTransformerEncoder(self.model_dir, device="cpu")
+        self.assertTrue(parity_check(reference, ONNXEncoder(self.onnx_dir), texts, threshold=0.999)["passed"])
+        self.assertTrue(parity_check(reference, ONNXEncoder(self.onnx_dir, quantized=True), texts,
+                                     threshold=0.9)["passed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import numpy as np
+import torch
+from packages.rag_core.retriever.faiss_index import build_index, recall_at_k, search_params, memory_report
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+def random_unit_vectors(n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+class TestFaissIndexBackends(unittest.TestCase):
+    def setUp(self):
+        self.vectors = random_unit_vectors(2000, 32)
+        self.queries = random_unit_vectors(50, 32, seed=1)
+
+    def test_all_backends_search(self):
+        for index_type in ("flat", "ivf_flat", "hnsw", "ivf_pq"):
+            index = build_index(self.vectors, index_type, nlist=16, pq_m=8)
+            self.assertEqual(index.ntotal, len(self.vectors))
+            scores, ids = index.search(self.queries, 5)
+            self.assertEqual(ids.shape, (50, 5))
+
+    def test_ivf_recall_grows_with_nprobe(self):
+        index = build_index(self.vectors, "ivf_flat", nlist=32)
+        low = recall_at_k(index, self.vectors, self.queries, top_k=10, nprobe=1)["recall"]
+        full = recall_at_k(index, self.vectors, self.queries, top_k=10, nprobe=32)["recall"]
+        self.assertLessEqual(low, full)
+        self.assertAlmostEqual(full, 1.0)
+
+    def test_hnsw_ef_search_param(self):
+        index = build_index(self.vectors, "hnsw", hnsw_m=16)
+        self.assertIsNotNone(search_params(index, ef_search=128))
+        self.assertIsNone(search_params(index, nprobe=4))
+        result = recall_at_k(index, self.vectors, self.queries, top_k=10, ef_search=256)
+        self.assertGreater(result["recall"], 0.9)
+
+    def test_unknown_index_type(self):
+        with self.assertRaises(ValueError):
+            build_index(self.vectors, "lsh")
+
+    def test_quantised_storage_saves_memory(self):
+        flat = memory_report(build_index(self.vectors, "flat"))
+        fp16 = memory_report(build_index(self.vectors, "flat", storage="fp16"))
+        int8 = build_index(self.vectors, "flat", storage="int8")
+        self.assertGreater(fp16["compression"], 1.9)
+        self.assertGreater(memory_report(int8)["compression"], 3.5)
+        self.assertLess(flat["compression"], 1.1)
+        self.assertGreater(recall_at_k(int8, self.vectors, self.queries, top_k=10)["recall"], 0.9)
+
+    def test_ivf_pq_rejects_scalar_storage(self):
+        with self.assertRaises(ValueError):
+            build_index(self.vectors, "ivf_pq", storage="int8")
+
+
+class TestFAISSRetrieverIndexType(unittest.TestCase):
+    def test_ivf_retriever_search_and_recall(self):
+        articles = [Article(text=f"article {i}", questions=[f"question {i} about topic {i % 7} visa {i % 3}"])
+                    for i in range(200)]
+        retriever = FAISSRetriever(articles, model_name="dummy", index_type="ivf_flat", nlist=8)
+        retriever.model = DummySentenceModel()
+
+        results = retriever.search("question 5 about topic 5", top_k=3, nprobe=8)
+        self.assertEqual(len(results), 3)
+
+        report = retriever.evaluate_recall(top_k=5, nprobe=8)
+        self.assertAlmostEqual(report["recall"], 1.0)
+        self.assertIn("ms_per_query", report)
+
+    def test_short_ivf_probe_does_not_widen_to_full_scan(self):
+        articles = [Article(text=f"article {i}", questions=[f"question {i} about topic {i % 7} visa {i % 3}"])
+                    for i in range(2000)]
+        retriever = FAISSRetriever(articles, model_name="dummy", index_type="ivf_flat", nlist=32)
+        retriever.model = DummySentenceModel()
+        retriever.search("warm up", top_k=1)
+        fetches = []
+        search_vectors = retriever._search_vectors
+        retriever._search_vectors = lambda vecs, k, *args: fetches.append(k) or search_vectors(vecs, k, *args)
+
+        results = retriever.search("question 5 about topic 5", top_k=200, nprobe=1)
+        self.assertLess(len(results), 200)  # one probed list holds fewer than 200 articles
+        self.assertEqual(len(fetches), 1)
+
+    def test_int8_storage_with_rescore(self):
+        articles = [Article(text=f"article {i}", questions=[f"question {i} about topic {i % 7} visa {i % 3}"])
+                    for i in range(200)]
+        retriever = FAISSRetriever(articles, model_name="dummy", storage="int8", rescore=True)
+        retriever.model = DummySentenceModel()
+
+        results = retriever.search("question 5 about topic 5", top_k=3)
+        self.assertEqual(len(results), 3)
+        self.assertGreaterEqual(results[0][1], results[-1][1])
+
+        report = retriever.storage_report(top_k=5)
+        self.assertEqual(report["storage"], "int8")
+        self.assertEqual(retriever.question_embeddings.dtype, torch.float16)  # kept for re-scoring only
+        self.assertEqual(report["embedding_bytes"], report["fp32_flat_bytes"] // 2)
+        self.assertGreater(report["index_compression"], 3.0)
+        self.assertLess(report["compression"], 1.5)  # the fp16 copy is counted too
+        self.assertAlmostEqual(report["recall"], 1.0)
+
+    def test_int8_storage_without_rescore_keeps_no_embeddings(self):
+        articles = [Article(text=f"article {i}", questions=[f"question {i} about topic {i % 7} visa {i % 3}"])
+                    for i in range(200)]
+        retriever = FAISSRetriever(articles, model_name="dummy", storage="int8")
+        retriever.model = DummySentenceModel()
+        retriever.search("question 5 about topic 5", top_k=3)
+        self.assertIsNone(retriever.question_embeddings)
+
+        retriever.add_articles([Article(text="new", questions=["melbourne parking rules"], id="new")])
+        self.assertIsNone(retriever.question_embeddings)
+        self.assertEqual(retriever.search("melbourne parking rules", top_k=1)[0][2].id, "new")
+
+        report = retriever.storage_report(top_k=5)
+        self.assertEqual(report["embedding_bytes"], 0)
+        self.assertGreater(report["compression"], 3.0)
+        self.assertGreater(report["recall"], 0.9)  # measured against re-encoded float vectors
+
+
+if __name__ == "__main__":
+    unittest.main()
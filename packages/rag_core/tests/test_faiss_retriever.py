@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
 from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
 
 class TestFAISSRetriever(unittest.TestCase):
     def setUp(self):
@@ -39,5 +43,181 @@ class TestFAISSRetriever(unittest.TestCase):
         content = top_article.questions[0].lower() if top_article.questions else top_article.text.lower()
         self.assertIn("student", content)
 
+
+class TestFAISSRetrieverBatch(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(text="Info about applying for a student visa", questions=["How to apply for a student visa"]),
+            Article(text="Details on postgraduate 485 visa requirements", questions=["Postgraduate 485 visa requirements"]),
+            Article(text="Guide for working holiday visa", questions=["Working holiday visa guide"])
+        ]
+        self.retriever = FAISSRetriever(input_list=self.articles, model_name="dummy")
+        self.retriever.model = DummySentenceModel()
+
+    def test_search_batch_matches_single_search(self):
+        queries = ["student visa", "485 visa requirements", "working holiday"]
+        batch = self.retriever.search_batch(queries, top_k=2)
+
+        self.assertEqual(len(batch), len(queries))
+        for query, results in zip(queries, batch):
+            single = self.retriever.search(query, top_k=2)
+            self.assertEqual([r[0] for r in results], [r[0] for r in single])
+            for (_, batch_score, _), (_, single_score, _) in zip(results, single):
+                self.assertAlmostEqual(batch_score, single_score, places=5)
+
+    def test_search_batch_encodes_queries_once(self):
+        self.retriever.search("warm up", top_k=1)
+        calls = self.retriever.model.encode_calls
+        self.retriever.search_batch(["student visa", "holiday visa", "485"], top_k=1)
+        self.assertEqual(self.retriever.model.encode_calls, calls + 1)
+
+    def test_top_k_larger_than_corpus(self):
+        results = self.retriever.search("visa", top_k=10)
+        self.assertEqual(len(results), len(self.articles))
+
+class TestFAISSRetrieverPersistence(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(text="Info about applying for a student visa", questions=["How to apply for a student visa"],
+                    tags=["visa"], post_date="2024-05-01"),
+            Article(text="Details on postgraduate 485 visa requirements", questions=["Postgraduate 485 visa requirements"]),
+            Article(text="Guide for working holiday visa", questions=["Working holiday visa guide"])
+        ]
+        self.retriever = FAISSRetriever(input_list=self.articles, model_name="dummy")
+        self.retriever.model = DummySentenceModel()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = [os.path.join(self.tmpdir.name, name) for name in ("emb.pt", "faiss.index", "idmap.json")]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_load_all_serves_without_reencoding(self):
+        expected = self.retriever.search("student visa", top_k=2)
+        self.retriever.save_all(*self.paths)
+
+        loaded = FAISSRetriever.load_all(*self.paths, model_name="dummy")
+        loaded.model = DummySentenceModel()
+        self.assertEqual(loaded.id_mapping.materialised(), 0)
+
+        results = loaded.search("student visa", top_k=2)
+        self.assertEqual(loaded.model.encoded_texts, 1)  # only the query
+        self.assertEqual([r[0] for r in results], [r[0] for r in expected])
+        self.assertEqual(results[0][2].id, expected[0][2].id)
+        self.assertEqual(results[0][2].tags, ["visa"])
+        self.assertLessEqual(loaded.id_mapping.materialised(), 2)
+
+    def test_model_is_loaded_lazily(self):
+        with patch("packages.rag_core.retriever.faiss_retriever.get_model") as st:
+            FAISSRetriever(input_list=self.articles, model_name="dummy")
+            st.assert_not_called()
+
+class TestFAISSRetrieverMultiVector(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(text="Info about applying for a student visa",
+                    questions=["How to apply for a student visa", "Student visa application steps", "学生签证怎么申请"]),
+            Article(text="Details on postgraduate 485 visa requirements", questions=["Postgraduate 485 visa requirements"]),
+            Article(text="Myki card top up at train stations", questions=[]),
+        ]
+        self.retriever = FAISSRetriever(input_list=self.articles, model_name="dummy")
+        self.retriever.model = DummySentenceModel()
+
+    def test_every_question_is_indexed(self):
+        self.retriever.search("visa", top_k=1)
+        self.assertEqual(self.retriever.index.ntotal, 5)
+        self.assertEqual(self.retriever.vector_to_article.tolist(), [0, 0, 0, 1, 2])
+
+    def test_results_are_distinct_articles(self):
+        results = self.retriever.search("student visa application", top_k=3)
+        ids = [r[2].id for r in results]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(len(results), 3)
+        self.assertIs(results[0][2], self.articles[0])
+
+    def test_text_fallback(self):
+        results = self.retriever.search("myki top up", top_k=1)
+        self.assertIs(results[0][2], self.articles[2])
+
+        strict = FAISSRetriever(input_list=self.articles, model_name="dummy", text_fallback=False)
+        strict.model = DummySentenceModel()
+        with self.assertRaises(ValueError):
+            strict.search("myki", top_k=1)
+
+    def test_sum_aggregation_favours_many_matching_questions(self):
+        retriever = FAISSRetriever(input_list=self.articles, model_name="dummy", aggregate="sum")
+        retriever.model = DummySentenceModel()
+        results = retriever.search("student visa", top_k=2)
+        self.assertIs(results[0][2], self.articles[0])
+        self.assertGreater(results[0][1], 1.0)
+
+class TestFAISSRetrieverIncremental(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(id="a1", text="Info about applying for a student visa", questions=["How to apply for a student visa"]),
+            Article(id="a2", text="Details on postgraduate 485 visa requirements", questions=["Postgraduate 485 visa requirements"]),
+            Article(id="a3", text="Guide for working holiday visa", questions=["Working holiday visa guide"])
+        ]
+        self.retriever = FAISSRetriever(input_list=self.articles, model_name="dummy")
+        self.retriever.model = DummySentenceModel()
+        self.retriever.search("warm up", top_k=1)
+
+    def test_add_encodes_only_new_articles(self):
+        encoded = self.retriever.model.encoded_texts
+        added = self.retriever.add_articles([
+            Article(id="a4", text="Myki card top up", questions=["How to top up a Myki card", "Myki 充值"])
+        ])
+        self.assertEqual(added, 2)
+        self.assertEqual(self.retriever.model.encoded_texts, encoded + 2)
+        self.assertEqual(self.retriever.search("myki top up", top_k=1)[0][2].id, "a4")
+        self.assertEqual(len(self.articles), 3)  # caller's list untouched
+        with self.assertRaises(ValueError):
+            self.retriever.add_articles([Article(id="a1", text="dup", questions=["dup"])])
+
+    def test_update_reencodes_only_changed_questions(self):
+        encoded = self.retriever.model.encoded_texts
+        same_questions = Article(id="a2", text="New body", questions=["Postgraduate 485 visa requirements"], tags=["visa"])
+        changed = Article(id="a3", text="Now about parking", questions=["Melbourne parking rules"])
+        self.assertEqual(self.retriever.update_articles([same_questions, changed]), 1)
+        self.assertEqual(self.retriever.model.encoded_texts, encoded + 1)
+
+        self.assertEqual(self.retriever.search("parking rules", top_k=1)[0][2].id, "a3")
+        hit = [r for r in self.retriever.search("485 visa", top_k=3) if r[2].id == "a2"][0]
+        self.assertEqual(hit[2].tags, ["visa"])
+        self.assertEqual(self.retriever.index.ntotal, 3)
+
+    def test_remove(self):
+        self.assertEqual(self.retriever.remove_articles(["a1"]), 1)
+        results = self.retriever.search("student visa", top_k=5)
+        self.assertNotIn("a1", [r[2].id for r in results])
+        self.assertEqual(len(results), 2)
+        with self.assertRaises(KeyError):
+            self.retriever.remove_articles(["a1"])
+
+    def test_remove_from_hnsw_uses_tombstones(self):
+        retriever = FAISSRetriever(input_list=self.articles, model_name="dummy", index_type="hnsw")
+        retriever.model = DummySentenceModel()
+        retriever.search("warm up", top_k=1)
+        retriever.remove_articles(["a1"])
+        self.assertNotIn("a1", [r[2].id for r in retriever.search("student visa", top_k=3)])
+
+    def test_edits_survive_save_and_load(self):
+        self.retriever.remove_articles(["a2"])
+        self.retriever.add_articles([Article(id="a4", text="Myki card top up", questions=["How to top up a Myki card"])])
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [os.path.join(tmp, name) for name in ("emb.pt", "faiss.index", "idmap.json")]
+            self.retriever.save_all(*paths)
+
+            loaded = FAISSRetriever.load_all(*paths, model_name="dummy", mmap=False)
+            loaded.model = DummySentenceModel()
+            self.assertEqual(loaded.search("myki top up", top_k=1)[0][2].id, "a4")
+            self.assertNotIn("a2", [r[2].id for r in loaded.search("485 visa", top_k=5)])
+
+            loaded.add_articles([Article(id="a5", text="Parking", questions=["Melbourne parking rules"])])
+            self.assertEqual(loaded.search("parking rules", top_k=1)[0][2].id, "a5")
+
+            read_only = FAISSRetriever.load_all(*paths, model_name="dummy")
+            with self.assertRaises(RuntimeError):
+                read_only.remove_articles(["a1"])
+
 if __name__ == "__main__":
     unittest.main()
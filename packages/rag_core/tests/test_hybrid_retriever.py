@@ -0,0 +1,82 @@
+import unittest
+from typing import List, Tuple
+from packages.rag_core.retriever.base import BaseRetriever
+from packages.rag_core.retriever.bm25 import BM25Retriever
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.retriever.hybrid import HybridRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.trace import QueryTrace
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+# Counting wrapper: records how many queries reached the dense leg
+class CountingRetriever(BaseRetriever):
+    def __init__(self, inner: BaseRetriever):
+        super().__init__(inner.articles, inner.model_name)
+        self.inner = inner
+        self.queries = 0
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[int, float, Article]]:
+        self.queries += 1
+        return self.inner.search(query, top_k)
+
+
+class TestHybridRetriever(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(text="火车电车巴士出租车", questions=["墨尔本的公共交通系统包括哪些交通工具"]),
+            Article(text="Myki卡可以在火车站和便利店充值", questions=["如何使用Myki卡"]),
+            Article(text="毕业后可以申请485签证留在澳洲工作", questions=["485签证申请条件"]),
+            Article(text="Apply online with your offer letter", questions=["student visa application"]),
+        ]
+        faiss_retriever = FAISSRetriever(self.articles, model_name="dummy")
+        faiss_retriever.model = DummySentenceModel()
+        self.dense = CountingRetriever(faiss_retriever)
+        self.sparse = BM25Retriever(self.articles)
+
+    def test_exact_match_skips_dense_leg(self):
+        hybrid = HybridRetriever(self.dense, self.sparse)
+        results = hybrid.search("如何使用Myki卡？", top_k=2)
+        self.assertIs(results[0][2], self.articles[1])
+        self.assertEqual(self.dense.queries, 0)
+        self.assertEqual(hybrid.counters["dense_skipped"], 1)
+
+    def test_fusion_runs_both_legs(self):
+        for fusion in ("rrf", "weighted"):
+            hybrid = HybridRetriever(self.dense, self.sparse, fusion=fusion, skip_dense_on_exact=False)
+            results = hybrid.search("student visa", top_k=3)
+            self.assertIs(results[0][2], self.articles[3])
+            ids = [r[2].id for r in results]
+            self.assertEqual(len(ids), len(set(ids)))
+            self.assertGreaterEqual(results[0][1], results[-1][1])
+        self.assertEqual(self.dense.queries, 2)
+
+    def test_trace_records_each_leg(self):
+        hybrid = HybridRetriever(self.dense.inner, self.sparse, skip_dense_on_exact=False)
+        trace = QueryTrace("student visa")
+        results = hybrid.traced_search("student visa", top_k=3, trace=trace)
+        self.assertIs(results[0][2], self.articles[3])
+        self.assertGreaterEqual(trace.stage("dense_search")["results"], 1)
+        self.assertGreaterEqual(trace.stage("sparse_search")["results"], 1)
+        self.assertIn("cache_hit", trace.stage("encode"))  # the dense leg's own breakdown
+
+        skipping = HybridRetriever(self.dense, self.sparse)
+        trace = QueryTrace("如何使用Myki卡")
+        skipping.traced_search("如何使用Myki卡", top_k=2, trace=trace)
+        self.assertEqual(trace.stage("dense_search"), {})
+
+    def test_search_batch_only_sends_undecided_queries_to_dense(self):
+        hybrid = HybridRetriever(self.dense, self.sparse)
+        batch = hybrid.search_batch(["485签证申请条件", "student visa", "墨尔本交通"], top_k=2)
+        self.assertEqual(len(batch), 3)
+        self.assertIs(batch[0][0][2], self.articles[2])
+        self.assertEqual(self.dense.queries, 2)
+        self.assertEqual(hybrid.counters, {"queries": 3, "dense_skipped": 1})
+
+    def test_unknown_fusion(self):
+        with self.assertRaises(ValueError):
+            HybridRetriever(self.dense, self.sparse, fusion="max")
+
+
+if __name__ == "__main__":
+    unittest.main()
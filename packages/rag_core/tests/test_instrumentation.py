@@ -0,0 +1,123 @@
+import io
+import json
+import unittest
+from packages.rag_core.utils.article import Article
+from packages.rag_core.utils.trace import QueryTrace
+from packages.rag_core.utils.instrumentation import (
+    HistogramSink, Instrumentation, JSONLogSink, OpenTelemetrySink, TraceSink, otel_trace,
+)
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+
+def make_trace(query="q", retrieve_ms=10.0, generate_ms=100.0, hit=False, error=None):
+    trace = QueryTrace(query)
+    trace.record("retrieve", retrieve_ms, results=5)
+    trace.record("cascade", action="full")
+    trace.record("answer_cache", 0.5, hit=hit)
+    trace.record("generate", generate_ms)
+    trace.finish(error)
+    return trace
+
+
+class FailingSink(TraceSink):
+    def emit(self, trace):
+        raise RuntimeError("sink down")
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_disabled_creates_no_trace(self):
+        instrumentation = Instrumentation()
+        self.assertFalse(instrumentation.enabled)
+        self.assertIsNone(instrumentation.start("q"))
+        trace = QueryTrace("q")
+        self.assertIs(instrumentation.start("q", trace), trace)
+
+    def test_sinks_must_implement_emit(self):
+        with self.assertRaises(TypeError):
+            TraceSink()
+
+    def test_failing_sink_does_not_fail_the_query(self):
+        histogram = HistogramSink()
+        instrumentation = Instrumentation([FailingSink(), histogram])
+        trace = instrumentation.start("q")
+        with self.assertLogs("packages.rag_core.utils.instrumentation", level="ERROR"):
+            instrumentation.finish(trace)
+        self.assertEqual(histogram.snapshot()["total"]["count"], 1)
+        self.assertIsNotNone(trace.duration_ms)
+
+    def test_histogram_percentiles_and_flag_rates(self):
+        sink = HistogramSink()
+        for i in range(100):
+            sink.emit(make_trace(generate_ms=150.0 if i < 90 else 1500.0, hit=i % 4 == 0))
+        snapshot = sink.snapshot()
+        self.assertEqual(snapshot["generate"]["count"], 100)
+        self.assertEqual(snapshot["generate"]["p50_ms"], 200)    # bucket (100, 200]
+        self.assertEqual(snapshot["generate"]["p99_ms"], 1500.0)  # capped by the max seen
+        self.assertAlmostEqual(snapshot["answer_cache"]["hit_rate"], 0.25)
+        self.assertNotIn("cascade", snapshot)                     # untimed records are not histogrammed
+        self.assertEqual(snapshot["total"]["error_rate"], 0.0)
+
+    def test_json_log_sink_writes_one_line_per_query(self):
+        stream = io.StringIO()
+        sink = JSONLogSink(stream)
+        sink.emit(make_trace("墨尔本电车"))
+        sink.emit(make_trace(error=ValueError("boom")))
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        first, second = json.loads(lines[0]), json.loads(lines[1])
+        self.assertEqual(first["query"], "墨尔本电车")
+        self.assertEqual([s["stage"] for s in first["stages"]], ["retrieve", "cascade", "answer_cache", "generate"])
+        self.assertEqual(second["error"], "ValueError: boom")
+
+    def test_json_log_sink_defaults_to_logging(self):
+        with self.assertLogs("rag_core.trace", level="INFO") as logs:
+            JSONLogSink().emit(make_trace())
+        self.assertEqual(json.loads(logs.records[0].getMessage())["query"], "q")
+
+    @unittest.skipUnless(otel_trace is not None and TracerProvider is not None, "opentelemetry-sdk not installed")
+    def test_opentelemetry_sink_exports_stage_spans(self):
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        sink = OpenTelemetrySink(tracer=provider.get_tracer("test"))
+        sink.emit(make_trace(error=RuntimeError("llm down")))
+
+        spans = {s.name: s for s in exporter.get_finished_spans()}
+        self.assertEqual(set(spans), {"rag.query", "rag.retrieve", "rag.answer_cache", "rag.generate"})
+        root = spans["rag.query"]
+        self.assertEqual(spans["rag.generate"].parent.span_id, root.context.span_id)
+        self.assertEqual(spans["rag.retrieve"].attributes["rag.results"], 5)
+        self.assertAlmostEqual((spans["rag.generate"].end_time - spans["rag.generate"].start_time) / 1e6, 100.0,
+                               places=3)
+        self.assertEqual([e.name for e in root.events], ["rag.cascade"])
+        self.assertFalse(root.status.is_ok)
+
+
+class TestTracedFAISSSearch(unittest.TestCase):
+    def test_records_encode_and_search(self):
+        articles = [Article(text="Myki card", questions=["如何使用Myki卡"]),
+                    Article(text="Trams", questions=["墨尔本怎么坐电车"])]
+        retriever = FAISSRetriever(articles, model_name="dummy")
+        retriever.model = DummySentenceModel()
+
+        first, second = QueryTrace("q"), QueryTrace("q")
+        retriever.traced_search("myki", top_k=1, trace=first)
+        results = retriever.traced_search("myki", top_k=1, trace=second)
+
+        self.assertEqual(len(results), 1)
+        self.assertFalse(first.stage("encode")["cache_hit"])
+        self.assertTrue(second.stage("encode")["cache_hit"])
+        self.assertGreaterEqual(second.stage("search")["candidates"], 1)
+        self.assertEqual(second.stage("search")["results"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
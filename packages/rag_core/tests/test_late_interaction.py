@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+import numpy as np
+from packages.rag_core.reranker.late_interaction import LateInteractionReranker
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+def hits(articles):
+    return [(i, 0.5, a) for i, a in enumerate(articles)]
+
+
+class TestLateInteractionReranker(unittest.TestCase):
+    def setUp(self):
+        self.articles = [
+            Article(id="visa", text="Apply online for a student visa and wait for approval", questions=["student visa"]),
+            Article(id="myki", text="Top up your myki card at train stations", questions=["myki top up"]),
+            Article(id="rent", text="Rental bond is refunded when the lease ends", questions=["rental bond refund"]),
+        ]
+        self.model = DummySentenceModel()
+        self.reranker = LateInteractionReranker("dummy")
+        self.reranker.model = self.model
+        self.reranker.build(self.articles)
+
+    def test_index_layout(self):
+        self.assertEqual(self.reranker.tokens.dtype, np.float16)
+        self.assertEqual(len(self.reranker.offsets), len(self.reranker.unit_article) + 1)
+        self.assertEqual(self.reranker.offsets[-1], len(self.reranker.tokens))
+
+    def test_rerank_encodes_only_the_query(self):
+        encoded = self.model.encoded_texts
+        results = self.reranker.rerank("myki card top up", hits(self.articles), top_k=2)
+        self.assertEqual(results[0].id, "myki")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.model.encoded_texts, encoded + 1)
+
+    def test_matches_brute_force_maxsim(self):
+        query = self.reranker._encode_tokens(["student visa approval"], 32)[0]
+        scores = self.reranker.score("student visa approval", self.articles)
+        for i, article in enumerate(self.articles):
+            expected = max(
+                float((query @ doc.T).max(axis=1).sum())
+                for doc in self.reranker._encode_tokens([t for t, _ in self.reranker._units(article)], 256)
+            )
+            self.assertAlmostEqual(scores[i], expected, places=2)
+
+    def test_passages_restrict_scoring(self):
+        reranker = LateInteractionReranker("dummy", chunk_size=20, chunk_overlap=0)
+        reranker.model = self.model
+        page = Article(id="page", text="Rowing is popular. Student visa help.", questions=[])
+        reranker.build([page])
+        rowing = Article(**page.to_dict())
+        rowing.passages = [tuple(reranker.unit_spans[0])]
+        visa = Article(**page.to_dict())
+        visa.passages = [tuple(reranker.unit_spans[-1])]
+        scores = reranker.score("student visa", [rowing, visa])
+        self.assertGreater(scores[1], scores[0])
+
+    def test_unindexed_articles_are_encoded_on_the_fly(self):
+        late = Article(id="late", text="Medicare and OSHC cover", questions=["OSHC cover"])
+        results = self.reranker.rerank("OSHC cover", hits(self.articles + [late]), top_k=1)
+        self.assertEqual(results[0].id, "late")
+
+    def test_save_and_load_memory_mapped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.reranker.save(tmp)
+            loaded = LateInteractionReranker.load(tmp)
+            loaded.model = self.model
+            self.assertIsInstance(loaded.tokens, np.memmap)
+            self.assertTrue(np.allclose(loaded.score("rental bond", self.articles),
+                                        self.reranker.score("rental bond", self.articles)))
+            del loaded
+
+
+if __name__ == "__main__":
+    unittest.main()
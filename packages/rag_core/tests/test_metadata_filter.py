@@ -0,0 +1,74 @@
+import unittest
+from datetime import date
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.retriever.metadata_index import MetadataIndex
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+def make_articles():
+    return [
+        Article(id="t1", text="train", questions=["Melbourne train tickets"], tags=["交通"], language="en",
+                source="PTV", post_date="2023-06-01"),
+        Article(id="t2", text="tram", questions=["Melbourne tram tickets"], tags=["交通"], language="zh",
+                source="PTV", post_date="2024-03-01"),
+        Article(id="v1", text="visa", questions=["Melbourne student visa tickets"], tags=["签证"], language="zh",
+                source="Home Affairs", post_date="2024-08-15", created_at="2024-08-16T10:00:00"),
+        Article(id="n1", text="no metadata", questions=["Melbourne tickets"]),
+    ]
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = MetadataIndex.from_articles(make_articles())
+
+    def ids(self, mask):
+        return [a.id for a, keep in zip(make_articles(), mask) if keep]
+
+    def test_categorical_filters(self):
+        self.assertEqual(self.ids(self.index.mask({"tags": "交通"})), ["t1", "t2"])
+        self.assertEqual(self.ids(self.index.mask({"tags": ["交通", "签证"], "language": "zh"})), ["t2", "v1"])
+        self.assertEqual(self.ids(self.index.mask({"source": "nobody"})), [])
+
+    def test_date_ranges(self):
+        self.assertEqual(self.ids(self.index.mask({"post_date": {"gte": "2024-01-01"}})), ["t2", "v1"])
+        self.assertEqual(self.ids(self.index.mask({"post_date": {"gt": date(2023, 6, 1), "lt": "2024-08-15"}})), ["t2"])
+        self.assertEqual(self.ids(self.index.mask({"created_at": {"gte": "2024-01-01"}})), ["v1"])
+
+    def test_bad_filters(self):
+        with self.assertRaises(ValueError):
+            self.index.mask({"author": "x"})
+        with self.assertRaises(ValueError):
+            self.index.mask({"post_date": {"after": "2024-01-01"}})
+
+
+class TestFilteredSearch(unittest.TestCase):
+    def make_retriever(self, **kwargs):
+        retriever = FAISSRetriever(make_articles(), model_name="dummy", **kwargs)
+        retriever.model = DummySentenceModel()
+        return retriever
+
+    def test_filters_are_applied_inside_search(self):
+        for index_type in ("flat", "hnsw"):
+            retriever = self.make_retriever(index_type=index_type)
+            results = retriever.search("Melbourne tickets", top_k=5, filters={"tags": "交通"})
+            self.assertEqual(sorted(r[2].id for r in results), ["t1", "t2"])
+
+            results = retriever.search("Melbourne tickets", top_k=1, filters={"post_date": {"gte": "2024-06-01"}})
+            self.assertEqual([r[2].id for r in results], ["v1"])
+
+    def test_no_match_returns_empty(self):
+        retriever = self.make_retriever()
+        self.assertEqual(retriever.search("tickets", top_k=3, filters={"tags": "住宿"}), [])
+
+    def test_filters_follow_updates(self):
+        retriever = self.make_retriever()
+        retriever.search("warm up", top_k=1, filters={"tags": "交通"})
+        retriever.add_articles([Article(id="t3", text="bus", questions=["Melbourne bus tickets"], tags=["交通"])])
+        retriever.remove_articles(["t1"])
+        results = retriever.search("Melbourne tickets", top_k=5, filters={"tags": "交通"})
+        self.assertEqual(sorted(r[2].id for r in results), ["t2", "t3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import time
+import asyncio
+import unittest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from packages.rag_core.encoder.batcher import MicroBatchEncoder
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+class SlowModel(DummySentenceModel):
+    """A forward pass costs the same fixed time whatever the batch size."""
+
+    def encode(self, sentences, **kwargs):
+        time.sleep(0.02)
+        return super().encode(sentences, **kwargs)
+
+
+class TestMicroBatchEncoder(unittest.TestCase):
+    def setUp(self):
+        self.model = SlowModel()
+        self.encoder = MicroBatchEncoder(self.model, max_batch=64, max_wait_ms=10)
+
+    def tearDown(self):
+        self.encoder.close()
+
+    def test_concurrent_threads_share_batches(self):
+        queries = [f"query {i}" for i in range(60)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=60) as pool:
+            results = list(pool.map(lambda q: self.encoder.encode([q], normalize_embeddings=True), queries))
+        elapsed = time.perf_counter() - start
+
+        expected = DummySentenceModel().encode(queries, normalize_embeddings=True)
+        self.assertTrue(np.allclose(np.vstack(results), expected))
+        self.assertLess(self.model.encode_calls, 10)
+        self.assertLess(elapsed, 60 * 0.02 / 3)  # far below one forward pass per request
+        self.assertEqual(self.encoder.stats()["requests"], 60)
+
+    def test_asyncio(self):
+        async def run():
+            return await asyncio.gather(*(self.encoder.aencode(f"query {i}") for i in range(20)))
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[0].shape, (64,))
+        self.assertLess(self.model.encode_calls, 5)
+
+    def test_cancelled_request_does_not_stop_the_worker(self):
+        async def run():
+            busy = self.encoder.submit(["busy"])  # the worker is busy with this batch while the next request is cancelled
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(self.encoder.aencode("query"), 0.001)
+            busy.result(timeout=2)
+
+        asyncio.run(run())
+        vecs = self.encoder.submit(["next query"]).result(timeout=2)
+        self.assertTrue(np.allclose(vecs, DummySentenceModel().encode(["next query"])))
+
+    def test_duplicate_texts_encoded_once(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: self.encoder.encode(["same question"]), range(8)))
+        self.assertLess(self.model.encoded_texts, 8)
+
+    def test_errors_reach_every_caller(self):
+        class Broken:
+            def encode(self, sentences, **kwargs):
+                raise RuntimeError("model failed")
+
+        encoder = MicroBatchEncoder(Broken())
+        with self.assertRaises(RuntimeError):
+            encoder.encode(["query"])
+        encoder.close()
+        with self.assertRaises(RuntimeError):
+            encoder.encode(["query"])
+
+    def test_large_request_is_encoded_in_bounded_batches(self):
+        calls = []
+        encode = self.model.encode
+        self.model.encode = lambda sentences, **kwargs: calls.append((len(sentences), kwargs["batch_size"])) or \
+            encode(sentences, **kwargs)
+        texts = [f"article {i}" for i in range(500)]
+        vecs = self.encoder.encode(texts, batch_size=32)
+
+        self.assertTrue(np.allclose(vecs, DummySentenceModel().encode(texts)))
+        self.assertGreaterEqual(len(calls), 500 // 64)
+        self.assertTrue(all(batch_size <= 64 for _, batch_size in calls))
+
+    def test_as_retriever_encoder(self):
+        articles = [Article(text="visa", questions=["student visa"]), Article(text="myki", questions=["myki top up"])]
+        retriever = FAISSRetriever(input_list=articles, model_name="dummy", encoder=self.encoder)
+        self.assertIs(retriever.search("myki top up", top_k=1)[0][2], articles[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import time
+import unittest
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from packages.rag_core.utils.model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+
+        def loader(name, device):
+            time.sleep(0.05)
+            self.loads.append((name, device))
+            return object()
+
+        self.registry = ModelRegistry()
+        self.registry.register_loader("dummy", loader)
+
+    def test_models_are_shared(self):
+        first = self.registry.get("dummy", "m", "cpu")
+        self.assertIs(self.registry.get("dummy", "m", "cpu"), first)
+        self.assertIsNot(self.registry.get("dummy", "other", "cpu"), first)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_concurrent_first_use_loads_once(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            models = list(pool.map(lambda _: self.registry.get("dummy", "m", "cpu"), range(8)))
+        self.assertEqual(len(self.loads), 1)
+        self.assertTrue(all(m is models[0] for m in models))
+
+    def test_warm_up(self):
+        timings = self.registry.warm_up([("dummy", "m", "cpu"), ("dummy", "m", "cpu")])
+        self.assertEqual(list(timings), [("dummy", "m", "cpu")])
+        self.assertEqual(self.registry.loaded(), [("dummy", "m", "cpu")])
+        self.assertEqual(len(self.loads), 1)
+        with self.assertRaises(ValueError):
+            self.registry.get("unknown", "m")
+
+    def test_imports_do_not_load_models(self):
+        code = (
+            "import sys; import packages.rag_core.reranker, packages.rag_core.retriever.faiss_retriever; "
+            "print('sentence_transformers' in sys.modules)"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(out.stdout.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import unittest
+from packages.rag_core.generator.base import BaseGenerator
+from packages.rag_core.generator.openai_chat import OpenAIChatGenerator, build_prompt
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.fake_openai_server import FakeOpenAIServer
+
+
+class EchoGenerator(BaseGenerator):
+    def generate(self, query, articles):
+        return f"answer to {query}"
+
+
+class TestGeneratorStreaming(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeOpenAIServer()
+        self.base_url = self.server.start()
+        self.generator = OpenAIChatGenerator(model="stand-in", api_key="test", base_url=self.base_url)
+        text = "Trams are free in the CBD. Myki is needed outside the free zone."
+        self.article = Article(text=text, questions=["墨尔本电车免费吗"], link="https://ptv.vic.gov.au")
+        self.article.passages = [(0, 26)]
+
+    def tearDown(self):
+        self.generator.close()
+        self.server.stop()
+
+    def test_prompt_uses_matched_passages(self):
+        prompt = build_prompt("电车免费吗", [self.article])
+        self.assertIn("Trams are free in the CBD.", prompt)
+        self.assertNotIn("Myki is needed", prompt)
+        self.assertIn("https://ptv.vic.gov.au", prompt)
+
+    def test_generate(self):
+        self.assertEqual(self.generator.generate("电车免费吗", [self.article]), self.server.reply)
+        self.assertEqual(self.server.requests[0]["model"], "stand-in")
+        self.assertFalse(self.server.requests[0]["stream"])
+
+    def test_generate_stream(self):
+        chunks = list(self.generator.generate_stream("电车免费吗", [self.article]))
+        self.assertEqual(chunks, self.server.tokens)
+        self.assertTrue(self.server.requests[0]["stream"])
+
+    def test_agenerate_stream(self):
+        async def collect():
+            chunks = [c async for c in self.generator.agenerate_stream("电车免费吗", [self.article])]
+            await self.generator.aclose()
+            return chunks
+
+        self.assertEqual(asyncio.run(collect()), self.server.tokens)
+
+    def test_default_stream_wraps_generate(self):
+        generator = EchoGenerator()
+        self.assertEqual(list(generator.generate_stream("q", [])), ["answer to q"])
+
+        async def collect():
+            return [c async for c in generator.agenerate_stream("q", [])]
+
+        self.assertEqual(asyncio.run(collect()), ["answer to q"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import time
+import threading
+import unittest
+from packages.rag_core.utils.lru_cache import LRUCache
+from packages.rag_core.utils.text import normalize_query
+from packages.rag_core.retriever.faiss_retriever import FAISSRetriever
+from packages.rag_core.utils.article import Article
+from packages.rag_core.tests.dummy_models import DummySentenceModel
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_ttl_expiry(self):
+        cache = LRUCache(maxsize=4, ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_concurrent_access(self):
+        cache = LRUCache(maxsize=50)
+
+        def worker(offset):
+            for i in range(500):
+                cache.put((offset + i) % 80, i)
+                cache.get(i % 80)
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLessEqual(len(cache), 50)
+        self.assertEqual(cache.hits + cache.misses, 8 * 500)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        articles = [
+            Article(text="Public transport in Melbourne", questions=["墨尔本怎么坐公交车"]),
+            Article(text="Myki card", questions=["如何使用Myki卡"]),
+        ]
+        self.retriever = FAISSRetriever(articles, model_name="dummy")
+        self.retriever.model = DummySentenceModel()
+        self.retriever.search("warm up", top_k=1)
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  墨爾本  怎麼坐\t公交車 "), "墨尔本 怎么坐 公交车")
+
+    def test_repeated_queries_skip_the_model(self):
+        calls = self.retriever.model.encode_calls
+        first = self.retriever.search("墨尔本怎么坐公交车", top_k=1)
+        second = self.retriever.search(" 墨爾本怎麼坐公交車 ", top_k=1)
+        self.assertEqual(self.retriever.model.encode_calls, calls + 1)
+        self.assertEqual(first[0][0], second[0][0])
+        self.assertEqual(self.retriever.query_cache.stats()["hits"], 1)
+
+    def test_batch_encodes_only_misses(self):
+        self.retriever.search("Myki", top_k=1)
+        encoded = self.retriever.model.encoded_texts
+        self.retriever.search_batch(["Myki", "公交车", "公交车"], top_k=1)
+        self.assertEqual(self.retriever.model.encoded_texts, encoded + 1)
+
+    def test_cache_can_be_disabled(self):
+        retriever = FAISSRetriever(self.retriever.articles, model_name="dummy", query_cache_size=0)
+        retriever.model = DummySentenceModel()
+        retriever.search("Myki", top_k=1)
+        retriever.search("Myki", top_k=1)
+        self.assertIsNone(retriever.query_cache)
+        self.assertEqual(retriever.model.encoded_texts, len(retriever.articles) + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from packages.rag_core.utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def slow(self, value="answer", error=None):
+        def fn():
+            with self.lock:
+                self.calls += 1
+            time.sleep(0.2)
+            if error is not None:
+                raise error
+            return value
+        return fn
+
+    def test_concurrent_calls_share_one_execution(self):
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda _: self.flight.do("q", self.slow()), range(8)))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual([r[0] for r in results], ["answer"] * 8)
+        self.assertEqual(sum(shared for _, shared in results), 7)
+        self.assertEqual(self.flight.stats()["coalesced"], 7)
+
+    def test_different_keys_run_separately(self):
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda k: self.flight.do(k, self.slow(k)), ["a", "b", "a", "b"]))
+        self.assertEqual(self.calls, 2)
+        self.assertEqual([r[0] for r in results], ["a", "b", "a", "b"])
+
+    def test_nothing_is_cached_after_completion(self):
+        self.flight.do("q", self.slow())
+        self.flight.do("q", self.slow())
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(self.flight.in_flight("q"))
+
+    def test_errors_reach_every_caller(self):
+        def call(_):
+            try:
+                self.flight.do("q", self.slow(error=ValueError("boom")))
+            except ValueError as e:
+                return str(e)
+        with ThreadPoolExecutor(4) as pool:
+            self.assertEqual(list(pool.map(call, range(4))), ["boom"] * 4)
+        self.assertEqual(self.calls, 1)
+
+    def test_stream_is_shared_and_replayed(self):
+        produced = []
+
+        def tokens():
+            for t in ["a", "b", "c"]:
+                produced.append(t)
+                time.sleep(0.05)
+                yield t
+
+        first = self.flight.stream("q", tokens)
+        self.assertEqual(next(first), "a")
+        self.assertTrue(self.flight.in_flight("q"))
+        second = list(self.flight.stream("q", tokens))  # joins mid-stream, replays from the start
+        self.assertEqual(second, ["a", "b", "c"])
+        self.assertEqual(list(first), ["b", "c"])
+        self.assertEqual(produced, ["a", "b", "c"])
+        self.assertEqual(self.flight.stats()["coalesced"], 1)
+
+    def test_stream_error_after_items(self):
+        def tokens():
+            yield "a"
+            raise RuntimeError("stream broke")
+
+        stream = self.flight.stream("q", tokens)
+        self.assertEqual(next(stream), "a")
+        with self.assertRaises(RuntimeError):
+            next(stream)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight, calls = AsyncSingleFlight(), []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "answer"
+
+        results = await asyncio.gather(*(flight.do("q", fn) for _ in range(50)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({r for r, _ in results}, {"answer"})
+        self.assertEqual(flight.stats()["coalesced"], 49)
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        flight = AsyncSingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.1)
+            return "answer"
+
+        leader = asyncio.ensure_future(flight.do("q", fn))
+        follower = asyncio.ensure_future(flight.do("q", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        self.assertEqual(await follower, ("answer", True))
+
+    async def test_stream_is_shared(self):
+        flight, produced = AsyncSingleFlight(), []
+
+        async def tokens():
+            for t in ["a", "b", "c"]:
+                produced.append(t)
+                await asyncio.sleep(0.02)
+                yield t
+
+        async def consume():
+            return [t async for t in flight.stream("q", tokens)]
+
+        results = await asyncio.gather(*(consume() for _ in range(10)))
+        self.assertEqual(results, [["a", "b", "c"]] * 10)
+        self.assertEqual(produced, ["a", "b", "c"])
+        self.assertFalse(flight.in_flight("q"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import itertools
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Hashable, Optional, Sequence
+
+from packages.rag_core.utils.text import normalize_query
+
+
+class SemanticAnswerCache:
+    """
+    In-memory cache of generated answers, looked up by query-embedding proximity.
+
+    An entry is (normalized query embedding, context, answer), where the context is the ids
+    of the articles the answer was generated from. A lookup hits when an entry with the same
+    context has cosine similarity >= threshold to the query, so "墨尔本怎么坐公交车?" can reuse
+    the answer to "墨尔本怎么坐公交车" but never an answer built from other articles.
+    Entries expire after ttl seconds; past maxsize the least recently used are evicted.
+    """
+
+    def __init__(self, encoder=None, threshold: float = 0.95, maxsize: int = 1024, ttl: Optional[float] = 3600):
+        """
+        encoder: anything with a SentenceTransformer-compatible encode() (BaseEncoder, SentenceTransformer);
+                 only needed when callers do not pass embeddings themselves
+        threshold: minimum cosine similarity between queries for a hit
+        maxsize: maximum number of answers kept
+        ttl: seconds an answer stays valid (None = forever)
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.encoder = encoder
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.context_misses = 0  # a similar enough query was cached, but for other articles
+        self.evictions = 0
+        self._entries = OrderedDict()  # entry id -> (context, embedding, answer, expires_at), LRU order
+        self._by_context = {}          # context -> {entry id: None}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def embed(self, query: str) -> np.ndarray:
+        """Normalized float32 embedding of the normalized query."""
+        if self.encoder is None:
+            raise RuntimeError("SemanticAnswerCache needs an encoder, or embeddings passed in")
+        vec = self.encoder.encode([normalize_query(query)], normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vec, dtype="float32").reshape(-1)
+
+    @staticmethod
+    def _context(context: Sequence[Hashable]) -> tuple:
+        return tuple(context)
+
+    def _drop(self, entry_id: int):
+        context = self._entries.pop(entry_id)[0]
+        ids = self._by_context[context]
+        ids.pop(entry_id)
+        if not ids:
+            del self._by_context[context]
+
+    def _best(self, context: tuple, embedding: np.ndarray):
+        """(entry id, similarity) of the closest live entry with this context, (None, -inf) if none."""
+        now = time.monotonic()
+        ids = list(self._by_context.get(context, ()))
+        for entry_id in ids:
+            expires_at = self._entries[entry_id][3]
+            if expires_at is not None and expires_at <= now:
+                self._drop(entry_id)
+        ids = [i for i in ids if i in self._entries]
+        if not ids:
+            return None, -np.inf
+        sims = np.stack([self._entries[i][1] for i in ids]) @ embedding
+        best = int(np.argmax(sims))
+        return ids[best], float(sims[best])
+
+    def get(self, query: str, context: Sequence[Hashable], embedding: Optional[np.ndarray] = None) -> Optional[str]:
+        """The cached answer for a query close enough to this one over the same context, else None."""
+        embedding = self.embed(query) if embedding is None else np.asarray(embedding, dtype="float32").reshape(-1)
+        context = self._context(context)
+        with self._lock:
+            entry_id, similarity = self._best(context, embedding)
+            if entry_id is not None and similarity >= self.threshold:
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                return self._entries[entry_id][2]
+            self.misses += 1
+            if self._similar_elsewhere(context, embedding):
+                self.context_misses += 1
+            return None
+
+    def _similar_elsewhere(self, context: tuple, embedding: np.ndarray) -> bool:
+        others = [e[1] for e in self._entries.values() if e[0] != context]
+        return bool(others) and float((np.stack(others) @ embedding).max()) >= self.threshold
+
+    def put(self, query: str, context: Sequence[Hashable], answer: str, embedding: Optional[np.ndarray] = None):
+        """Cache an answer; replaces an entry for a near-identical query over the same context."""
+        embedding = self.embed(query) if embedding is None else np.asarray(embedding, dtype="float32").reshape(-1)
+        context = self._context(context)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            entry_id, similarity = self._best(context, embedding)
+            if entry_id is not None and similarity >= self.threshold:
+                self._drop(entry_id)
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (context, embedding, answer, expires_at)
+            self._by_context.setdefault(context, {})[entry_id] = None
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "context_misses": self.context_misses,
+            "evictions": self.evictions,
+        }
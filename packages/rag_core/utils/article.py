@@ -46,11 +46,21 @@ class Article:
         self.tags = tags or []
         self.link = link
 
+        # (start, end) offsets into text of the passages a passage-level search matched;
+        # set on the copies returned by the retriever, never serialized
+        self.passages = []
+
     # --- Utility methods ---
     def summary(self, length=100):
         """Return a short preview of the text."""
         return (self.text[:length] + "...") if len(self.text) > length else self.text
 
+    def passage_texts(self) -> List[str]:
+        """Text of the matched passages, or the whole text when no passages are attached."""
+        if self.passages:
+            return [self.text[start:end] for start, end in self.passages]
+        return [self.text] if self.text else []
+
     def to_dict(self):
         """Convert Article object into a JSON-serializable dictionary."""
         return {
@@ -0,0 +1,69 @@
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from packages.rag_core.utils.article import Article
+
+
+class ArticleStore:
+    """
+    List-like view over serialized articles.
+
+    Records are kept as plain dicts and only turned into Article objects
+    the first time they are accessed, so loading a large id map is just a
+    JSON parse. A None record marks a removed article slot.
+    """
+
+    def __init__(self, records: List[dict]):
+        self._records = records
+        self._cache: List[Optional[Article]] = [None] * len(records)
+
+    @classmethod
+    def from_idmap(cls, idmap_path: str) -> "ArticleStore":
+        """Load an id map written by FAISSRetriever.save_all ({"0": {...}, "1": {...}})."""
+        with open(idmap_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([data[str(i)] for i in range(len(data))])
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, i: int) -> Optional[Article]:
+        article = self._cache[i]
+        if article is None and self._records[i] is not None:
+            article = Article.from_dict(self._records[i])
+            self._cache[i] = article
+        return article
+
+    def __setitem__(self, i: int, article: Optional[Article]):
+        self._records[i] = None if article is None else {"id": article.id}
+        self._cache[i] = article
+
+    def append(self, article: Article):
+        self._records.append({"id": article.id})
+        self._cache.append(article)
+
+    def article_ids(self) -> List[Optional[str]]:
+        """Article id of every slot (None for removed slots), read without materialising."""
+        return [None if r is None else r["id"] for r in self._records]
+
+    def __iter__(self) -> Iterator[Article]:
+        for i in range(len(self._records)):
+            yield self[i]
+
+    def items(self) -> Iterator[Tuple[int, Article]]:
+        for i in range(len(self._records)):
+            yield i, self[i]
+
+    def record(self, i: int) -> Optional[Dict]:
+        """Return the raw serialized dict without materialising the Article."""
+        if self._cache[i] is not None:
+            return self._cache[i].to_dict()
+        return self._records[i]
+
+    def materialised(self) -> int:
+        """Number of records that have been turned into Article objects so far."""
+        return sum(a is not None for a in self._cache)
+
+    def to_json(self) -> Dict[str, Optional[Dict]]:
+        """Id map in the save_all format, without materialising untouched records."""
+        return {str(i): self.record(i) for i in range(len(self._records))}
@@ -0,0 +1,52 @@
+import re
+from typing import List, Tuple
+
+# sentence ends: Chinese / full-width punctuation, latin punctuation followed by space, newlines
+_sentence_end = re.compile(r"[。！？；!?;…]+[”’\"')）]*|[.](?=\s)|\n+")
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """(start, end) character spans of the sentences in text, whitespace-only spans dropped."""
+    spans, start = [], 0
+    for m in _sentence_end.finditer(text):
+        spans.append((start, m.end()))
+        start = m.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return [(s, e) for s, e in spans if text[s:e].strip()]
+
+
+def split_passages(text: str, max_chars: int = 300, overlap: int = 50) -> List[Tuple[int, int]]:
+    """
+    Split text into passages of at most max_chars characters, returned as (start, end) offsets.
+    Passages are packed from whole sentences; a sentence longer than max_chars is cut into
+    fixed windows. Consecutive passages share up to `overlap` characters of trailing sentences.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+    if not text or not text.strip():
+        return []
+
+    # sentences, with over-long ones cut into windows
+    pieces = []
+    for s, e in split_sentences(text):
+        while e - s > max_chars:
+            pieces.append((s, s + max_chars))
+            s += max_chars - min(overlap, max_chars // 2)
+        pieces.append((s, e))
+
+    passages, current = [], []
+    for piece in pieces:
+        if current and piece[1] - current[0][0] > max_chars:
+            passages.append((current[0][0], current[-1][1]))
+            # carry trailing sentences into the next passage while they fit in the overlap
+            carried = []
+            for prev in reversed(current):
+                if current[-1][1] - prev[0] > overlap or piece[1] - prev[0] > max_chars:
+                    break
+                carried.insert(0, prev)
+            current = carried
+        current.append(piece)
+    if current:
+        passages.append((current[0][0], current[-1][1]))
+    return passages
@@ -0,0 +1,95 @@
+'''
+Latency budgets for one request, and the steps the pipeline takes to stay within them.
+
+A Deadline tracks the time left of a request's budget and the degradations applied to it.
+At each stage boundary the DegradationPolicy compares the time left with what the remaining stages usually need and
+degrades in steps, cheapest quality loss first:
+- "reduce_retrieval": retrieve reduced_top_k candidates instead of top_k
+- "truncate_rerank":  rerank only the first truncate_rerank_to candidates
+- "skip_rerank":      keep the retrieval order, no reranker
+- "template":         answer with the template generator instead of the LLM (also used when the
+                      LLM does not answer before the deadline, or fails)
+'''
+import time
+import threading
+from typing import List, Optional
+
+DEGRADATIONS = ("reduce_retrieval", "truncate_rerank", "skip_rerank", "template")
+
+
+class Deadline:
+    def __init__(self, budget_ms: float):
+        if budget_ms <= 0:
+            raise ValueError("budget_ms must be positive")
+        self.budget_ms = budget_ms
+        self.degraded: List[str] = []
+        self._end = time.perf_counter() + budget_ms / 1000
+
+    def remaining_ms(self) -> float:
+        return max((self._end - time.perf_counter()) * 1000, 0.0)
+
+    def remaining_s(self) -> float:
+        return self.remaining_ms() / 1000
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+
+class DegradationPolicy:
+    def __init__(self, top_k: int = 5, reduced_top_k: int = 3, reduce_retrieval_below_ms: Optional[float] = 1500,
+                 truncate_rerank_below_ms: Optional[float] = 1200, truncate_rerank_to: int = 3,
+                 skip_rerank_below_ms: Optional[float] = 900, template_below_ms: Optional[float] = 600):
+        """
+        top_k / reduced_top_k: retrieval depth normally / when less than reduce_retrieval_below_ms is left
+        truncate_rerank_below_ms / truncate_rerank_to: rerank only the first candidates when this little is left
+        skip_rerank_below_ms: skip the reranker when this little is left
+        template_below_ms: do not start the LLM when this little is left (about its usual latency)
+        Each threshold is the time left when the stage starts; None disables that step.
+        """
+        self.top_k = top_k
+        self.reduced_top_k = reduced_top_k
+        self.reduce_retrieval_below_ms = reduce_retrieval_below_ms
+        self.truncate_rerank_below_ms = truncate_rerank_below_ms
+        self.truncate_rerank_to = truncate_rerank_to
+        self.skip_rerank_below_ms = skip_rerank_below_ms
+        self.template_below_ms = template_below_ms
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.counters = {name: 0 for name in DEGRADATIONS}
+
+    @staticmethod
+    def _below(deadline: Deadline, threshold: Optional[float]) -> bool:
+        return threshold is not None and deadline.remaining_ms() < threshold
+
+    def start(self, budget_ms: float) -> Deadline:
+        """The deadline of a request starting now."""
+        with self._lock:
+            self.requests += 1
+        return Deadline(budget_ms)
+
+    def retrieval_depth(self, deadline: Deadline) -> int:
+        return self.reduced_top_k if self._below(deadline, self.reduce_retrieval_below_ms) else self.top_k
+
+    def rerank_mode(self, deadline: Deadline) -> str:
+        """"skip_rerank", "truncate_rerank" or "full"."""
+        if self._below(deadline, self.skip_rerank_below_ms):
+            return "skip_rerank"
+        if self._below(deadline, self.truncate_rerank_below_ms):
+            return "truncate_rerank"
+        return "full"
+
+    def use_template(self, deadline: Deadline) -> bool:
+        return deadline.expired or self._below(deadline, self.template_below_ms)
+
+    def degrade(self, deadline: Deadline, degradation: str):
+        """Note that a degradation was applied to the request."""
+        deadline.degraded.append(degradation)
+        with self._lock:
+            self.counters[degradation] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {"requests": self.requests, **self.counters}
+        stats["template_rate"] = stats["template"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
@@ -0,0 +1,204 @@
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+
+
+# rows allocated when the cache is created; the capacity doubles (up to max_entries) when it runs out
+INITIAL_CAPACITY = 1024
+KEY_BYTES = 20  # sha1 digest
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of text embeddings.
+
+    Entries are keyed by (model name, normalisation flags, sha1 of the text). Each
+    (model, flags) combination gets its own directory holding:
+    - keys.npy:      (capacity, 20) sha1 digests, one uint8 row per entry
+    - vectors.npy:   (capacity, dim) embeddings
+    - last_used.npy: (capacity,) access ticks, used to evict least-recently-used entries
+    - meta.json:     the namespace and how many rows are in use
+    The arrays are preallocated and memory-mapped, so adding entries writes only their rows
+    (free rows first, then over the least-recently-used ones). The cache never grows past max_entries.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, normalize: bool = True,
+                 variant: str = "", max_entries: int = 1_000_000):
+        """
+        variant: anything else that changes the vectors (pooling, max_length, ...)
+        """
+        self.model_name = model_name
+        self.normalize = normalize
+        self.variant = variant
+        self.max_entries = max_entries
+
+        namespace = f"{model_name}|normalize={normalize}|{variant}"
+        self.path = os.path.join(cache_dir, hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16])
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        meta = {}
+        if os.path.exists(self._file("meta.json")):
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+        # caches written before "size" was tracked stored keys in another layout; they are rebuilt
+        if "size" in meta and os.path.exists(self._file("vectors.npy")):
+            self._size = meta["size"]
+            self._open()
+        else:
+            self._size = 0
+            self._keys = np.empty((0, KEY_BYTES), dtype="uint8")
+            self._vectors = None
+            self._last_used = np.empty(0, dtype="int64")
+            self._write_meta()
+        self._rows = {self._keys[i].tobytes(): i for i in range(self._size)}
+        self._tick = int(self._last_used[:self._size].max()) + 1 if self._size else 0
+
+    def _open(self):
+        self._keys = np.load(self._file("keys.npy"), mmap_mode="r+")
+        self._vectors = np.load(self._file("vectors.npy"), mmap_mode="r+")
+        self._last_used = np.load(self._file("last_used.npy"), mmap_mode="r+")
+
+    def _write_meta(self):
+        tmp = self._file("tmp_meta.json")
+        with open(tmp, "w") as f:
+            json.dump({"model_name": self.model_name, "normalize": self.normalize, "variant": self.variant,
+                       "size": self._size}, f)
+        os.replace(tmp, self._file("meta.json"))
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha1(text.encode("utf-8")).digest()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def capacity(self) -> int:
+        return len(self._keys)
+
+    def get_many(self, texts: List[str]) -> Tuple[Optional[np.ndarray], List[int]]:
+        """
+        Look up many texts at once.
+        Returns (vectors, missing): vectors is (len(texts), dim) with zero rows for misses
+        (None if the cache is empty), missing lists the positions that were not cached.
+        """
+        with self._lock:
+            rows = np.array([self._rows.get(self.key(t), -1) for t in texts], dtype="int64")
+            hit = rows >= 0
+            self.hits += int(hit.sum())
+            self.misses += int((~hit).sum())
+            if self._vectors is None:
+                return None, list(range(len(texts)))
+
+            out = np.zeros((len(texts), self._vectors.shape[1]), dtype="float32")
+            if hit.any():
+                out[hit] = self._vectors[rows[hit]]
+                self._last_used[rows[hit]] = self._tick
+                self._tick += 1
+            return out, np.flatnonzero(~hit).tolist()
+
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Add embeddings for texts, writing only their rows to disk and evicting LRU entries when full."""
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._lock:
+            new = {}  # key -> first row in texts, in order
+            for i, t in enumerate(texts):
+                k = self.key(t)
+                if k not in self._rows and k not in new:
+                    new[k] = i
+            if not new:
+                return
+            new_keys, new_rows = list(new), list(new.values())
+
+            if self._vectors is not None and self._vectors.shape[1] != vectors.shape[1]:
+                raise ValueError(f"Cached vectors have dim {self._vectors.shape[1]}, got {vectors.shape[1]}")
+            new_keys, new_rows = new_keys[-self.max_entries:], new_rows[-self.max_entries:]
+
+            rows = self._claim_rows(len(new_keys), vectors.shape[1])
+            # an overwritten row loses its old key before its vector changes, so a crash part-way
+            # never pairs a key with another text's vector
+            self._keys[rows] = 0
+            self._vectors[rows] = vectors[new_rows]
+            self._keys[rows] = np.frombuffer(b"".join(new_keys), dtype="uint8").reshape(-1, KEY_BYTES)
+            self._last_used[rows] = self._tick
+            self._tick += 1
+            for k, row in zip(new_keys, rows):
+                self._rows[k] = int(row)
+            for array in (self._keys, self._vectors, self._last_used):
+                array.flush()
+            self._write_meta()
+
+    def _claim_rows(self, n: int, dim: int) -> np.ndarray:
+        """Rows for n new entries: unused ones (growing the files if allowed), then the least recently used."""
+        if self._size + n > self.capacity and self.capacity < self.max_entries:
+            capacity = max(INITIAL_CAPACITY, 2 * self.capacity, self._size + n)
+            self._resize(min(capacity, self.max_entries), dim)
+        free = min(n, self.capacity - self._size)
+        rows = np.arange(self._size, self._size + free)
+        if free < n:
+            victims = np.argsort(self._last_used[:self._size], kind="stable")[:n - free]
+            for row in victims:
+                del self._rows[self._keys[row].tobytes()]
+            rows = np.concatenate([rows, victims])
+        self._size += free
+        return rows
+
+    def _resize(self, capacity: int, dim: int):
+        # the rows in use are copied into temp files first; meta.json only ever counts rows that exist
+        layout = (("keys.npy", (capacity, KEY_BYTES), "uint8", self._keys),
+                  ("vectors.npy", (capacity, dim), "float32", self._vectors),
+                  ("last_used.npy", (capacity,), "int64", self._last_used))
+        for name, shape, dtype, old in layout:
+            array = np.lib.format.open_memmap(self._file(f"tmp_{name}"), mode="w+", dtype=dtype, shape=shape)
+            if self._size:
+                array[:self._size] = old[:self._size]
+            array.flush()
+            del array
+        # the old files must be unmapped before they can be replaced (Windows)
+        del layout, old
+        self._keys = self._vectors = self._last_used = None
+        for name in ("keys.npy", "vectors.npy", "last_used.npy"):
+            os.replace(self._file(f"tmp_{name}"), self._file(name))
+        self._open()
+
+    def encode(self, texts: List[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embeddings for all texts, running encode_fn only on the unique texts not in the cache.
+        encode_fn must take a list of strings and return a (n, dim) array.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+        cached, missing = self.get_many(texts)
+        if not missing:
+            return cached
+
+        todo = list(dict.fromkeys(texts[i] for i in missing))
+        fresh = np.asarray(encode_fn(todo), dtype="float32")
+        self.put_many(todo, fresh)
+
+        by_text = {t: fresh[i] for i, t in enumerate(todo)}
+        out = cached if cached is not None else np.zeros((len(texts), fresh.shape[1]), dtype="float32")
+        for i in missing:
+            out[i] = by_text[texts[i]]
+        return out
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,181 @@
+'''
+Per-query instrumentation for the RAG pipeline.
+- every query gets a QueryTrace with one span per stage (encode, search, rerank, pack, generate, ...),
+  their durations, candidate counts, cache-hit flags and time-to-first-token
+- finished traces go to pluggable sinks: in-process latency histograms, a JSON log,
+  OpenTelemetry spans (exported by whatever TracerProvider the application configured)
+- without sinks nothing is created or timed beyond what a caller-supplied trace asks for
+'''
+import bisect
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import IO, Dict, List, Optional, Sequence
+
+from packages.rag_core.utils.trace import QueryTrace
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (ms) of the latency histogram buckets, plus one open-ended bucket
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class TraceSink(ABC):
+    """Receives every finished QueryTrace."""
+
+    @abstractmethod
+    def emit(self, trace: QueryTrace):
+        pass
+
+
+class Instrumentation:
+    def __init__(self, sinks: Optional[Sequence[TraceSink]] = None):
+        self.sinks: List[TraceSink] = list(sinks or [])
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def start(self, query: str, trace: Optional[QueryTrace] = None) -> Optional[QueryTrace]:
+        """The trace to record the query into: the caller's, a new one when enabled, else None."""
+        if trace is None and self.sinks:
+            return QueryTrace(query)
+        return trace
+
+    def finish(self, trace: Optional[QueryTrace], error: Optional[BaseException] = None):
+        """Close the trace and hand it to every sink; a failing sink never fails the query."""
+        if trace is None:
+            return
+        trace.finish(error)
+        for sink in self.sinks:
+            try:
+                sink.emit(trace)
+            except Exception:
+                logger.exception("Trace sink %s failed", type(sink).__name__)
+
+
+class HistogramSink(TraceSink):
+    """
+    In-process latency histograms per stage (plus "total" per query), with approximate
+    percentiles, and the rate at which boolean flags (hit, skipped, ...) were set per stage.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(sorted(buckets_ms))
+        self._stages: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _observe(self, stage: str, duration_ms: float, flags: dict):
+        hist = self._stages.get(stage)
+        if hist is None:
+            hist = self._stages[stage] = {"counts": [0] * (len(self.buckets_ms) + 1), "count": 0,
+                                          "sum_ms": 0.0, "max_ms": 0.0, "flags": {}}
+        hist["counts"][bisect.bisect_left(self.buckets_ms, duration_ms)] += 1
+        hist["count"] += 1
+        hist["sum_ms"] += duration_ms
+        hist["max_ms"] = max(hist["max_ms"], duration_ms)
+        for name, value in flags.items():
+            hist["flags"][name] = hist["flags"].get(name, 0) + int(value)
+
+    def emit(self, trace: QueryTrace):
+        with self._lock:
+            for entry in trace.stages:
+                if "duration_ms" in entry:
+                    flags = {k: v for k, v in entry.items() if isinstance(v, bool)}
+                    self._observe(entry["stage"], entry["duration_ms"], flags)
+            if trace.duration_ms is not None:
+                self._observe("total", trace.duration_ms, {"error": trace.error is not None})
+
+    def _percentile(self, hist: dict, q: float) -> float:
+        """Upper bound of the bucket holding the q-th percentile (capped by the observed max)."""
+        rank = q * hist["count"]
+        seen = 0
+        for i, count in enumerate(hist["counts"]):
+            seen += count
+            if seen >= rank and count:
+                bound = self.buckets_ms[i] if i < len(self.buckets_ms) else hist["max_ms"]
+                return min(bound, hist["max_ms"])
+        return hist["max_ms"]
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            result = {}
+            for stage, hist in self._stages.items():
+                result[stage] = {
+                    "count": hist["count"],
+                    "mean_ms": hist["sum_ms"] / hist["count"],
+                    "p50_ms": self._percentile(hist, 0.50),
+                    "p95_ms": self._percentile(hist, 0.95),
+                    "p99_ms": self._percentile(hist, 0.99),
+                    "max_ms": hist["max_ms"],
+                    **{f"{name}_rate": n / hist["count"] for name, n in hist["flags"].items()},
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+class JSONLogSink(TraceSink):
+    """One JSON line per query, written to a stream or logged (INFO) on a logger."""
+
+    def __init__(self, stream: Optional[IO[str]] = None, logger_name: str = "rag_core.trace"):
+        self.stream = stream
+        self.logger = logging.getLogger(logger_name)
+        self._lock = threading.Lock()
+
+    def emit(self, trace: QueryTrace):
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        if self.stream is None:
+            self.logger.info(line)
+            return
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def _otel_value(value):
+    """OpenTelemetry attributes are str / bool / int / float (or sequences of them)."""
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+class OpenTelemetrySink(TraceSink):
+    """
+    Exports each query as a "rag.query" span with one child span per timed stage.
+    Uses the global TracerProvider unless a tracer is passed; configure an exporter (OTLP,
+    console, ...) there. Requires opentelemetry-api.
+    """
+
+    def __init__(self, tracer=None, service_name: str = "rag_core"):
+        if otel_trace is None:
+            raise ImportError("OpenTelemetrySink requires opentelemetry-api; pip install opentelemetry-api")
+        self.tracer = tracer or otel_trace.get_tracer(service_name)
+
+    def emit(self, trace: QueryTrace):
+        start_ns = int(trace.started_at * 1e9)
+        end_ns = start_ns + int((trace.duration_ms or 0.0) * 1e6)
+        root = self.tracer.start_span("rag.query", start_time=start_ns,
+                                      attributes={"rag.trace_id": trace.trace_id, "rag.query": trace.query})
+        context = otel_trace.set_span_in_context(root)
+        for entry in trace.stages:
+            attributes = {f"rag.{k}": _otel_value(v) for k, v in entry.items()
+                          if k not in ("stage", "duration_ms", "start_ms") and v is not None}
+            if "duration_ms" not in entry:
+                # untimed records (e.g. the cascade decision) become events on the query span
+                root.add_event(f"rag.{entry['stage']}", attributes=attributes)
+                continue
+            stage_start = start_ns + int(entry["start_ms"] * 1e6)
+            span = self.tracer.start_span(f"rag.{entry['stage']}", context=context, start_time=stage_start,
+                                          attributes=attributes)
+            span.end(end_time=stage_start + int(entry["duration_ms"] * 1e6))
+        if trace.error is not None:
+            root.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, trace.error))
+        root.end(end_time=end_ns)
+
@@ -0,0 +1,93 @@
+'''
+Process-wide registry of loaded models.
+- models are loaded on first use, never at import time
+- one instance per (kind, name, device), shared by every retriever / reranker that asks for it
+- warm_up() loads models explicitly, e.g. at API startup, so the first request does not pay for it
+
+    model = get_model("sentence_transformer", "all-MiniLM-L6-v2")
+    warm_up([("sentence_transformer", "all-MiniLM-L6-v2"), ("cross_encoder", "cross-encoder/ms-marco-MiniLM-L12-v2")])
+'''
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _default_device() -> str:
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _load_sentence_transformer(name: str, device: str):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(name, device=device)
+
+
+def _load_cross_encoder(name: str, device: str):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(name, device=device)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._loaders: Dict[str, Callable] = {
+            "sentence_transformer": _load_sentence_transformer,
+            "cross_encoder": _load_cross_encoder,
+        }
+        self._models = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def register_loader(self, kind: str, loader: Callable):
+        """loader(name, device) -> model, for kinds beyond sentence_transformer / cross_encoder."""
+        with self._lock:
+            self._loaders[kind] = loader
+
+    def _key(self, kind: str, name: str, device: Optional[str]) -> Tuple[str, str, str]:
+        if kind not in self._loaders:
+            raise ValueError(f"Unknown model kind '{kind}', expected one of {sorted(self._loaders)}")
+        return kind, name, device or _default_device()
+
+    def get(self, kind: str, name: str, device: Optional[str] = None):
+        """The shared model, loaded on the first call; concurrent first calls load it once."""
+        key = self._key(kind, name, device)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._loaders[kind](name, key[2])
+                self._models[key] = model
+        return model
+
+    def warm_up(self, specs: Iterable[Tuple]) -> Dict[Tuple[str, str, str], float]:
+        """Load (kind, name) or (kind, name, device) models now; returns seconds spent per model."""
+        timings = {}
+        for spec in specs:
+            key = self._key(*spec)
+            start = time.perf_counter()
+            self.get(*key)
+            timings[key] = time.perf_counter() - start
+        return timings
+
+    def loaded(self) -> List[Tuple[str, str, str]]:
+        return list(self._models)
+
+    def clear(self):
+        """Drop every loaded model (they are freed once nobody else references them)."""
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_model(kind: str, name: str, device: Optional[str] = None):
+    return registry.get(kind, name, device)
+
+
+def warm_up(specs: Iterable[Tuple]) -> Dict[Tuple[str, str, str], float]:
+    return registry.warm_up(specs)
@@ -0,0 +1,234 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Iterator, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Broadcast:
+    """Items of one stream, replayed from the start to every subscriber (thread-safe)."""
+
+    def __init__(self):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.cond = threading.Condition()
+
+    def publish(self, item):
+        with self.cond:
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def finish(self, error: BaseException = None):
+        with self.cond:
+            self.finished = True
+            self.error = error
+            self.cond.notify_all()
+
+    def subscribe(self) -> Iterator:
+        i = 0
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: i < len(self.items) or self.finished)
+                if i < len(self.items):
+                    item = self.items[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield item
+
+
+class SingleFlight:
+    """
+    Request coalescing for threads: concurrent calls with the same key share one execution.
+    The first caller (the leader) runs the function; callers arriving while it runs wait for it
+    and get the same result or exception. Once it finishes the key is free again, nothing is cached.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.coalesced = 0
+        self._calls = {}    # key -> _Call
+        self._streams = {}  # key -> _Broadcast
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(result of fn, shared): shared is True when another caller's execution was joined."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterator]) -> Iterator:
+        """
+        Items of fn()'s iterator, shared: the first subscriber starts a thread draining it,
+        later subscribers replay what was produced so far and then follow along.
+        The stream is drained to the end even if every subscriber stops early.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = self._streams[key] = _Broadcast()
+                self.executions += 1
+                threading.Thread(target=self._pump, args=(key, broadcast, fn), daemon=True).start()
+            else:
+                self.coalesced += 1
+        yield from broadcast.subscribe()
+
+    def _pump(self, key: Hashable, broadcast: _Broadcast, fn: Callable[[], Iterator]):
+        error = None
+        try:
+            for item in fn():
+                broadcast.publish(item)
+        except BaseException as e:
+            error = e
+        with self._lock:
+            del self._streams[key]
+        broadcast.finish(error)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call or stream with this key is running (joining it would be coalesced)."""
+        return key in self._calls or key in self._streams
+
+    def stats(self) -> dict:
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+            "coalesce_rate": self.coalesced / total if total else 0.0,
+        }
+
+
+class _AsyncBroadcast:
+    def __init__(self):
+        self.items = []
+        self.finished = False
+        self.error = None
+        self.cond = asyncio.Condition()
+
+    async def publish(self, item):
+        async with self.cond:
+            self.items.append(item)
+            self.cond.notify_all()
+
+    async def finish(self, error: BaseException = None):
+        async with self.cond:
+            self.finished = True
+            self.error = error
+            self.cond.notify_all()
+
+    async def subscribe(self) -> AsyncIterator:
+        i = 0
+        while True:
+            async with self.cond:
+                await self.cond.wait_for(lambda: i < len(self.items) or self.finished)
+                if i < len(self.items):
+                    item = self.items[i]
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            i += 1
+            yield item
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for asyncio (use one per event loop). The shared execution runs as its own task,
+    so a caller that is cancelled or times out does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self.executions = 0
+        self.coalesced = 0
+        self._calls = {}    # key -> asyncio.Task
+        self._streams = {}  # key -> _AsyncBroadcast
+        self._tasks = set()
+
+    def _start(self, coro) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]) -> Tuple[Any, bool]:
+        """(result of await fn(), shared)."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = self._calls[key] = self._start(fn())
+            self.executions += 1
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return await asyncio.shield(task), shared
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved, even if every caller gave up waiting
+
+    async def stream(self, key: Hashable, fn: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Items of the async iterator fn(), shared like SingleFlight.stream (drained by a task)."""
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = self._streams[key] = _AsyncBroadcast()
+            self.executions += 1
+            self._start(self._pump(key, broadcast, fn))
+        else:
+            self.coalesced += 1
+        async for item in broadcast.subscribe():
+            yield item
+
+    async def _pump(self, key: Hashable, broadcast: _AsyncBroadcast, fn: Callable[[], AsyncIterator]):
+        error = None
+        try:
+            async for item in fn():
+                await broadcast.publish(item)
+        except BaseException as e:
+            error = e
+        del self._streams[key]
+        await broadcast.finish(error)
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a call or stream with this key is running (joining it would be coalesced)."""
+        return key in self._calls or key in self._streams
+
+    def stats(self) -> dict:
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls) + len(self._streams),
+            "coalesce_rate": self.coalesced / total if total else 0.0,
+        }
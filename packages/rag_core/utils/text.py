@@ -0,0 +1,39 @@
+import re
+
+try:
+    from opencc import OpenCC
+    _converter = OpenCC('t2s')  # same conversion as cleaning/qa_builder.py
+except ImportError:
+    _converter = None
+
+_whitespace = re.compile(r"\s+")
+
+
+def to_simplified(text: str) -> str:
+    """Traditional -> simplified Chinese (no-op when OpenCC is not installed)."""
+    return _converter.convert(text) if _converter is not None else text
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a user query: simplified Chinese, whitespace collapsed and trimmed."""
+    return _whitespace.sub(" ", to_simplified(query)).strip()
+
+
+_token_pattern = re.compile(r"[a-z0-9]+(?:[._'-][a-z0-9]+)*|[㐀-䶿一-鿿豈-﫿]+")
+_cjk_run = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+
+
+def tokenize(text: str) -> list:
+    """
+    Lexical tokens for sparse retrieval.
+    Latin / digit runs become lowercase words; CJK runs become character unigrams
+    plus bigrams, so "485签证" -> ["485", "签", "证", "签证"] without a segmenter.
+    """
+    tokens = []
+    for run in _token_pattern.findall(to_simplified(text).lower()):
+        if not _cjk_run.match(run):
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
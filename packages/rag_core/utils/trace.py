@@ -0,0 +1,60 @@
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+class QueryTrace:
+    """
+    What happened to one query on its way through the pipeline: one record per stage
+    (retrieve, rerank, generate, ...) with its duration and whatever the stage reports.
+    Pass one to RAGOrchestrator.run(query, trace=...) and read it afterwards, or give the
+    orchestrator an Instrumentation to have every query traced and sent to sinks.
+    """
+
+    def __init__(self, query: str):
+        self.query = query
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.stages: List[Dict[str, Any]] = []
+        self._t0 = time.perf_counter()
+
+    def record(self, stage: str, duration_ms: float = None, **info):
+        """Record a stage that just finished; start_ms is its start relative to the trace start."""
+        entry = {"stage": stage, **info}
+        if duration_ms is not None:
+            entry["duration_ms"] = duration_ms
+            entry["start_ms"] = max((time.perf_counter() - self._t0) * 1000 - duration_ms, 0.0)
+        self.stages.append(entry)
+
+    def merge(self, other: "QueryTrace"):
+        """Append the records of a trace started during this one (e.g. a stage run against a scratch trace)."""
+        offset_ms = (other._t0 - self._t0) * 1000
+        for entry in other.stages:
+            if "start_ms" in entry:
+                entry = {**entry, "start_ms": entry["start_ms"] + offset_ms}
+            self.stages.append(entry)
+
+    def stage(self, name: str) -> Dict[str, Any]:
+        """The last record of a stage ({} if it did not run)."""
+        for entry in reversed(self.stages):
+            if entry["stage"] == name:
+                return entry
+        return {}
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Mark the query done (total duration, and the error it failed with if any)."""
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "query": self.query,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "stages": list(self.stages),
+        }
@@ -3,13 +3,14 @@ import torch
 import os
 import faiss
 from transformers import BertTokenizer, BertModel
-from sentence_transformers import SentenceTransformer
 from backend.schemas.article import Article
+from packages.rag_core.utils.embedding_cache import EmbeddingCache
+from packages.rag_core.utils.model_registry import get_model
 import numpy as np
 
 class Retriever:
 
-    def __init__(self, input_list: list, model_name: str):
+    def __init__(self, input_list: list, model_name: str, cache_dir: str = None):
 
         for item in input_list:
             if not isinstance(item, Article):
@@ -22,6 +23,7 @@ class Retriever:
         self.model = None
         self.title_embeddings = None
         self.index = None
+        self.embedding_cache = EmbeddingCache(cache_dir, model_name, normalize=False) if cache_dir else None
 
     def vectorize_sentence_transformer(self, output_path: str = None):
         """
@@ -30,16 +32,22 @@ class Retriever:
         """
         self.titles = [article.title for article in self.articles]
 
-        # Load sentence-transformer model
-        self.model = SentenceTransformer(self.model_name)
+        # Load sentence-transformer model (shared with other retrievers using it)
+        self.model = get_model("sentence_transformer", self.model_name)
             
-        # Encode all questions
-        self.title_embeddings = self.model.encode(
-            self.titles,
-            batch_size=32,
-            convert_to_tensor=True,
-            show_progress_bar=True
-        )
+        # Encode all questions (only cache misses go through the model)
+        if self.embedding_cache is not None:
+            self.title_embeddings = torch.from_numpy(self.embedding_cache.encode(
+                self.titles,
+                lambda todo: self.model.encode(todo, batch_size=32, convert_to_numpy=True, show_progress_bar=True)
+            ))
+        else:
+            self.title_embeddings = self.model.encode(
+                self.titles,
+                batch_size=32,
+                convert_to_tensor=True,
+                show_progress_bar=True
+            )
         
         if output_path:
             # Save embeddings